@@ -36,6 +36,76 @@ class Settings(BaseSettings):
     ENABLE_MOCK_DATA: bool = True
     MOCK_DELAY_SECONDS: float = 0.5
     
+    # Repository Storage
+    # "json" rewrites <collection>.json on every mutation, "journal" appends to
+    # <collection>.journal and folds it back once it grows past JOURNAL_COMPACT_BYTES.
+    # Run compact() on each repository before switching from "journal" back to "json".
+    REPOSITORY_STORAGE_MODE: str = "json"
+    JOURNAL_COMPACT_BYTES: int = 1024 * 1024
+    
+    # Directory holding the data files of the JSON backend (relative paths are
+    # resolved from the backend directory)
+    REPOSITORY_DATA_DIR: str = "app/data"
+    
+    # "json" keeps collections in app/data/*.json, "sqlite" moves every repository to
+    # SQLITE_DATABASE_PATH (import existing data with: python -m app.repositories.sqlite_repository)
+    REPOSITORY_BACKEND: str = "json"
+    SQLITE_DATABASE_PATH: str = "app/data/codigo_para_todos.db"
+    
+    # Threads used by the async repository API for file and database I/O
+    REPOSITORY_IO_THREADS: int = 4
+    
+    # "immediate" writes every mutation before returning; "batched" applies it in memory
+    # and flushes every WRITE_BEHIND_FLUSH_MS or WRITE_BEHIND_MAX_PENDING mutations, so a
+    # crash can lose the last batch. Batched mode assumes a single worker per data directory
+    # and does not apply to the SQLite backend. With several writers it loses data: other
+    # workers do not see pending writes, a flushed batch is applied again over their changes
+    # (the later write wins), and mutations that no longer apply (e.g. a duplicate unique
+    # email) are dropped and counted under "dropped" in /api/metrics/repositories.
+    REPOSITORY_DURABILITY: str = "immediate"
+    WRITE_BEHIND_FLUSH_MS: int = 50
+    WRITE_BEHIND_MAX_PENDING: int = 100
+    
+    # JSON codec for data files: "auto" uses orjson when installed, otherwise "json" (stdlib).
+    # REPOSITORY_COMPACT_JSON writes files without indentation (smaller and faster, for production).
+    REPOSITORY_JSON_CODEC: str = "auto"
+    REPOSITORY_COMPACT_JSON: bool = False
+    
+    # "json" stores each collection as {"<collection>": [...]} in <collection>.json,
+    # "jsonl" stores one row per line in <collection>.jsonl so iter_all() can stream it.
+    # Convert existing files with: python -m app.repositories.jsonl_converter --to jsonl
+    REPOSITORY_FILE_FORMAT: str = "json"
+    
+    # Catalog collections read from memory-mapped snapshots (JSON backend only), e.g.
+    # ["questions", "lessons", "course_modules", "learning_paths"].
+    # Build them with: python -m app.repositories.snapshot
+    SNAPSHOT_COLLECTIONS: List[str] = []
+    
+    # Number of files users are hash-partitioned into (JSON backend), 0 keeps a single users.json.
+    # Changing it requires moving the data: python -m app.repositories.reshard_users --shards N
+    USER_SHARDS: int = 0
+    
+    # Per-collection operation counts, latencies, bytes and scanned rows, exposed at
+    # /api/metrics/repositories. Off by default: it times and locks every repository call.
+    # repository_metrics.capture() counts calls in tests either way.
+    ENABLE_REPOSITORY_METRICS: bool = False
+    
+    # "repository" keeps diagnostic sessions in the evaluation_sessions table of the SQLite
+    # database (shared by every worker and kept across restarts, whatever REPOSITORY_BACKEND
+    # is), "memory" keeps them in the process that started them.
+    # Sessions expire after SESSION_TTL_MINUTES without activity; at most
+    # MAX_ACTIVE_SESSIONS are kept (the least recently used is evicted)
+    SESSION_STORE: str = "repository"
+    SESSION_TTL_MINUTES: int = 120
+    MAX_ACTIVE_SESSIONS: int = 10000
+    SESSION_REAPER_INTERVAL_SECONDS: int = 60
+    
+    # Adaptive states memoized for the what-if (tree visualization) endpoints
+    WHAT_IF_CACHE_SIZE: int = 10000
+    
+    # Batch scoring engine: "auto" uses NumPy when installed, otherwise "python"
+    BATCH_SCORING_BACKEND: str = "auto"
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -3,10 +3,27 @@ FastAPI Application for Código para Todos Learning Platform
 Main application entry point with router configuration and CORS setup.
 """
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, diagnostic, learning_paths, home
+from app.routers import auth, diagnostic, learning_paths, home, metrics
 from app.core.config import settings
+from app.repositories.user_repository import user_repository
+from app.repositories.write_behind import write_behind_queue
+from app.services.session_store import run_reaper, session_store
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown hooks"""
+    # Refuse to start against user files written with another shard count
+    user_repository.check_layout()
+    # Drop abandoned diagnostic sessions in the background
+    reaper = asyncio.create_task(run_reaper(session_store, settings.SESSION_REAPER_INTERVAL_SECONDS))
+    yield
+    reaper.cancel()
+    # Write any batched repository mutations before the process exits
+    write_behind_queue.flush_all()
 
 # Create FastAPI application instance
 app = FastAPI(
@@ -14,7 +31,8 @@ app = FastAPI(
     description="Backend API for the Código para Todos learning platform",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configure CORS for frontend communication
@@ -51,6 +69,12 @@ app.include_router(
     tags=["Dashboard & Home"]
 )
 
+app.include_router(
+    metrics.router,
+    prefix="/api/metrics",
+    tags=["Metrics"]
+)
+
 @app.get("/")
 async def root():
     """Root endpoint for API health check"""
@@ -4,7 +4,7 @@ Base models and shared data structures
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Sequence
 from datetime import datetime
 from enum import Enum
 
@@ -70,10 +70,30 @@ class PaginationParams(BaseModel):
     page: int = Field(1, ge=1, description="Page number")
     limit: int = Field(10, ge=1, le=100, description="Items per page")
     
+    @property
+    def offset(self) -> int:
+        """Number of items before the requested page"""
+        return (self.page - 1) * self.limit
+    
+def order_by_pattern(fields: Sequence[str]) -> str:
+    """Regex accepting one of fields, optionally prefixed with - for descending order"""
+    return "^-?(" + "|".join(fields) + ")$"
+
 class PaginatedResponse(BaseModel):
     """Paginated response wrapper"""
     items: List[Any]
     total: int
     page: int
     limit: int
-    pages: int
\ No newline at end of file
+    pages: int
+    
+    @classmethod
+    def build(cls, items: List[Any], total: int, params: PaginationParams) -> 'PaginatedResponse':
+        """Wrap one page of items with the totals for the whole result"""
+        return cls(
+            items=items,
+            total=total,
+            page=params.page,
+            limit=params.limit,
+            pages=(total + params.limit - 1) // params.limit
+        )
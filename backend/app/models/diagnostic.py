@@ -3,8 +3,9 @@ Diagnostic evaluation-related Pydantic models
 Models for questions, answers, sessions, and evaluation results
 """
 
+import secrets
 from pydantic import BaseModel, Field
-from typing import Any, List, Dict, Optional
+from typing import Any, List, Dict, Optional, Set, Tuple
 from datetime import datetime
 from app.models.common import DifficultyLevel, BaseResponse
 
@@ -23,6 +24,67 @@ class UserAnswer(BaseModel):
     selected_option: int = Field(..., ge=0, description="Index of selected option")
     time_spent: int = Field(..., ge=0, description="Time spent on question in milliseconds")
     difficulty: str = Field(..., description="Question difficulty level")
+    # Filled in by the server when the answer is submitted; None means the question was not found
+    is_correct: Optional[bool] = Field(None, description="Whether the selected option was correct")
+    question_difficulty: Optional[str] = Field(None, description="Difficulty of the answered question")
+    topic: Optional[str] = Field(None, description="Topic of the answered question")
+
+# Answers considered by the recent-accuracy window
+RECENT_WINDOW = 3
+
+class SessionPerformance(BaseModel):
+    """Running aggregates of a session, updated once per submitted answer"""
+    answered: int = Field(0, ge=0, description="Number of answers recorded")
+    answered_ids: Set[int] = Field(default_factory=set, description="Ids of the answered questions")
+    consecutive_correct: int = Field(0, ge=0, description="Current streak of correct answers")
+    consecutive_incorrect: int = Field(0, ge=0, description="Current streak of incorrect answers")
+    recent_results: List[bool] = Field(default_factory=list, description="Correctness of the last answers")
+    difficulty_performance: Dict[str, int] = Field(
+        default_factory=lambda: {"basic": 0, "intermediate": 0, "advanced": 0},
+        description="Correct answers per question difficulty"
+    )
+    covered_topics: List[str] = Field(default_factory=list, description="Topics of the answered questions")
+    current_level: str = Field("basic", description="Difficulty of the last answered question")
+
+    @property
+    def recent_accuracy(self) -> float:
+        if not self.recent_results:
+            return 0.0
+        return sum(self.recent_results) / len(self.recent_results)
+
+    def record(self, question_id: int, is_correct: bool, difficulty: Optional[str], topic: Optional[str]) -> None:
+        """Fold one answer into the aggregates; difficulty and topic are None for unknown questions"""
+        self.answered += 1
+        self.answered_ids.add(question_id)
+        if is_correct:
+            self.consecutive_correct += 1
+            self.consecutive_incorrect = 0
+        else:
+            self.consecutive_incorrect += 1
+            self.consecutive_correct = 0
+        self.recent_results = (self.recent_results + [is_correct])[-RECENT_WINDOW:]
+        self.current_level = difficulty or "basic"
+        if difficulty is not None and is_correct:
+            self.difficulty_performance[difficulty] = self.difficulty_performance.get(difficulty, 0) + 1
+        if topic is not None and topic not in self.covered_topics:
+            self.covered_topics.append(topic)
+
+    def state_key(self) -> Tuple[Any, ...]:
+        """Hashable form of everything adaptive decisions depend on
+
+        Histories that reach equal keys get the same next questions, whatever
+        order the answers came in.
+        """
+        return (
+            self.answered,
+            self.consecutive_correct,
+            self.consecutive_incorrect,
+            tuple(self.recent_results),
+            tuple(sorted(self.difficulty_performance.items())),
+            frozenset(self.covered_topics),
+            self.current_level,
+            frozenset(self.answered_ids)
+        )
 
 class EvaluationSession(BaseModel):
     """Evaluation session model"""
@@ -32,6 +94,18 @@ class EvaluationSession(BaseModel):
     current_question_index: int = Field(0, ge=0, description="Current question index")
     answers: List[UserAnswer] = Field(default_factory=list, description="User's answers")
     is_completed: bool = Field(False, description="Whether evaluation is completed")
+    performance: SessionPerformance = Field(default_factory=SessionPerformance, description="Running performance aggregates")
+    # 53 bits, so the seed survives a round-trip through JavaScript numbers
+    seed: int = Field(default_factory=lambda: secrets.randbits(53), description="Seed of the session's question selection")
+
+# Level rules, checked in order: (level, correct answers needed at that difficulty, minimum score).
+# Users matching none of them are basic.
+LEVEL_RULES = (
+    (DifficultyLevel.ADVANCED, 2, 75),
+    (DifficultyLevel.INTERMEDIATE, 2, 60)
+)
+# Average time per answer (ms) above which the learning style is "Reflexivo"
+REFLECTIVE_AVERAGE_TIME_MS = 30000
 
 class EvaluationResult(BaseModel):
     """Final evaluation result"""
@@ -44,6 +118,7 @@ class EvaluationResult(BaseModel):
 class StartEvaluationRequest(BaseModel):
     """Request to start evaluation session"""
     user_id: str = Field(..., description="User ID starting the evaluation")
+    seed: Optional[int] = Field(None, description="Fixed selection seed, for replays and load tests")
 
 class SubmitAnswerRequest(BaseModel):
     """Request to submit an answer"""
@@ -88,11 +163,15 @@ class GetNextAdaptiveQuestionRequest(BaseModel):
     """Request model for getting next adaptive question"""
     answers: List[AdaptiveAnswer]
     assume_answer: Optional[Dict[str, Any]] = None
+    session_id: Optional[str] = Field(None, description="Session being explored; its seed is used unless seed is given")
+    seed: Optional[int] = Field(None, description="Seed of the session being explored, instead of session_id")
 
 class GetAlternativePathsRequest(BaseModel):
     """Request model for getting alternative paths"""
     answers: List[AdaptiveAnswer]
     current_question_id: int
+    session_id: Optional[str] = Field(None, description="Session being explored; its seed is used unless seed is given")
+    seed: Optional[int] = Field(None, description="Seed of the session being explored, instead of session_id")
 
 class NextAdaptiveQuestionResponse(BaseModel):
     """Response model for next adaptive question"""
@@ -100,4 +179,38 @@ class NextAdaptiveQuestionResponse(BaseModel):
 
 class AlternativePathsResponse(BaseModel):
     """Response model for alternative paths"""
-    alternatives: List[AlternativePath]
\ No newline at end of file
+    alternatives: List[AlternativePath]
+
+class GetAdaptiveTreeRequest(BaseModel):
+    """Request model for the adaptive decision tree"""
+    answers: List[AdaptiveAnswer]
+    depth: int = Field(3, ge=1, le=6, description="Levels of correct/incorrect branching to expand")
+    session_id: Optional[str] = Field(None, description="Session being explored; its seed is used unless seed is given")
+    seed: Optional[int] = Field(None, description="Seed of the session being explored, instead of session_id")
+
+class AdaptiveTreeNode(BaseModel):
+    """One adaptive state in the decision tree"""
+    node_id: int
+    depth: int = Field(..., description="Answers assumed after the given history")
+    question: Optional[Question] = Field(None, description="Question asked in this state")
+    is_completed: bool = Field(False, description="Whether the evaluation ends in this state")
+    if_correct: Optional[int] = Field(None, description="node_id reached by answering correctly")
+    if_incorrect: Optional[int] = Field(None, description="node_id reached by answering incorrectly")
+
+class AdaptiveTreeResponse(BaseModel):
+    """Response model for the adaptive decision tree
+
+    Branches that reach the same adaptive state point to the same node, so
+    nodes form a graph rooted at root_id rather than a full binary tree.
+    """
+    root_id: int
+    nodes: List[AdaptiveTreeNode]
+
+class BatchCalculateResultsRequest(BaseModel):
+    """Request to score many sessions at once"""
+    session_ids: List[str] = Field(..., min_length=1, max_length=10000, description="Session IDs to score")
+
+class BatchEvaluationResultsResponse(BaseResponse):
+    """Results of a batch scoring request"""
+    results: Dict[str, EvaluationResult] = Field(..., description="Evaluation results by session ID")
+    skipped: List[str] = Field(default_factory=list, description="Session IDs not found or without answers")
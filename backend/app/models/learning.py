@@ -71,6 +71,12 @@ class LearningPath(BaseModel):
     category: Optional[str] = Field(None, description="Course category")
     content: List[CourseModule] = Field(default_factory=list, description="Course modules")
 
+# Scalar fields the paginated endpoints can sort by; nested objects have no order
+LEARNING_PATH_SORT_FIELDS = (
+    "id", "title", "difficulty", "estimated_time", "modules", "progress",
+    "completed_modules", "is_new", "is_popular", "category"
+)
+
 class Achievement(BaseModel):
     """Achievement model"""
     id: str = Field(..., description="Unique achievement identifier")
@@ -80,6 +86,8 @@ class Achievement(BaseModel):
     unlocked_at: datetime = Field(..., description="When achievement was unlocked")
     points: int = Field(..., ge=0, description="Points awarded for achievement")
 
+ACHIEVEMENT_SORT_FIELDS = ("id", "title", "points")
+
 class DailyTip(BaseModel):
     """Daily tip model"""
     id: str = Field(..., description="Unique tip identifier")
@@ -2,9 +2,9 @@
 Achievement repository for JSON operations
 """
 from typing import List, Optional, Dict, Any
-from .base_repository import BaseRepository
+from .backends import RepositoryBackend
 
-class AchievementRepository(BaseRepository):
+class AchievementRepository(RepositoryBackend):
     """Repository for achievement operations"""
     
     def __init__(self):
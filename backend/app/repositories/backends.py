@@ -0,0 +1,18 @@
+"""
+Selects the storage backend the concrete repositories inherit from
+"""
+from app.core.config import settings
+from .base_repository import BaseRepository
+from .snapshot import SnapshotRepository
+from .sqlite_repository import SQLiteRepository
+
+if settings.REPOSITORY_BACKEND == "sqlite":
+    RepositoryBackend = SQLiteRepository
+else:
+    RepositoryBackend = BaseRepository
+
+def backend_for(collection: str) -> type:
+    """Backend for one collection: snapshots are opt-in per collection on the JSON backend"""
+    if RepositoryBackend is BaseRepository and collection in settings.SNAPSHOT_COLLECTIONS:
+        return SnapshotRepository
+    return RepositoryBackend
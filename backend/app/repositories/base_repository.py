@@ -1,87 +1,831 @@
 """
 Base repository for JSON file operations
 """
-import json
+import asyncio
+import contextvars
+import functools
+import itertools
 import os
-from typing import List, Dict, Optional, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional, Any, Callable, Iterable, Iterator, Sequence, Tuple, Union
 from pathlib import Path
 from abc import ABC, abstractmethod
+from app.core.config import settings
+from .change_feed import ChangeEvent, Subscriber, change_feed
+from .collection_cache import CachedCollection, clone, collection_cache, files_signature
+from .codecs import get_codec
+from .file_lock import InterProcessLock, lock_for
+from .write_behind import write_behind_queue
+from .metrics import instrument_class, repository_metrics
+from .indexes import (
+    IndexFields, PrimaryKeyIndex, SecondaryIndex, UniqueConstraintError, normalize_fields, normalize_value
+)
+from .query import OrderBy, Where, compile_where, is_membership, order_rows, page, parse_order_by, project
+
+# Bounded pool for repository file I/O so async handlers never block the event loop
+_io_executor = ThreadPoolExecutor(
+    max_workers=settings.REPOSITORY_IO_THREADS,
+    thread_name_prefix="repository-io"
+)
+
+# Top-level key recording how many times the journal has been folded into the base file
+JOURNAL_GENERATION_KEY = "_journal_generation"
+
+# Top-level keys with the collection's mutation counter and the time of its last change
+VERSION_KEY = "_version"
+MODIFIED_AT_KEY = "_modified_at"
+
+# First line of a JSONL file holding the top-level keys other than the collection itself
+JSONL_METADATA_KEY = "_metadata"
+
+FILE_SUFFIXES = {"json": ".json", "jsonl": ".jsonl"}
+
+# Attempts of a read-modify-write before giving up on repeated concurrent writes
+MAX_WRITE_ATTEMPTS = 3
+
+def data_directory() -> Path:
+    """Directory holding the data files, from REPOSITORY_DATA_DIR"""
+    path = Path(settings.REPOSITORY_DATA_DIR)
+    if not path.is_absolute():
+        path = Path(__file__).parent.parent.parent / path
+    return path
+
+class ConcurrentModificationError(RuntimeError):
+    """The data file changed on disk after it was loaded and before it was written"""
 
 class BaseRepository(ABC):
     """Base repository class for JSON file operations"""
     
-    def __init__(self, filename: str):
+    # Fields (or tuples of fields for compound keys) to keep hash indexes on.
+    # Unique fields answer single-row lookups such as find_by_email, and writes that
+    # would give two rows the same value raise UniqueConstraintError.
+    indexed_fields: Sequence[Union[str, Tuple[str, ...]]] = ()
+    unique_fields: Sequence[Union[str, Tuple[str, ...]]] = ()
+    
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # Overrides are timed too, so every backend reports the same operations
+        instrument_class(cls)
+    
+    def __init__(self, filename: str, file_format: Optional[str] = None):
         self.filename = filename
-        self.data_dir = Path(__file__).parent.parent / "data"
-        self.data_dir.mkdir(exist_ok=True)
-        self.file_path = self.data_dir / f"{filename}.json"
+        self.file_format = file_format or settings.REPOSITORY_FILE_FORMAT
+        self.data_dir = data_directory()
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.file_path = self.data_dir / f"{filename}{FILE_SUFFIXES[self.file_format]}"
+        self.storage_mode = settings.REPOSITORY_STORAGE_MODE
+    
+    @property
+    def journal_path(self) -> Path:
+        """Append-only mutation log kept next to the JSON file in journal mode"""
+        return self.file_path.with_suffix(".journal")
+    
+    @property
+    def lock_path(self) -> Path:
+        """Lock file serializing writers of this collection across processes"""
+        return self.file_path.with_suffix(".lock")
+    
+    def _file_lock(self) -> InterProcessLock:
+        return lock_for(self.lock_path)
+    
+    def _uses_journal(self) -> bool:
+        return self.storage_mode == "journal"
+    
+    def _uses_jsonl(self) -> bool:
+        return self.file_format == "jsonl"
+    
+    def _watched_files(self) -> List[Path]:
+        """Files whose changes must invalidate the cached collection"""
+        if self._uses_journal():
+            return [self.file_path, self.journal_path]
+        return [self.file_path]
     
     def _load_data(self) -> Dict[str, Any]:
         """Load data from JSON file"""
         try:
             if self.file_path.exists():
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                if self._uses_jsonl():
+                    return self._read_jsonl()
+                with open(self.file_path, 'rb') as f:
+                    return get_codec().loads(f.read())
             return {}
-        except (json.JSONDecodeError, FileNotFoundError):
+        except FileNotFoundError:
             return {}
+        except ValueError as e:
+            # Writes are atomic, so a malformed file is real corruption: never treat it as
+            # empty, or the next write would replace it with an empty collection
+            print(f"Error loading data from {self.filename}: {e}")
+            raise
+    
+    def _read_jsonl(self) -> Dict[str, Any]:
+        """Read a JSONL file back into the wrapped {collection: [...]} layout"""
+        data: Dict[str, Any] = {}
+        items = []
+        codec = get_codec()
+        with open(self.file_path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = codec.loads(line)
+                if not items and len(item) == 1 and JSONL_METADATA_KEY in item:
+                    data.update(item[JSONL_METADATA_KEY])
+                    continue
+                items.append(item)
+        data[self.get_collection_name()] = items
+        return data
+    
+    def _encode_file(self, data: Dict[str, Any]) -> bytes:
+        """Serialize data in the configured file format"""
+        codec = get_codec()
+        if not self._uses_jsonl():
+            return codec.dumps(data, compact=settings.REPOSITORY_COMPACT_JSON)
+        
+        name = self.get_collection_name()
+        lines = []
+        metadata = {key: value for key, value in data.items() if key != name}
+        if metadata:
+            lines.append(codec.dumps({JSONL_METADATA_KEY: metadata}, compact=True))
+        lines.extend(codec.dumps(item, compact=True) for item in data.get(name, []))
+        return b"".join(line + b"\n" for line in lines)
     
     def _save_data(self, data: Dict[str, Any]) -> bool:
-        """Save data to JSON file"""
+        """Save data to JSON file
+
+        The file is written to a temporary file and renamed over the original, so
+        readers in other processes see either the old or the new file, never a partial one.
+        """
+        temp_path = self.file_path.with_name(
+            f".{self.file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
         try:
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+            with repository_metrics.timed(self.get_collection_name(), "save"):
+                content = self._encode_file(data)
+                with open(temp_path, 'wb') as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.file_path)
+            repository_metrics.add_bytes_written(self.get_collection_name(), len(content))
+            collection_cache.store(self.file_path, data, self._watched_files())
             return True
         except Exception as e:
             print(f"Error saving data to {self.filename}: {e}")
+            if temp_path.exists():
+                temp_path.unlink()
+            # In-memory state no longer matches the file, reload it on next access
+            collection_cache.invalidate(self.file_path)
             return False
     
+    def _load_state(self) -> Dict[str, Any]:
+        """Load the JSON file and replay the journal on top of it"""
+        name = self.get_collection_name()
+        with repository_metrics.timed(name, "load"):
+            data = self._load_data()
+            if self._uses_journal():
+                self._replay_journal(data)
+        if repository_metrics.enabled:
+            signature = files_signature(self._watched_files())
+            repository_metrics.add_bytes_read(name, sum(part[2] for part in signature if part is not None))
+        return data
+    
+    def _cached(self) -> CachedCollection:
+        """Get the parsed file from the process-wide cache"""
+        entry = collection_cache.get(self.file_path, self._load_state, self._watched_files())
+        # Reloads caused by other processes surface as change events
+        change_feed.observe(self.get_collection_name(), entry.data.get(VERSION_KEY, 0),
+                            entry.data.get(MODIFIED_AT_KEY))
+        return entry
+    
+    def _replay_journal(self, data: Dict[str, Any]) -> None:
+        """Apply journaled mutations that have not been compacted into the file yet"""
+        if not self.journal_path.exists():
+            return
+        
+        generation = data.get(JOURNAL_GENERATION_KEY, 0)
+        collection = data.setdefault(self.get_collection_name(), [])
+        index = PrimaryKeyIndex(collection)
+        
+        codec = get_codec()
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = codec.loads(line)
+                except ValueError:
+                    # Torn write from a crash mid-append
+                    continue
+                
+                if 'generation' in record:
+                    # Header: a journal older than the file was already folded into it
+                    if record['generation'] < generation:
+                        return
+                    continue
+                
+                if record['op'] == 'create':
+                    collection.append(record['item'])
+                    index.add(record['item'], len(collection) - 1)
+                elif record['op'] == 'update':
+                    item = index.get(record['id'])
+                    if item is not None:
+                        item.update(record['updates'])
+                        index.rekey(record['id'], item)
+                elif record['op'] == 'delete':
+                    position = index.position(record['id'])
+                    if position is not None:
+                        removed = collection.pop(position)
+                        index.remove_at(collection, position, removed)
+                elif record['op'] == 'version':
+                    data[VERSION_KEY] = record['version']
+                    data[MODIFIED_AT_KEY] = record['modified_at']
+    
+    def _persist(self, entry: CachedCollection, records: List[Dict[str, Any]]) -> bool:
+        """Write mutations already applied to the cached data, now or in the next batch"""
+        if settings.REPOSITORY_DURABILITY == "batched":
+            write_behind_queue.add(
+                self, entry, records,
+                settings.WRITE_BEHIND_FLUSH_MS, settings.WRITE_BEHIND_MAX_PENDING
+            )
+            return True
+        return self._write_records(entry, records)
+    
+    def _write_batch(self, entry: CachedCollection, records: List[Dict[str, Any]]) -> bool:
+        """Write mutations queued by the write-behind queue
+
+        If another process wrote the files since entry was loaded, the mutations are
+        applied again on the new data (like _mutate does) instead of being dropped.
+        """
+        with self._file_lock():
+            for _ in range(MAX_WRITE_ATTEMPTS):
+                with entry.lock:
+                    try:
+                        return self._write_records(entry, records)
+                    except ConcurrentModificationError as e:
+                        print(f"Retrying batched write to {self.filename}: {e}")
+                collection_cache.invalidate(self.file_path)
+                entry, records = self._reapply(records)
+        raise ConcurrentModificationError(f"Could not write {self.filename} after {MAX_WRITE_ATTEMPTS} attempts")
+    
+    def _reapply(self, records: List[Dict[str, Any]]) -> Tuple[CachedCollection, List[Dict[str, Any]]]:
+        """Apply journal records to the current cache entry, returning it and the records applied
+
+        Version records are replaced by a new stamp; updates and deletes of rows that
+        no longer exist are skipped, as on journal replay.
+        """
+        entry = self._cached()
+        applied = []
+        with entry.lock:
+            for record in records:
+                try:
+                    if record['op'] == 'create':
+                        applied.append(self._apply_create(entry, record['item']))
+                    elif record['op'] == 'update':
+                        updated = self._apply_update(entry, record['id'], record['updates'])
+                        if updated is not None:
+                            applied.append(updated[1])
+                    elif record['op'] == 'delete':
+                        deleted = self._apply_delete(entry, record['id'])
+                        if deleted is not None:
+                            applied.append(deleted)
+                except UniqueConstraintError as e:
+                    print(f"Dropping batched write to {self.filename}: {e}")
+                    write_behind_queue.record_dropped(1)
+            applied.append(self._stamp(entry))
+        return entry, applied
+    
+    def _write_records(self, entry: CachedCollection, records: List[Dict[str, Any]]) -> bool:
+        """Write mutations already applied to the cached data to disk
+
+        Raises ConcurrentModificationError if the files changed since entry was loaded
+        (a writer that did not take the lock), since writing would drop its changes.
+        """
+        if entry.signature is not None and entry.signature != files_signature(self._watched_files()):
+            raise ConcurrentModificationError(f"{self.filename} was modified by another process")
+        
+        if not self._uses_journal():
+            return self._save_data(entry.data)
+        
+        try:
+            header = None
+            if not self.journal_path.exists() or self.journal_path.stat().st_size == 0:
+                header = {"generation": entry.data.get(JOURNAL_GENERATION_KEY, 0)}
+            codec = get_codec()
+            content = b"".join(codec.dumps(record, compact=True) + b"\n" for record in records)
+            if header is not None:
+                content = codec.dumps(header, compact=True) + b"\n" + content
+            with repository_metrics.timed(self.get_collection_name(), "append"):
+                with open(self.journal_path, 'ab') as f:
+                    f.write(content)
+            repository_metrics.add_bytes_written(self.get_collection_name(), len(content))
+            collection_cache.store(self.file_path, entry.data, self._watched_files())
+        except Exception as e:
+            print(f"Error appending to journal of {self.filename}: {e}")
+            collection_cache.invalidate(self.file_path)
+            return False
+        
+        if self.journal_path.stat().st_size >= settings.JOURNAL_COMPACT_BYTES:
+            self.compact()
+        return True
+    
+    def compact(self) -> bool:
+        """Fold the journal into the JSON file and start a new, empty journal"""
+        # Batched records must reach the journal before it is folded and truncated
+        write_behind_queue.flush(self.file_path)
+        with self._file_lock():
+            entry = self._cached()
+            with entry.lock:
+                return self._compact(entry)
+    
+    def _compact(self, entry: CachedCollection) -> bool:
+        """Fold the journal of a locked, current cache entry"""
+        if not self.journal_path.exists():
+            return True
+        
+        generation = entry.data.get(JOURNAL_GENERATION_KEY, 0) + 1
+        entry.data[JOURNAL_GENERATION_KEY] = generation
+        if not self._save_data(entry.data):
+            return False
+        
+        # The file now has a newer generation than the old journal, so a crash
+        # before this truncation still replays correctly (the journal is skipped)
+        with open(self.journal_path, 'wb') as f:
+            f.write(get_codec().dumps({"generation": generation}, compact=True) + b"\n")
+        collection_cache.store(self.file_path, entry.data, self._watched_files())
+        return True
+    
     @abstractmethod
     def get_collection_name(self) -> str:
         """Return the collection name for this repository"""
         pass
     
+    def _collection(self, entry: CachedCollection) -> List[Dict[str, Any]]:
+        """Get the collection list inside a cached file, creating it if missing"""
+        return entry.data.setdefault(self.get_collection_name(), [])
+    
+    def _primary_index(self, entry: CachedCollection) -> PrimaryKeyIndex:
+        """Get the id index for a cached file, building it once per load"""
+        index = entry.indexes.get('id')
+        if index is None:
+            with entry.lock:
+                index = entry.indexes.get('id')
+                if index is None:
+                    index = PrimaryKeyIndex(self._collection(entry))
+                    entry.indexes['id'] = index
+        return index
+    
+    def _secondary_indexes(self, entry: CachedCollection) -> Dict[IndexFields, SecondaryIndex]:
+        """Get the declared field indexes for a cached file, building them once per load"""
+        indexes = entry.indexes.get('fields')
+        if indexes is None:
+            with entry.lock:
+                indexes = entry.indexes.get('fields')
+                if indexes is None:
+                    collection = self._collection(entry)
+                    indexes = {}
+                    for fields in self.unique_fields:
+                        key = normalize_fields(fields)
+                        indexes[key] = SecondaryIndex(key, unique=True).build(collection)
+                    for fields in self.indexed_fields:
+                        key = normalize_fields(fields)
+                        if key not in indexes:
+                            indexes[key] = SecondaryIndex(key).build(collection)
+                    entry.indexes['fields'] = indexes
+        return indexes
+    
+    def _matches(self, item: Dict[str, Any], fields: IndexFields, value: Any) -> bool:
+        """Check a row against a field (or compound) value without an index"""
+        if len(fields) == 1:
+            return normalize_value(item.get(fields[0])) == normalize_value(value)
+        return all(
+            normalize_value(item.get(field)) == normalize_value(part)
+            for field, part in zip(fields, value)
+        )
+    
+    # Lookups: the underscored helpers return the cached rows themselves and are only
+    # for use inside the repositories; public finders hand out copies.
+    def _rows(self) -> List[Dict[str, Any]]:
+        """Cached rows of the collection"""
+        return self._cached().data.get(self.get_collection_name(), [])
+    
+    def _scan(self) -> Iterator[Dict[str, Any]]:
+        """Every row, streamed from the file when possible, otherwise from the cache"""
+        if self._can_stream():
+            yield from self._stream()
+        else:
+            yield from list(self._rows())
+    
+    def _field_index(self, key: IndexFields) -> Optional[SecondaryIndex]:
+        """Declared index over key, if any"""
+        return self._secondary_indexes(self._cached()).get(key)
+    
+    def _find_by_field(self, key: IndexFields, value: Any) -> List[Dict[str, Any]]:
+        index = self._field_index(key)
+        if index is not None:
+            return index.find(value)
+        return [item for item in repository_metrics.counted(self._scan()) if self._matches(item, key, value)]
+    
+    def _find_by_field_in(self, key: IndexFields, values: Iterable[Any]) -> List[Dict[str, Any]]:
+        index = self._field_index(key)
+        if index is not None:
+            return index.find_in(values)
+        values = list(values)
+        return [
+            item for item in repository_metrics.counted(self._scan())
+            if any(self._matches(item, key, value) for value in values)
+        ]
+    
+    def find_by_field(self, fields: Union[str, Tuple[str, ...]], value: Any) -> List[Dict[str, Any]]:
+        """Find items whose field (or compound of fields) equals value, using an index if declared"""
+        return clone(self._find_by_field(normalize_fields(fields), value))
+    
+    def find_one_by_field(self, fields: Union[str, Tuple[str, ...]], value: Any) -> Optional[Dict[str, Any]]:
+        """Find the first item whose field (or compound of fields) equals value"""
+        key = normalize_fields(fields)
+        index = self._field_index(key)
+        if index is not None:
+            return clone(index.find_one(value))
+        return clone(next((item for item in repository_metrics.counted(self._scan())
+                           if self._matches(item, key, value)), None))
+    
+    def find_by_field_in(self, fields: Union[str, Tuple[str, ...]], values: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Find items whose field (or compound of fields) is one of values"""
+        return clone(self._find_by_field_in(normalize_fields(fields), values))
+    
     def find_all(self) -> List[Dict[str, Any]]:
         """Get all items from collection"""
-        data = self._load_data()
-        return data.get(self.get_collection_name(), [])
+        return clone(self._rows())
+    
+    def _can_stream(self) -> bool:
+        """Whether rows can be read straight from the file instead of the cache"""
+        if not self._uses_jsonl() or collection_cache.peek(self.file_path) is not None:
+            return False
+        # Journaled changes only exist once replayed into memory
+        return not (self._uses_journal() and self.journal_path.exists()
+                    and self.journal_path.stat().st_size > 0)
+    
+    def iter_all(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over every item
+
+        With JSONL files that are not already cached, rows are streamed from disk
+        one line at a time so memory stays bounded regardless of collection size.
+        """
+        if not self._can_stream():
+            for item in list(self._rows()):
+                yield clone(item)
+            return
+        yield from self._stream()
+    
+    def _stream(self) -> Iterator[Dict[str, Any]]:
+        """Parse the rows of a JSONL file one line at a time"""
+        codec = get_codec()
+        with open(self.file_path, 'rb') as f:
+            first = True
+            for line in f:
+                if not line.strip():
+                    continue
+                item = codec.loads(line)
+                if first and len(item) == 1 and JSONL_METADATA_KEY in item:
+                    first = False
+                    continue
+                first = False
+                yield item
+    
+    def iter_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> Iterator[Dict[str, Any]]:
+        """Iterate over the items matching predicate"""
+        return (clone(item) for item in self._scan_where(predicate))
+    
+    def _scan_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> Iterator[Dict[str, Any]]:
+        return (item for item in repository_metrics.counted(self._scan()) if predicate(item))
+    
+    def _query_index(self, where: Where) -> Optional[IndexFields]:
+        """Pick the declared index covering the most conditions of where, if any"""
+        best = None
+        for fields in list(self.unique_fields) + list(self.indexed_fields):
+            key = normalize_fields(fields)
+            if all(field in where for field in key) and (best is None or len(key) > len(best)):
+                best = key
+        return best
+    
+    def _filtered(self, where: Optional[Where]) -> Iterable[Dict[str, Any]]:
+        """Rows matching where, narrowed through an index when one applies"""
+        if not where:
+            return repository_metrics.counted(self._scan())
+        
+        key = self._query_index(where)
+        if key is None:
+            return self._scan_where(compile_where(where))
+        
+        choices = []
+        for field in key:
+            expected = where[field]
+            choices.append(sorted(expected, key=repr) if is_membership(expected) else [expected])
+        values = list(itertools.product(*choices))
+        if len(key) == 1:
+            values = [value[0] for value in values]
+        candidates = self._find_by_field_in(key, values)
+        
+        rest = {field: value for field, value in where.items() if field not in key}
+        if not rest:
+            return candidates
+        matches = compile_where(rest)
+        return [item for item in candidates if matches(item)]
+    
+    def query(self, where: Optional[Where] = None, order_by: Optional[OrderBy] = None,
+              limit: Optional[int] = None, offset: int = 0,
+              fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Filter, order, slice and project the collection
+
+        where maps fields to a value (equality) or to a set of values (membership).
+        order_by takes field names, prefixed with "-" for descending order.
+        Only the rows in the requested page are projected into new dicts.
+        """
+        rows = self._filtered(where)
+        ordering = parse_order_by(order_by)
+        if ordering:
+            rows = order_rows(rows, ordering, None if limit is None else offset + limit)
+        return [clone(project(item, fields)) for item in page(rows, offset, limit)]
+    
+    def count(self, where: Optional[Where] = None) -> int:
+        """Number of items matching where"""
+        if not where:
+            return len(self._rows())
+        return sum(1 for _ in self._filtered(where))
     
     def find_by_id(self, item_id: str) -> Optional[Dict[str, Any]]:
         """Find item by ID"""
-        items = self.find_all()
-        return next((item for item in items if str(item.get('id')) == str(item_id)), None)
+        return clone(self._primary_index(self._cached()).get(item_id))
+    
+    def _check_unique(self, entry: CachedCollection,
+                      changes: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]) -> None:
+        """Raise UniqueConstraintError before writing changes that would duplicate a unique field
+
+        changes holds (row as it will be written, cached row it replaces or None).
+        """
+        for field_index in self._secondary_indexes(entry).values():
+            field_index.check(changes)
+    
+    def _update_changes(self, entry: CachedCollection, updates: Dict[str, Dict[str, Any]]
+                        ) -> List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+        """(updated row, cached row) for every id of updates that exists"""
+        index = self._primary_index(entry)
+        changes = []
+        for item_id, item_updates in updates.items():
+            item = index.get(item_id)
+            if item is not None:
+                changes.append(({**item, **item_updates}, item))
+        return changes
+    
+    def _apply_create(self, entry: CachedCollection, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Append a copy of a row to the cached collection and its indexes, returning the journal record"""
+        self._check_unique(entry, [(item, None)])
+        item = clone(item)
+        collection = self._collection(entry)
+        index = self._primary_index(entry)
+        field_indexes = self._secondary_indexes(entry).values()
+        collection.append(item)
+        index.add(item, len(collection) - 1)
+        for field_index in field_indexes:
+            field_index.add(item)
+        return {"op": "create", "item": item}
+    
+    def _apply_update(self, entry: CachedCollection, item_id: str,
+                      updates: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Update a cached row and its indexes, returning (item, journal record) or None if missing"""
+        index = self._primary_index(entry)
+        item = index.get(item_id)
+        if item is None:
+            return None
+        self._check_unique(entry, [({**item, **updates}, item)])
+        updates = clone(updates)
+        
+        field_indexes = self._secondary_indexes(entry).values()
+        old_keys = [(field_index, field_index.key_for(item)) for field_index in field_indexes]
+        item.update(updates)
+        index.rekey(item_id, item)
+        for field_index, old_key in old_keys:
+            field_index.move(item, old_key)
+        return item, {"op": "update", "id": item_id, "updates": updates}
+    
+    def _apply_delete(self, entry: CachedCollection, item_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a cached row and unindex it, returning the journal record (None if missing)"""
+        collection = self._collection(entry)
+        index = self._primary_index(entry)
+        position = index.position(item_id)
+        if position is None:
+            return None
+        
+        removed = collection.pop(position)
+        index.remove_at(collection, position, removed)
+        for field_index in self._secondary_indexes(entry).values():
+            field_index.remove(removed)
+        return {"op": "delete", "id": item_id}
+    
+    def _stamp(self, entry: CachedCollection) -> Dict[str, Any]:
+        """Advance the collection version, returning the journal record for it"""
+        version = entry.data.get(VERSION_KEY, 0) + 1
+        modified_at = time.time()
+        change_feed.expect(self.get_collection_name(), version)
+        entry.data[VERSION_KEY] = version
+        entry.data[MODIFIED_AT_KEY] = modified_at
+        return {"op": "version", "version": version, "modified_at": modified_at}
+    
+    def _mutate(self, work: Callable[[CachedCollection], Tuple[Any, List[Dict[str, Any]]]]) -> Any:
+        """Run a read-modify-write under the cross-process lock
+
+        work(entry) applies mutations to the freshly validated cache entry and returns
+        (result, journal records). If another process wrote the file without the lock,
+        the stale entry is dropped and the mutations are applied again on the new data.
+        Subscribers are notified once the write is done and the locks are released.
+        """
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            with self._file_lock():
+                entry = self._cached()
+                with entry.lock:
+                    result, records = work(entry)
+                    if not records:
+                        return result
+                    stamp = self._stamp(entry)
+                    try:
+                        self._persist(entry, records + [stamp])
+                    except ConcurrentModificationError as e:
+                        print(f"Retrying write to {self.filename}: {e}")
+                        collection_cache.invalidate(self.file_path)
+                        continue
+            change_feed.publish(ChangeEvent(
+                self.get_collection_name(), stamp["version"], stamp["modified_at"], records
+            ))
+            return result
+        raise ConcurrentModificationError(f"Could not write {self.filename} after {MAX_WRITE_ATTEMPTS} attempts")
+    
+    def version(self) -> int:
+        """Monotonic counter advanced by every write to the collection, from any process"""
+        return self._cached().data.get(VERSION_KEY, 0)
+    
+    def last_modified(self) -> Optional[datetime]:
+        """Time of the last write to the collection, if it was ever written"""
+        modified_at = self._cached().data.get(MODIFIED_AT_KEY)
+        return datetime.fromtimestamp(modified_at) if modified_at is not None else None
+    
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Call callback with a ChangeEvent after every change; returns an unsubscribe function"""
+        return change_feed.subscribe(callback, self.get_collection_name())
     
     def create(self, item: Dict[str, Any]) -> Dict[str, Any]:
         """Create new item"""
-        data = self._load_data()
-        collection = data.get(self.get_collection_name(), [])
-        collection.append(item)
-        data[self.get_collection_name()] = collection
-        self._save_data(data)
-        return item
+        return self._mutate(lambda entry: (item, [self._apply_create(entry, item)]))
     
     def update(self, item_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update item by ID"""
-        data = self._load_data()
-        collection = data.get(self.get_collection_name(), [])
-        
-        for i, item in enumerate(collection):
-            if str(item.get('id')) == str(item_id):
-                collection[i].update(updates)
-                data[self.get_collection_name()] = collection
-                self._save_data(data)
-                return collection[i]
-        return None
+        def work(entry: CachedCollection) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+            applied = self._apply_update(entry, item_id, updates)
+            if applied is None:
+                return None, []
+            item, record = applied
+            return clone(item), [record]
+        return self._mutate(work)
     
     def delete(self, item_id: str) -> bool:
         """Delete item by ID"""
-        data = self._load_data()
-        collection = data.get(self.get_collection_name(), [])
-        
-        for i, item in enumerate(collection):
-            if str(item.get('id')) == str(item_id):
-                del collection[i]
-                data[self.get_collection_name()] = collection
-                self._save_data(data)
-                return True
-        return False
\ No newline at end of file
+        def work(entry: CachedCollection) -> Tuple[bool, List[Dict[str, Any]]]:
+            record = self._apply_delete(entry, item_id)
+            return record is not None, [record] if record is not None else []
+        return self._mutate(work)
+    
+    # Bulk API: apply every mutation in memory, then write to disk once
+    def create_many(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create several items with a single write; nothing is written if one of them is rejected"""
+        def work(entry: CachedCollection) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+            self._check_unique(entry, [(item, None) for item in items])
+            return items, [self._apply_create(entry, item) for item in items]
+        return self._mutate(work)
+    
+    def update_many(self, updates: Dict[str, Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Update several items by ID with a single write
+
+        Returns the updated item, or None for ids that were not found, in input order.
+        """
+        def work(entry: CachedCollection) -> Tuple[List[Optional[Dict[str, Any]]], List[Dict[str, Any]]]:
+            self._check_unique(entry, self._update_changes(entry, updates))
+            results: List[Optional[Dict[str, Any]]] = []
+            records = []
+            for item_id, item_updates in updates.items():
+                applied = self._apply_update(entry, item_id, item_updates)
+                if applied is None:
+                    results.append(None)
+                    continue
+                item, record = applied
+                records.append(record)
+                results.append(clone(item))
+            return results, records
+        return self._mutate(work)
+    
+    def delete_many(self, item_ids: List[str]) -> List[bool]:
+        """Delete several items by ID with a single write, returning whether each was found"""
+        def work(entry: CachedCollection) -> Tuple[List[bool], List[Dict[str, Any]]]:
+            results: List[bool] = []
+            records = []
+            for item_id in item_ids:
+                record = self._apply_delete(entry, item_id)
+                results.append(record is not None)
+                if record is not None:
+                    records.append(record)
+            return results, records
+        return self._mutate(work)
+    
+    # Async API: reads served from the in-memory cache run inline, anything that may
+    # touch the disk runs on the bounded I/O thread pool.
+    def _can_read_inline(self) -> bool:
+        """Whether a read can be answered from memory without parsing or writing files
+
+        A cached entry older than the files on disk would be reloaded by the read,
+        so only an entry whose signature still matches counts.
+        """
+        return collection_cache.is_current(self.file_path, self._watched_files())
+    
+    async def _read_async(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a read method inline on a cache hit, otherwise on the I/O pool"""
+        if self._can_read_inline():
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        # The copied context carries open metrics captures over to the pool thread
+        return await loop.run_in_executor(_io_executor, functools.partial(contextvars.copy_context().run, func, *args))
+    
+    async def _write_async(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a write method on the I/O pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_io_executor, functools.partial(contextvars.copy_context().run, func, *args))
+    
+    async def afind_all(self) -> List[Dict[str, Any]]:
+        """Async variant of find_all"""
+        return await self._read_async(self.find_all)
+    
+    async def afind_by_id(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Async variant of find_by_id"""
+        return await self._read_async(self.find_by_id, item_id)
+    
+    async def afind_by_field(self, fields: Union[str, Tuple[str, ...]], value: Any) -> List[Dict[str, Any]]:
+        """Async variant of find_by_field"""
+        return await self._read_async(self.find_by_field, fields, value)
+    
+    async def afind_one_by_field(self, fields: Union[str, Tuple[str, ...]], value: Any) -> Optional[Dict[str, Any]]:
+        """Async variant of find_one_by_field"""
+        return await self._read_async(self.find_one_by_field, fields, value)
+    
+    async def afind_by_field_in(self, fields: Union[str, Tuple[str, ...]], values: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Async variant of find_by_field_in"""
+        return await self._read_async(self.find_by_field_in, fields, list(values))
+    
+    async def aquery(self, where: Optional[Where] = None, order_by: Optional[OrderBy] = None,
+                     limit: Optional[int] = None, offset: int = 0,
+                     fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Async variant of query"""
+        return await self._read_async(self.query, where, order_by, limit, offset, fields)
+    
+    async def acount(self, where: Optional[Where] = None) -> int:
+        """Async variant of count"""
+        return await self._read_async(self.count, where)
+    
+    async def aversion(self) -> int:
+        """Async variant of version"""
+        return await self._read_async(self.version)
+    
+    async def acreate(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of create"""
+        return await self._write_async(self.create, item)
+    
+    async def aupdate(self, item_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Async variant of update"""
+        return await self._write_async(self.update, item_id, updates)
+    
+    async def adelete(self, item_id: str) -> bool:
+        """Async variant of delete"""
+        return await self._write_async(self.delete, item_id)
+    
+    async def acreate_many(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Async variant of create_many"""
+        return await self._write_async(self.create_many, items)
+    
+    async def aupdate_many(self, updates: Dict[str, Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Async variant of update_many"""
+        return await self._write_async(self.update_many, updates)
+    
+    async def adelete_many(self, item_ids: List[str]) -> List[bool]:
+        """Async variant of delete_many"""
+        return await self._write_async(self.delete_many, item_ids)
+
+instrument_class(BaseRepository)
+
+class CollectionRepository(BaseRepository):
+    """Repository for any data file without a dedicated class, used by maintenance tools"""
+    
+    def __init__(self, filename: str, file_format: Optional[str] = None):
+        super().__init__(filename, file_format)
+        if self.journal_path.exists():
+            self.storage_mode = "journal"
+    
+    def get_collection_name(self) -> str:
+        return self.filename
@@ -0,0 +1,96 @@
+"""
+Change notifications for repository collections
+"""
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+class ChangeEvent:
+    """One change to a collection
+
+    records holds the mutations ({"op": "create" | "update" | "delete", ...}) when
+    the change was made by this process, or None when it was detected on reload
+    (another worker or an external edit), in which case anything derived from the
+    collection should be treated as stale.
+    """
+
+    def __init__(self, collection: str, version: int, modified_at: Optional[float],
+                 records: Optional[List[Dict[str, Any]]]):
+        self.collection = collection
+        self.version = version
+        self.modified_at = modified_at
+        self.records = records
+
+    @property
+    def modified_datetime(self) -> Optional[datetime]:
+        return datetime.fromtimestamp(self.modified_at) if self.modified_at is not None else None
+
+    def changed_ids(self) -> Optional[List[Any]]:
+        """Ids touched by the change, or None if unknown"""
+        if self.records is None:
+            return None
+        ids = []
+        for record in self.records:
+            if record['op'] == 'create':
+                ids.append(record['item'].get('id'))
+            elif 'id' in record:
+                ids.append(record['id'])
+        return ids
+
+    def __repr__(self) -> str:
+        return f"ChangeEvent({self.collection!r}, version={self.version})"
+
+Subscriber = Callable[[ChangeEvent], None]
+
+class ChangeFeed:
+    """Dispatches ChangeEvents to subscribers of one collection or of every collection"""
+
+    def __init__(self):
+        self._subscribers: Dict[Optional[str], List[Subscriber]] = {}
+        self._seen_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Subscriber, collection: Optional[str] = None) -> Callable[[], None]:
+        """Call callback after every change (of collection, or of any collection if None)
+
+        Returns a function that removes the subscription.
+        """
+        with self._lock:
+            self._subscribers.setdefault(collection, []).append(callback)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                callbacks = self._subscribers.get(collection, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+        return unsubscribe
+
+    def publish(self, event: ChangeEvent) -> None:
+        """Notify subscribers; a failing subscriber does not affect the others or the write"""
+        with self._lock:
+            callbacks = self._subscribers.get(event.collection, []) + self._subscribers.get(None, [])
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in change subscriber for {event.collection}: {e}")
+
+    def expect(self, collection: str, version: int) -> None:
+        """Record a version this process is about to write, so reads of it are not reported as external"""
+        with self._lock:
+            self._seen_versions[collection] = version
+
+    def observe(self, collection: str, version: int, modified_at: Optional[float]) -> None:
+        """Record the version a read saw, publishing an event if it moved without a local write"""
+        seen = self._seen_versions.get(collection)
+        if seen == version:
+            return
+        with self._lock:
+            seen = self._seen_versions.get(collection)
+            self._seen_versions[collection] = version
+        # The first observation is the starting point, not a change
+        if seen is not None and seen != version:
+            self.publish(ChangeEvent(collection, version, modified_at, None))
+
+# Global instance shared by every repository in the process
+change_feed = ChangeFeed()
@@ -0,0 +1,75 @@
+"""
+JSON codecs used by the repositories to read and write data files
+"""
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib codec is always available
+    orjson = None
+
+class JsonCodec(ABC):
+    """Serializes repository documents to and from UTF-8 JSON bytes"""
+
+    name = ""
+
+    @abstractmethod
+    def loads(self, raw: bytes) -> Any:
+        """Parse a JSON document; raises ValueError on malformed input"""
+        pass
+
+    @abstractmethod
+    def dumps(self, data: Any, compact: bool = False) -> bytes:
+        """Serialize data; compact drops indentation and whitespace"""
+        pass
+
+class StdlibJsonCodec(JsonCodec):
+    """Codec built on the standard library json module"""
+
+    name = "json"
+
+    def loads(self, raw: bytes) -> Any:
+        return json.loads(raw)
+
+    def dumps(self, data: Any, compact: bool = False) -> bytes:
+        if compact:
+            text = json.dumps(data, ensure_ascii=False, default=str, separators=(",", ":"))
+        else:
+            text = json.dumps(data, indent=2, ensure_ascii=False, default=str)
+        return text.encode("utf-8")
+
+class OrjsonCodec(JsonCodec):
+    """Codec built on orjson
+
+    Documents have the same structure and indentation as StdlibJsonCodec and each codec
+    reads the other's files, but some floats are spelled differently (1e20, not 1e+20),
+    so the files are not byte-identical.
+    """
+
+    name = "orjson"
+
+    def loads(self, raw: bytes) -> Any:
+        return orjson.loads(raw)
+
+    def dumps(self, data: Any, compact: bool = False) -> bytes:
+        # Pass datetimes to default=str so they serialize exactly like the stdlib codec
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if not compact:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=str, option=option)
+
+_codecs = {"json": StdlibJsonCodec()}
+if orjson is not None:
+    _codecs["orjson"] = OrjsonCodec()
+
+def get_codec(name: Optional[str] = None) -> JsonCodec:
+    """Return a codec by name; "auto" prefers orjson when it is installed"""
+    name = name or settings.REPOSITORY_JSON_CODEC
+    if name == "auto":
+        return _codecs.get("orjson", _codecs["json"])
+    if name not in _codecs:
+        raise ValueError(f"JSON codec '{name}' is not available")
+    return _codecs[name]
@@ -0,0 +1,113 @@
+"""
+Process-wide cache of parsed JSON collections
+"""
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+Signature = Optional[Tuple[int, int, int]]
+
+def file_signature(path: Path) -> Signature:
+    """Return (inode, mtime_ns, size) for a file, or None if it does not exist
+
+    Atomic writes replace the file, so the inode changes on every rewrite even when
+    the size and coarse filesystem timestamps do not.
+    """
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def files_signature(paths: Sequence[Path]) -> Tuple[Signature, ...]:
+    """Combined signature of every file that makes up one collection"""
+    return tuple(file_signature(path) for path in paths)
+
+def clone(value: Any) -> Any:
+    """Deep copy of parsed JSON data (dicts, lists and scalars)
+
+    Rows handed out by the repositories are copies, so callers can change them
+    without touching the cached collection shared by every request.
+    """
+    if isinstance(value, dict):
+        return {key: clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [clone(item) for item in value]
+    return value
+
+class CachedCollection:
+    """Parsed file contents together with the signature they were read at"""
+
+    def __init__(self, data: Dict[str, Any], signature: Optional[Tuple[Signature, ...]]):
+        self.data = data
+        self.signature = signature
+        self.lock = threading.RLock()
+        # Lookup structures derived from data, rebuilt whenever the file is reloaded
+        self.indexes: Dict[str, Any] = {}
+
+class CollectionCache:
+    """Keeps parsed data files in memory and reloads them only when they change on disk"""
+
+    def __init__(self):
+        self._entries: Dict[Path, CachedCollection] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: Path, loader: Callable[[], Dict[str, Any]],
+            watched: Optional[Sequence[Path]] = None) -> CachedCollection:
+        """Return the cached entry for a file, reloading it if it changed on disk
+
+        watched lists every file the loader reads (defaults to just path).
+        """
+        with self._lock:
+            signature = files_signature(watched or [path])
+            entry = self._entries.get(path)
+            if entry is not None and entry.signature == signature:
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+            entry = CachedCollection(loader(), signature)
+            self._entries[path] = entry
+            return entry
+
+    def peek(self, path: Path) -> Optional[CachedCollection]:
+        """Return the cached entry for a file without checking the disk"""
+        return self._entries.get(path)
+
+    def is_current(self, path: Path, watched: Optional[Sequence[Path]] = None) -> bool:
+        """Whether the cached entry for a file matches what is on disk now (stats only, never parses)"""
+        entry = self._entries.get(path)
+        return entry is not None and entry.signature == files_signature(watched or [path])
+
+    def store(self, path: Path, data: Dict[str, Any],
+              watched: Optional[Sequence[Path]] = None) -> CachedCollection:
+        """Record data this process just wrote so the next read is a hit"""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry.data is not data:
+                entry = CachedCollection(data, None)
+                self._entries[path] = entry
+            entry.signature = files_signature(watched or [path])
+            return entry
+
+    def invalidate(self, path: Optional[Path] = None) -> None:
+        """Drop one cached file, or every cached file if no path is given"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of cached files"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries)
+            }
+
+# Global instance shared by every repository in the process
+collection_cache = CollectionCache()
@@ -2,11 +2,13 @@
 Course module repository for JSON operations
 """
 from typing import List, Optional, Dict, Any
-from .base_repository import BaseRepository
+from .backends import backend_for
 
-class CourseModuleRepository(BaseRepository):
+class CourseModuleRepository(backend_for("course_modules")):
     """Repository for course module operations"""
     
+    indexed_fields = ("course_id",)
+    
     def __init__(self):
         super().__init__("course_modules")
     
@@ -15,8 +17,11 @@ class CourseModuleRepository(BaseRepository):
     
     def find_by_course_id(self, course_id: str) -> List[Dict[str, Any]]:
         """Find modules by course ID"""
-        modules = self.find_all()
-        return [module for module in modules if module.get('course_id') == course_id]
+        return self.find_by_field("course_id", course_id)
+    
+    async def afind_by_course_id(self, course_id: str) -> List[Dict[str, Any]]:
+        """Async variant of find_by_course_id"""
+        return await self._read_async(self.find_by_course_id, course_id)
     
     def find_completed_by_course(self, course_id: str) -> List[Dict[str, Any]]:
         """Find completed modules by course ID"""
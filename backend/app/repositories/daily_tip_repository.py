@@ -2,11 +2,13 @@
 Daily tip repository for JSON operations
 """
 from typing import List, Optional, Dict, Any
-from .base_repository import BaseRepository
+from .backends import RepositoryBackend
 
-class DailyTipRepository(BaseRepository):
+class DailyTipRepository(RepositoryBackend):
     """Repository for daily tip operations"""
     
+    indexed_fields = ("category",)
+    
     def __init__(self):
         super().__init__("daily_tips")
     
@@ -15,14 +17,17 @@ class DailyTipRepository(BaseRepository):
     
     def find_by_category(self, category: str) -> List[Dict[str, Any]]:
         """Find tips by category"""
-        tips = self.find_all()
-        return [tip for tip in tips if tip.get('category') == category]
+        return self.find_by_field("category", category)
     
     def get_random_tip(self) -> Optional[Dict[str, Any]]:
         """Get a random tip"""
         import random
         tips = self.find_all()
         return random.choice(tips) if tips else None
+    
+    async def aget_random_tip(self) -> Optional[Dict[str, Any]]:
+        """Async variant of get_random_tip"""
+        return await self._read_async(self.get_random_tip)
 
 # Global instance
 daily_tip_repository = DailyTipRepository()
\ No newline at end of file
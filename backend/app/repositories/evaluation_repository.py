@@ -0,0 +1,53 @@
+"""
+Evaluation session and result repositories for JSON operations
+"""
+from typing import List, Dict, Any
+from .backends import RepositoryBackend
+from .sqlite_repository import SQLiteRepository
+
+class EvaluationSessionRepository(SQLiteRepository):
+    """Repository for in-flight diagnostic evaluation sessions
+
+    Always kept in SQLite, whatever the backend of the other collections: a
+    session changes on every answer, and SQLite rewrites only its row instead of
+    making every worker reload the whole collection.
+    """
+
+    indexed_fields = ("user_id",)
+
+    def __init__(self):
+        super().__init__("evaluation_sessions")
+
+    def get_collection_name(self) -> str:
+        return "evaluation_sessions"
+
+class EvaluationResultRepository(RepositoryBackend):
+    """Repository for saved diagnostic evaluation results"""
+
+    indexed_fields = ("user_id", "session_id")
+
+    def __init__(self):
+        super().__init__("evaluation_results")
+
+    def get_collection_name(self) -> str:
+        return "evaluation_results"
+
+    def find_by_user(self, user_id: str) -> List[Dict[str, Any]]:
+        """Find results by user ID"""
+        return self.find_by_field("user_id", user_id)
+
+    async def afind_by_user(self, user_id: str) -> List[Dict[str, Any]]:
+        """Async variant of find_by_user"""
+        return await self._read_async(self.find_by_user, user_id)
+
+    def find_by_session_ids(self, session_ids: List[str]) -> List[Dict[str, Any]]:
+        """Find the results saved for any of the sessions"""
+        return self.find_by_field_in("session_id", session_ids)
+
+    async def afind_by_session_ids(self, session_ids: List[str]) -> List[Dict[str, Any]]:
+        """Async variant of find_by_session_ids"""
+        return await self._read_async(self.find_by_session_ids, session_ids)
+
+# Global instances
+evaluation_session_repository = EvaluationSessionRepository()
+evaluation_result_repository = EvaluationResultRepository()
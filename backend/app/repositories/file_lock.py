@@ -0,0 +1,64 @@
+"""
+Cross-process advisory locks guarding read-modify-write of data files
+"""
+import threading
+from pathlib import Path
+from typing import Dict, IO, Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; writers then rely on the optimistic signature check
+    fcntl = None
+
+class InterProcessLock:
+    """Exclusive lock held across processes through flock on a lock file
+
+    Re-entrant within a thread, and shared by the threads of a process through
+    an RLock, so nested calls (a write that triggers a compaction) never deadlock.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file: Optional[IO[bytes]] = None
+
+    def acquire(self) -> None:
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                self._file = open(self.path, 'ab')
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            except Exception:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._lock.release()
+                raise
+        self._depth += 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+    def __enter__(self) -> 'InterProcessLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+_locks: Dict[Path, InterProcessLock] = {}
+_locks_guard = threading.Lock()
+
+def lock_for(path: Path) -> InterProcessLock:
+    """The process-wide lock object for a lock file path"""
+    with _locks_guard:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = InterProcessLock(path)
+        return lock
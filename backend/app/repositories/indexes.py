@@ -0,0 +1,169 @@
+"""
+In-memory hash indexes maintained over cached collections
+"""
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+class PrimaryKeyIndex:
+    """id -> row and id -> position lookup over a collection list"""
+
+    def __init__(self, items: List[Dict[str, Any]]):
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.positions: Dict[str, int] = {}
+        for position, item in enumerate(items):
+            self.add(item, position)
+
+    @staticmethod
+    def key(item_id: Any) -> str:
+        """Normalize ids the same way the repositories compare them"""
+        return str(item_id)
+
+    def get(self, item_id: Any) -> Optional[Dict[str, Any]]:
+        """Return the row with this id, if any"""
+        return self.rows.get(self.key(item_id))
+
+    def position(self, item_id: Any) -> Optional[int]:
+        """Return the list position of the row with this id, if any"""
+        return self.positions.get(self.key(item_id))
+
+    def add(self, item: Dict[str, Any], position: int) -> None:
+        """Index a row; the first row wins when ids are duplicated"""
+        key = self.key(item.get('id'))
+        if key not in self.rows:
+            self.rows[key] = item
+            self.positions[key] = position
+
+    def rekey(self, old_id: Any, item: Dict[str, Any]) -> None:
+        """Move a row whose id was changed by an update"""
+        old_key = self.key(old_id)
+        new_key = self.key(item.get('id'))
+        if old_key == new_key or self.rows.get(old_key) is not item:
+            return
+        position = self.positions.pop(old_key)
+        del self.rows[old_key]
+        self.rows[new_key] = item
+        self.positions[new_key] = position
+
+    def remove_at(self, items: List[Dict[str, Any]], position: int, removed: Dict[str, Any]) -> None:
+        """Unindex a row that was just deleted from items at position"""
+        removed_key = self.key(removed.get('id'))
+        if self.rows.get(removed_key) is removed:
+            del self.rows[removed_key]
+            del self.positions[removed_key]
+
+        # Shift the rows after the deleted one and promote a duplicate id if there is one
+        for new_position in range(position, len(items)):
+            key = self.key(items[new_position].get('id'))
+            if key == removed_key and key not in self.rows:
+                self.rows[key] = items[new_position]
+                self.positions[key] = new_position
+            elif self.positions.get(key) == new_position + 1:
+                self.positions[key] = new_position
+
+IndexFields = Tuple[str, ...]
+
+def normalize_fields(fields: Union[str, Sequence[str]]) -> IndexFields:
+    """Turn a field name or a sequence of field names into an index key"""
+    if isinstance(fields, str):
+        return (fields,)
+    return tuple(fields)
+
+def normalize_value(value: Any) -> Any:
+    """Index enum members under their value so 'basic' and DifficultyLevel.BASIC match"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+class UniqueConstraintError(ValueError):
+    """A write would give two rows the same value of a unique field"""
+
+def _is_missing(key: Any) -> bool:
+    # Rows without a value are never considered duplicates of each other
+    return key is None or (isinstance(key, tuple) and all(part is None for part in key))
+
+class SecondaryIndex:
+    """Hash index from one field (or a compound of fields) to the rows holding that value"""
+
+    def __init__(self, fields: IndexFields, unique: bool = False):
+        self.fields = fields
+        self.unique = unique
+        # Buckets are keyed by row identity so rows without ids or with duplicate ids still index
+        self.buckets: Dict[Any, Dict[int, Dict[str, Any]]] = {}
+
+    def build(self, items: List[Dict[str, Any]]) -> 'SecondaryIndex':
+        """Index every row of a collection"""
+        for item in items:
+            self.add(item)
+        return self
+
+    def key_for(self, item: Dict[str, Any]) -> Any:
+        """Extract this index's key from a row"""
+        if len(self.fields) == 1:
+            return normalize_value(item.get(self.fields[0]))
+        return tuple(normalize_value(item.get(field)) for field in self.fields)
+
+    def lookup_key(self, value: Any) -> Any:
+        """Normalize a lookup value the same way row keys are normalized"""
+        if len(self.fields) == 1:
+            return normalize_value(value)
+        return tuple(normalize_value(part) for part in value)
+
+    def add(self, item: Dict[str, Any]) -> None:
+        """Index a row under its current key"""
+        self.buckets.setdefault(self.key_for(item), {})[id(item)] = item
+
+    def remove(self, item: Dict[str, Any], key: Any = None) -> None:
+        """Unindex a row, using key if the row has already been changed"""
+        key = self.key_for(item) if key is None else key
+        bucket = self.buckets.get(key)
+        if bucket is not None:
+            bucket.pop(id(item), None)
+            if not bucket:
+                del self.buckets[key]
+
+    def check(self, changes: Iterable[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]) -> None:
+        """Raise UniqueConstraintError if writing changes would duplicate a key of a unique index
+
+        changes holds (row as it will be written, row it replaces or None for a new row).
+        Loading a file never checks, so existing duplicates stay readable.
+        """
+        if not self.unique:
+            return
+        claimed: Dict[Any, Optional[Dict[str, Any]]] = {}
+        for new, current in changes:
+            key = self.key_for(new)
+            if _is_missing(key):
+                continue
+            holders = [row for row in self.buckets.get(key, {}).values() if row is not current]
+            if holders or (key in claimed and claimed[key] is not current):
+                raise UniqueConstraintError(f"Duplicate value for unique field {', '.join(self.fields)}: {key!r}")
+            claimed[key] = current if current is not None else new
+
+    def move(self, item: Dict[str, Any], old_key: Any) -> None:
+        """Re-index a row whose indexed fields were updated"""
+        if self.key_for(item) != old_key:
+            self.remove(item, old_key)
+            self.add(item)
+
+    def find(self, value: Any) -> List[Dict[str, Any]]:
+        """Return every row whose key equals value"""
+        return list(self.buckets.get(self.lookup_key(value), {}).values())
+
+    def find_one(self, value: Any) -> Optional[Dict[str, Any]]:
+        """Return the first row whose key equals value"""
+        bucket = self.buckets.get(self.lookup_key(value))
+        return next(iter(bucket.values()), None) if bucket else None
+
+    def find_in(self, values: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Return every row whose key is one of values"""
+        results: List[Dict[str, Any]] = []
+        seen = set()
+        for value in values:
+            key = self.lookup_key(value)
+            if key in seen:
+                continue
+            seen.add(key)
+            results.extend(self.buckets.get(key, {}).values())
+        return results
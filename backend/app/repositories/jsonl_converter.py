@@ -0,0 +1,37 @@
+"""
+Convert data files between the JSON and JSONL repository file formats
+
+Usage (from the backend directory):
+    python -m app.repositories.jsonl_converter --to jsonl [collection ...]
+"""
+import argparse
+from typing import Dict, List, Optional
+from .base_repository import CollectionRepository, FILE_SUFFIXES, data_directory
+
+def convert_collection(name: str, to_format: str) -> int:
+    """Write collection name in to_format next to its current file; returns the row count
+
+    The source file and any journal are left untouched, so the journal keeps
+    applying on top of the converted base file.
+    """
+    source_format = "json" if to_format == "jsonl" else "jsonl"
+    data = CollectionRepository(name, source_format)._load_data()
+    target = CollectionRepository(name, to_format)
+    target.file_path.write_bytes(target._encode_file(data))
+    return len(data.get(name, []))
+
+def convert_all(to_format: str, names: Optional[List[str]] = None) -> Dict[str, int]:
+    """Convert every collection (or just names) to to_format"""
+    source_suffix = FILE_SUFFIXES["json" if to_format == "jsonl" else "jsonl"]
+    if not names:
+        names = [path.stem for path in sorted(data_directory().glob(f"*{source_suffix}"))]
+    return {name: convert_collection(name, to_format) for name in names}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--to", choices=sorted(FILE_SUFFIXES), required=True)
+    parser.add_argument("collections", nargs="*")
+    args = parser.parse_args()
+
+    for collection, count in convert_all(args.to, args.collections).items():
+        print(f"{collection}: {count} rows written as {args.to}")
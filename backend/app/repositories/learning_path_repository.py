@@ -2,11 +2,13 @@
 Learning path repository for JSON operations
 """
 from typing import List, Optional, Dict, Any
-from .base_repository import BaseRepository
+from .backends import backend_for
 
-class LearningPathRepository(BaseRepository):
+class LearningPathRepository(backend_for("learning_paths")):
     """Repository for learning path operations"""
     
+    indexed_fields = ("difficulty", "category")
+    
     def __init__(self):
         super().__init__("learning_paths")
     
@@ -15,13 +17,15 @@ class LearningPathRepository(BaseRepository):
     
     def find_by_difficulty(self, difficulty: str) -> List[Dict[str, Any]]:
         """Find learning paths by difficulty"""
-        paths = self.find_all()
-        return [path for path in paths if path.get('difficulty') == difficulty]
+        return self.find_by_field("difficulty", difficulty)
+    
+    async def afind_by_difficulty(self, difficulty: str) -> List[Dict[str, Any]]:
+        """Async variant of find_by_difficulty"""
+        return await self._read_async(self.find_by_difficulty, difficulty)
     
     def find_by_category(self, category: str) -> List[Dict[str, Any]]:
         """Find learning paths by category"""
-        paths = self.find_all()
-        return [path for path in paths if path.get('category') == category]
+        return self.find_by_field("category", category)
     
     def find_popular(self) -> List[Dict[str, Any]]:
         """Find popular learning paths"""
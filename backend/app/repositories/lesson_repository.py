@@ -2,11 +2,13 @@
 Lesson repository for JSON operations
 """
 from typing import List, Optional, Dict, Any
-from .base_repository import BaseRepository
+from .backends import backend_for
 
-class LessonRepository(BaseRepository):
+class LessonRepository(backend_for("lessons")):
     """Repository for lesson operations"""
     
+    indexed_fields = ("module_id", "type")
+    
     def __init__(self):
         super().__init__("lessons")
     
@@ -15,18 +17,32 @@ class LessonRepository(BaseRepository):
     
     def find_by_module_id(self, module_id: str) -> List[Dict[str, Any]]:
         """Find lessons by module ID"""
-        lessons = self.find_all()
-        return [lesson for lesson in lessons if lesson.get('module_id') == module_id]
+        return self.find_by_field("module_id", module_id)
+    
+    async def afind_by_module_id(self, module_id: str) -> List[Dict[str, Any]]:
+        """Async variant of find_by_module_id"""
+        return await self._read_async(self.find_by_module_id, module_id)
+    
+    def find_by_module_ids(self, module_ids: List[str]) -> List[Dict[str, Any]]:
+        """Find the lessons of several modules with a single lookup"""
+        return self.find_by_field_in("module_id", module_ids)
+    
+    async def afind_by_module_ids(self, module_ids: List[str]) -> List[Dict[str, Any]]:
+        """Async variant of find_by_module_ids"""
+        return await self._read_async(self.find_by_module_ids, module_ids)
     
     def find_by_type(self, lesson_type: str) -> List[Dict[str, Any]]:
         """Find lessons by type"""
-        lessons = self.find_all()
-        return [lesson for lesson in lessons if lesson.get('type') == lesson_type]
+        return self.find_by_field("type", lesson_type)
     
     def mark_completed(self, lesson_id: str) -> bool:
         """Mark lesson as completed"""
         return self.update(lesson_id, {"is_completed": True}) is not None
     
+    async def amark_completed(self, lesson_id: str) -> bool:
+        """Async variant of mark_completed"""
+        return await self._write_async(self.mark_completed, lesson_id)
+    
     def unlock_lesson(self, lesson_id: str) -> bool:
         """Unlock lesson"""
         return self.update(lesson_id, {"is_locked": False}) is not None
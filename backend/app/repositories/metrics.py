@@ -0,0 +1,283 @@
+"""
+Per-collection instrumentation of repository operations
+"""
+import contextvars
+import functools
+import math
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.core.config import settings
+
+# Latency samples kept per collection and operation for percentiles
+SAMPLE_SIZE = 1024
+
+# Public BaseRepository methods timed as operations (generators and async wrappers are not;
+# their work is recorded by the calls they make)
+INSTRUMENTED_METHODS = (
+    "find_all", "find_by_id", "find_by_field", "find_one_by_field", "find_by_field_in",
+    "query", "count", "create", "update", "update_if", "delete", "create_many", "update_many", "delete_many"
+)
+
+# Operations timed around file (or SQL) I/O rather than called by services
+IO_OPERATIONS = ("load", "save", "append")
+
+class OperationStats:
+    """Call count, cumulative time and recent latencies of one operation"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples: Deque[float] = deque(maxlen=SAMPLE_SIZE)
+
+    def add(self, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.samples.append(elapsed_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def percentile(fraction: float) -> float:
+            if not ordered:
+                return 0.0
+            # Nearest-rank percentile
+            return round(ordered[max(0, math.ceil(fraction * len(ordered)) - 1)], 3)
+
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max_ms, 3)
+        }
+
+class CollectionStats:
+    """Everything recorded for one collection"""
+
+    def __init__(self):
+        self.operations: Dict[str, OperationStats] = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.rows_scanned = 0
+        self.rows_returned = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "operations": {name: stats.to_dict() for name, stats in sorted(self.operations.items())},
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "rows_scanned": self.rows_scanned,
+            "rows_returned": self.rows_returned
+        }
+
+class OperationCapture:
+    """Repository calls made while a capture block is active
+
+    Every call made by the code under test is counted, whether it was served
+    from the cache or not; the I/O behind them ("load", "save", "append") is
+    counted apart. Calls a repository makes to itself or to its shards are not
+    counted again.
+    """
+
+    def __init__(self, collection: Optional[str] = None):
+        self.collection = collection
+        self.operations: Counter = Counter()
+
+    def add(self, collection: str, operation: str) -> None:
+        if self.collection is None or self.collection == collection:
+            self.operations[(collection, operation)] += 1
+
+    @property
+    def loads(self) -> int:
+        """Number of times data was read from disk (file loads or SQL queries)"""
+        return self.calls(operation="load")
+
+    def calls(self, collection: Optional[str] = None, operation: Optional[str] = None) -> int:
+        """Number of repository calls, optionally only those to one collection and/or operation"""
+        return sum(
+            count for (name, op), count in self.operations.items()
+            if (collection is None or name == collection)
+            and (op == operation if operation is not None else op not in IO_OPERATIONS)
+        )
+
+    def __str__(self) -> str:
+        return ", ".join(f"{name}.{op} x{count}" for (name, op), count in sorted(self.operations.items()))
+
+# Captures open in the current context; async reads run on the I/O pool with a copy of it,
+# so concurrent requests (or tests) only see their own calls
+_captures: contextvars.ContextVar[Tuple[OperationCapture, ...]] = contextvars.ContextVar(
+    "repository_captures", default=()
+)
+
+class RepositoryMetrics:
+    """Process-wide registry of repository timings, I/O volume and scan counts"""
+
+    def __init__(self):
+        self._collections: Dict[str, CollectionStats] = {}
+        self._lock = threading.Lock()
+        # Stack of open operations per thread, so scans are credited to the call that made them
+        self._local = threading.local()
+
+    def _frames(self) -> List[List[Any]]:
+        frames = getattr(self._local, 'frames', None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+    @property
+    def enabled(self) -> bool:
+        return settings.ENABLE_REPOSITORY_METRICS
+
+    @property
+    def active(self) -> bool:
+        """Whether operations must be tracked: metrics are enabled or a capture is open"""
+        return settings.ENABLE_REPOSITORY_METRICS or bool(_captures.get())
+
+    def _stats(self, collection: str) -> CollectionStats:
+        stats = self._collections.get(collection)
+        if stats is None:
+            stats = self._collections.setdefault(collection, CollectionStats())
+        return stats
+
+    def record(self, collection: str, operation: str, elapsed_ms: float,
+               scanned: int = 0, returned: int = 0, nested: bool = False) -> None:
+        """Record one completed operation (nested: made by another repository operation)"""
+        if not nested:
+            for capture in _captures.get():
+                capture.add(collection, operation)
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stats(collection)
+            operation_stats = stats.operations.get(operation)
+            if operation_stats is None:
+                operation_stats = stats.operations[operation] = OperationStats()
+            operation_stats.add(elapsed_ms)
+            stats.rows_scanned += scanned
+            stats.rows_returned += returned
+
+    def add_bytes_read(self, collection: str, count: int) -> None:
+        if self.enabled:
+            with self._lock:
+                self._stats(collection).bytes_read += count
+
+    def add_bytes_written(self, collection: str, count: int) -> None:
+        if self.enabled:
+            with self._lock:
+                self._stats(collection).bytes_written += count
+
+    def add_scanned(self, count: int) -> None:
+        """Credit rows examined to the outermost operation running on this thread"""
+        frames = getattr(self._local, 'frames', None)
+        if frames:
+            frames[0][1] += count
+
+    def counted(self, rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Pass rows through, crediting each one as scanned"""
+        for row in rows:
+            self.add_scanned(1)
+            yield row
+
+    @contextmanager
+    def timed(self, collection: str, operation: str) -> Iterator[None]:
+        """Time a block as one operation (used for loads, saves and journal appends)"""
+        if not self.active:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(collection, operation, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current metrics of every collection"""
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in sorted(self._collections.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._collections.clear()
+
+    @contextmanager
+    def capture(self, collection: Optional[str] = None) -> Iterator[OperationCapture]:
+        """Count the repository calls made inside the block (by this task and the I/O it awaits)
+
+            with repository_metrics.capture() as calls:
+                await learning_service.get_course_content("basic-programming")
+            assert calls.calls("lessons") == 1
+        """
+        capture = OperationCapture(collection)
+        token = _captures.set(_captures.get() + (capture,))
+        try:
+            yield capture
+        finally:
+            _captures.reset(token)
+
+    @contextmanager
+    def max_calls(self, limit: int, collection: Optional[str] = None,
+                  operation: Optional[str] = None) -> Iterator[OperationCapture]:
+        """Fail with AssertionError if the block makes more than limit matching calls"""
+        with self.capture() as capture:
+            yield capture
+        count = capture.calls(collection, operation)
+        if count > limit:
+            raise AssertionError(f"Expected at most {limit} calls, got {count} ({capture})")
+
+def _returned_rows(result: Any) -> int:
+    if isinstance(result, list):
+        return sum(1 for row in result if row is not None and row is not False)
+    return 1 if isinstance(result, dict) else 0
+
+def instrumented(operation: str, method: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a repository method so each call is timed and its rows counted
+
+    A call made while the same operation on the same collection is running (an
+    override calling super(), a sharded repository calling its shard) is not
+    recorded again. Rows are counted once, by the outermost operation.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+        metrics = repository_metrics
+        if not metrics.active:
+            return method(self, *args, **kwargs)
+        collection = self.get_collection_name()
+        frames = metrics._frames()
+        if frames and frames[-1][0] == (collection, operation):
+            return method(self, *args, **kwargs)
+
+        outermost = not frames
+        frame: List[Any] = [(collection, operation), 0]
+        frames.append(frame)
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            frames.pop()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if outermost:
+            returned = _returned_rows(result)
+            # Index lookups examine only the rows they return
+            metrics.record(collection, operation, elapsed_ms, frame[1] or returned, returned)
+        else:
+            metrics.record(collection, operation, elapsed_ms, nested=True)
+        return result
+    wrapper.__instrumented__ = True
+    return wrapper
+
+def instrument_class(cls: type) -> None:
+    """Wrap the instrumented methods a repository class defines itself"""
+    for name in INSTRUMENTED_METHODS:
+        method = cls.__dict__.get(name)
+        if callable(method) and not getattr(method, '__instrumented__', False):
+            setattr(cls, name, instrumented(name, method))
+
+# Global instance shared by every repository in the process
+repository_metrics = RepositoryMetrics()
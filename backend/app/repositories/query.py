@@ -0,0 +1,69 @@
+"""
+Filtering, ordering and projection helpers behind BaseRepository.query
+"""
+import heapq
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from .indexes import normalize_value
+
+Where = Dict[str, Any]
+OrderBy = Union[str, Sequence[str]]
+
+def is_membership(value: Any) -> bool:
+    """A set (or frozenset) condition means "field is one of these values" """
+    return isinstance(value, (set, frozenset))
+
+def parse_order_by(order_by: Optional[OrderBy]) -> List[Tuple[str, bool]]:
+    """Turn "field" / "-field" (or a sequence of them) into (field, descending) pairs"""
+    if not order_by:
+        return []
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    return [(key[1:], True) if key.startswith("-") else (key, False) for key in order_by]
+
+def compile_where(where: Optional[Where]) -> Callable[[Dict[str, Any]], bool]:
+    """Build a row predicate from field -> value (equality) or field -> set (membership)"""
+    conditions = []
+    for field, expected in (where or {}).items():
+        if is_membership(expected):
+            conditions.append((field, True, {normalize_value(value) for value in expected}))
+        else:
+            conditions.append((field, False, normalize_value(expected)))
+
+    def matches(item: Dict[str, Any]) -> bool:
+        for field, membership, expected in conditions:
+            value = normalize_value(item.get(field))
+            if (value not in expected) if membership else (value != expected):
+                return False
+        return True
+    return matches
+
+def _sort_value(value: Any) -> Tuple[bool, Any]:
+    # Missing values sort after every present value
+    return (value is None, normalize_value(value))
+
+def order_rows(rows: Iterable[Dict[str, Any]], order_by: List[Tuple[str, bool]],
+               keep: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Stable sort of rows; only the first keep rows are returned (and fully ordered)"""
+    directions = {descending for _, descending in order_by}
+    if keep is not None and len(directions) == 1:
+        # Single direction: a bounded heap avoids sorting rows that are never returned
+        fields = [field for field, _ in order_by]
+        key = lambda item: tuple(_sort_value(item.get(field)) for field in fields)
+        select = heapq.nlargest if directions.pop() else heapq.nsmallest
+        return select(keep, rows, key=key)
+
+    rows = list(rows)
+    for field, descending in reversed(order_by):
+        rows.sort(key=lambda item: _sort_value(item.get(field)), reverse=descending)
+    return rows if keep is None else rows[:keep]
+
+def page(rows: Iterable[Dict[str, Any]], offset: int, limit: Optional[int]) -> Iterable[Dict[str, Any]]:
+    """Slice rows lazily"""
+    return islice(rows, offset, None if limit is None else offset + limit)
+
+def project(item: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Copy only the requested fields of a row (the row itself when fields is None)"""
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
@@ -2,11 +2,13 @@
 Question repository for JSON operations
 """
 from typing import List, Optional, Dict, Any
-from .base_repository import BaseRepository
+from .backends import backend_for
 
-class QuestionRepository(BaseRepository):
+class QuestionRepository(backend_for("questions")):
     """Repository for question operations"""
     
+    indexed_fields = ("difficulty", "topic", ("difficulty", "topic"))
+    
     def __init__(self):
         super().__init__("questions")
     
@@ -15,23 +17,28 @@ class QuestionRepository(BaseRepository):
     
     def find_by_difficulty(self, difficulty: str) -> List[Dict[str, Any]]:
         """Find questions by difficulty"""
-        questions = self.find_all()
-        return [q for q in questions if q.get('difficulty') == difficulty]
+        return self.find_by_field("difficulty", difficulty)
+    
+    async def afind_by_difficulty(self, difficulty: str) -> List[Dict[str, Any]]:
+        """Async variant of find_by_difficulty"""
+        return await self._read_async(self.find_by_difficulty, difficulty)
     
     def find_by_topic(self, topic: str) -> List[Dict[str, Any]]:
         """Find questions by topic"""
-        questions = self.find_all()
-        return [q for q in questions if q.get('topic') == topic]
+        return self.find_by_field("topic", topic)
+    
+    def find_by_difficulty_and_topic(self, difficulty: str, topic: str) -> List[Dict[str, Any]]:
+        """Find questions by difficulty and topic"""
+        return self.find_by_field(("difficulty", "topic"), (difficulty, topic))
     
     def find_adaptive(self, difficulty_levels: List[str], exclude_ids: List[int] = None) -> List[Dict[str, Any]]:
         """Find questions for adaptive testing"""
-        questions = self.find_all()
-        exclude_ids = exclude_ids or []
+        questions = self.find_by_field_in("difficulty", difficulty_levels)
+        exclude_ids = set(exclude_ids or [])
         
         filtered = [
             q for q in questions 
-            if q.get('difficulty') in difficulty_levels 
-            and q.get('id') not in exclude_ids
+            if q.get('id') not in exclude_ids
         ]
         return filtered
 
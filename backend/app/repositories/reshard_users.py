@@ -0,0 +1,109 @@
+"""
+Move users between the single users.json file and N hash-partitioned shards
+
+Run it with the server stopped, then set USER_SHARDS to the new count.
+
+Usage (from the backend directory):
+    python -m app.repositories.reshard_users --shards 8
+    python -m app.repositories.reshard_users --shards 0   # back to users.json
+"""
+import argparse
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+from .user_repository import SHARD_DIRECTORY, ShardFile, ShardedUserRepository, UserRepository, shard_of
+
+def load_users() -> List[Dict[str, Any]]:
+    """Every user in the current layout: the shard files if they exist, otherwise users.json"""
+    manifest = ShardFile(f"{SHARD_DIRECTORY}/manifest", "manifest")
+    written = manifest.find_by_id("shards") if manifest.file_path.exists() else None
+    if written is not None:
+        return ShardedUserRepository(written['value']).find_all()
+    return _single_file().find_all()
+
+def _single_file() -> UserRepository:
+    """The users.json repository, also replaying a journal left by journal mode"""
+    users_file = UserRepository()
+    if users_file.journal_path.exists():
+        users_file.storage_mode = "journal"
+    return users_file
+
+def _next_id(users: List[Dict[str, Any]]) -> int:
+    return max([int(user['id']) for user in users if str(user.get('id', '')).isdigit()], default=0)
+
+def write_shards(users: List[Dict[str, Any]], shard_count: int, directory: str) -> None:
+    """Write a complete sharded layout (users, email index and manifest) into directory"""
+    repository = ShardedUserRepository(shard_count, directory)
+    user_groups: List[List[Dict[str, Any]]] = [[] for _ in range(shard_count)]
+    email_groups: List[List[Dict[str, Any]]] = [[] for _ in range(shard_count)]
+    for user in users:
+        user_groups[shard_of(user.get('id'), shard_count)].append(user)
+        if user.get('email') is not None:
+            email_groups[shard_of(user['email'], shard_count)].append({"id": user['email'], "user_id": user.get('id')})
+
+    for shard, group in zip(repository.shards, user_groups):
+        shard._save_data({shard.get_collection_name(): group})
+    for shard, group in zip(repository.email_shards, email_groups):
+        shard._save_data({shard.get_collection_name(): group})
+    repository.manifest._save_data({"manifest": [
+        {"id": "shards", "value": shard_count},
+        {"id": "next_id", "value": _next_id(users)}
+    ]})
+
+def _backup_path(path: Path, stamp: int) -> Path:
+    """A backup name for path that no earlier backup uses"""
+    backup = path.with_name(f"{path.stem}.backup-{stamp}{path.suffix}")
+    attempt = 1
+    while backup.exists():
+        backup = path.with_name(f"{path.stem}.backup-{stamp}-{attempt}{path.suffix}")
+        attempt += 1
+    return backup
+
+def _move_aside(path: Path, stamp: int) -> None:
+    """Rename a file to a new backup name, if it exists"""
+    if path.exists():
+        path.rename(_backup_path(path, stamp))
+
+def reshard(shard_count: int) -> int:
+    """Rewrite every user into the new layout, keeping the old one as a backup; returns the user count"""
+    users = load_users()
+    data_dir = UserRepository().data_dir
+    shard_dir = data_dir / SHARD_DIRECTORY
+    stamp = int(time.time())
+    backup_dir = _backup_path(shard_dir, stamp)
+
+    if shard_count == 0:
+        users_file = UserRepository()
+        # The old file and its journal are kept as backups; a journal left in place
+        # would be replayed over the new file, which starts again at generation 0
+        _move_aside(users_file.file_path, stamp)
+        _move_aside(users_file.journal_path, stamp)
+        users_file._save_data({users_file.get_collection_name(): users})
+        if shard_dir.exists():
+            shard_dir.rename(backup_dir)
+        return len(users)
+
+    staging = f"{SHARD_DIRECTORY}.reshard"
+    if (data_dir / staging).exists():
+        shutil.rmtree(data_dir / staging)
+    write_shards(users, shard_count, staging)
+    if shard_dir.exists():
+        shard_dir.rename(backup_dir)
+    (data_dir / staging).rename(shard_dir)
+    # users.json would otherwise be served, stale, if USER_SHARDS went back to 0
+    users_file = UserRepository()
+    _move_aside(users_file.file_path, stamp)
+    _move_aside(users_file.journal_path, stamp)
+    return len(users)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shards", type=int, required=True, help="Number of shards, 0 for a single users.json")
+    args = parser.parse_args()
+    if args.shards < 0:
+        parser.error("--shards must be 0 or more")
+
+    count = reshard(args.shards)
+    print(f"{count} users written to {args.shards or 'a single users.json'} {'shards' if args.shards else ''}".rstrip())
+    print(f"Set USER_SHARDS={args.shards} before starting the server")
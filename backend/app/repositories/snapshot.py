@@ -0,0 +1,394 @@
+"""
+Memory-mapped binary snapshots of read-mostly catalog collections
+
+A snapshot file holds a fixed header, an offset table and the packed JSON
+records of one collection, followed by a small metadata section and one
+sorted lookup table per index (id and declared fields). Workers mmap the
+file, so every process shares the page cache copy; lookups binary search the
+tables in place and records are decoded only when they are read.
+
+Usage (from the backend directory):
+    python -m app.repositories.snapshot [collection ...]
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from .base_repository import BaseRepository, MODIFIED_AT_KEY, VERSION_KEY
+from .codecs import get_codec
+from .collection_cache import Signature, file_signature, files_signature
+from .indexes import IndexFields, SecondaryIndex, normalize_fields
+from .metrics import repository_metrics
+from .write_behind import write_behind_queue
+
+MAGIC = b"CPTSNAP2"
+# magic, record count, metadata offset/length
+HEADER = struct.Struct("<8sIQQ")
+OFFSET = struct.Struct("<Q")
+OFFSET_PAIR = struct.Struct("<QQ")
+# key offset, key length, positions offset, positions count (offsets are absolute)
+INDEX_ENTRY = struct.Struct("<QIQI")
+POSITION = struct.Struct("<I")
+
+ID_INDEX = "id"
+CATALOG_COLLECTIONS = ("questions", "lessons", "course_modules", "learning_paths")
+
+def _encode_key(key: Tuple[Any, ...]) -> bytes:
+    """Stable binary form of a normalized index key"""
+    return json.dumps(list(key), ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+def _lookup_key(fields: IndexFields, value: Any) -> bytes:
+    key = SecondaryIndex(fields).lookup_key(value)
+    return _encode_key(key if len(fields) > 1 else (key,))
+
+def _index_name(fields: IndexFields) -> str:
+    return ",".join(fields)
+
+def source_digest(paths: Sequence[Path]) -> str:
+    """Hash of the contents of the files a collection is loaded from
+
+    Copying, touching or restoring a file leaves the digest unchanged; any edit,
+    including one that does not advance the version counter, changes it.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        part = hashlib.sha256()
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    part.update(chunk)
+        except FileNotFoundError:
+            digest.update(b"-")
+            continue
+        digest.update(part.digest())
+    return digest.hexdigest()
+
+def _pack_index(keys: Dict[bytes, List[int]], offset: int) -> bytes:
+    """Entry table sorted by key, then the key bytes, then the positions"""
+    ordered = sorted(keys.items())
+    key_offset = offset + INDEX_ENTRY.size * len(ordered)
+    positions_offset = key_offset + sum(len(key) for key, _ in ordered)
+    entries, key_bytes, positions = [], [], []
+    for key, key_positions in ordered:
+        entries.append(INDEX_ENTRY.pack(key_offset, len(key), positions_offset, len(key_positions)))
+        key_bytes.append(key)
+        positions.append(struct.pack(f"<{len(key_positions)}I", *key_positions))
+        key_offset += len(key)
+        positions_offset += POSITION.size * len(key_positions)
+    return b"".join(entries + key_bytes + positions)
+
+class SnapshotFile:
+    """Read-only view over a memory-mapped snapshot"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.signature = file_signature(path)
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, meta_offset, meta_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        self.metadata = json.loads(self._mmap[meta_offset:meta_offset + meta_length])
+        # index name -> (entry table offset, entry count)
+        self._indexes: Dict[str, List[int]] = self.metadata["indexes"]
+        # (source signature, whether the source digest matched) of the last check
+        self.checked: Optional[Tuple[Tuple[Signature, ...], bool]] = None
+
+    def record(self, position: int) -> Dict[str, Any]:
+        """Decode one record; nothing is kept, so every call returns a new dict"""
+        start, end = OFFSET_PAIR.unpack_from(self._mmap, HEADER.size + OFFSET.size * position)
+        repository_metrics.add_bytes_read(self.path.stem, end - start)
+        return get_codec().loads(self._mmap[start:end])
+
+    def records(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        return [self.record(position) for position in positions]
+
+    def _lookup(self, name: str, key: bytes) -> Tuple[int, ...]:
+        """Binary search an index table for key; returns the matching positions"""
+        offset, count = self._indexes[name]
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            key_offset, key_length, _, _ = INDEX_ENTRY.unpack_from(self._mmap, offset + INDEX_ENTRY.size * middle)
+            if self._mmap[key_offset:key_offset + key_length] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == count:
+            return ()
+        key_offset, key_length, positions_offset, positions_count = \
+            INDEX_ENTRY.unpack_from(self._mmap, offset + INDEX_ENTRY.size * low)
+        if self._mmap[key_offset:key_offset + key_length] != key:
+            return ()
+        return struct.unpack_from(f"<{positions_count}I", self._mmap, positions_offset)
+
+    def position(self, item_id: Any) -> Optional[int]:
+        """List position of the first record with this id"""
+        positions = self._lookup(ID_INDEX, str(item_id).encode("utf-8"))
+        return positions[0] if positions else None
+
+    def has_index(self, fields: IndexFields) -> bool:
+        """Whether the snapshot was built with an index over fields"""
+        return _index_name(fields) in self._indexes
+
+    def positions(self, fields: IndexFields, value: Any) -> Optional[Tuple[int, ...]]:
+        """Positions of the records whose key equals value, or None if fields is not indexed"""
+        if not self.has_index(fields):
+            return None
+        return self._lookup(_index_name(fields), _lookup_key(fields, value))
+
+class _SnapshotRegistry:
+    """Open snapshots per path, reopened when the file is rebuilt"""
+
+    def __init__(self):
+        self._snapshots: Dict[Path, SnapshotFile] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> Optional[SnapshotFile]:
+        signature = file_signature(path)
+        snapshot = self._snapshots.get(path)
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+
+        with self._lock:
+            self._snapshots.pop(path, None)
+            if signature is None:
+                return None
+            try:
+                snapshot = SnapshotFile(path)
+            except (OSError, ValueError, KeyError, struct.error) as e:
+                print(f"Error opening snapshot {path}: {e}")
+                return None
+            self._snapshots[path] = snapshot
+            return snapshot
+
+_snapshots = _SnapshotRegistry()
+
+class SnapshotRepository(BaseRepository):
+    """Repository that serves reads from a snapshot while it matches the JSON source
+
+    Writes still go to the JSON file; once the source content changes the snapshot
+    is stale and reads fall back to the regular cached path until it is rebuilt.
+    Snapshot records are decoded on every read, so they are handed out without copying.
+    """
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self.file_path.with_suffix(".snapshot")
+
+    def _snapshot(self, verify: bool = True) -> Optional[SnapshotFile]:
+        """The snapshot for this collection, if it is current
+
+        The source files are only hashed again when their signature changes; with
+        verify=False an unchecked signature counts as stale instead of being hashed.
+        """
+        snapshot = _snapshots.get(self.snapshot_path)
+        if snapshot is None or write_behind_queue.has_pending(self.file_path):
+            return None
+        paths = self._watched_files()
+        # Taken before hashing, so a write racing the check is caught by the next one
+        signature = files_signature(paths)
+        checked = snapshot.checked
+        if checked is None or checked[0] != signature:
+            if not verify:
+                return None
+            checked = snapshot.checked = (signature, source_digest(paths) == snapshot.metadata.get("source"))
+        return snapshot if checked[1] else None
+
+    def version(self) -> int:
+        """Monotonic counter advanced by every write to the collection"""
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return super().version()
+        return snapshot.metadata.get("version", 0)
+
+    def last_modified(self) -> Optional[datetime]:
+        """Time of the last write to the collection, if it was ever written"""
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return super().last_modified()
+        modified_at = snapshot.metadata.get("modified_at")
+        return datetime.fromtimestamp(modified_at) if modified_at is not None else None
+
+    def _rows(self) -> List[Dict[str, Any]]:
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return super()._rows()
+        return snapshot.records(range(snapshot.count))
+
+    def _scan(self) -> Iterator[Dict[str, Any]]:
+        snapshot = self._snapshot()
+        if snapshot is None:
+            yield from super()._scan()
+            return
+        for position in range(snapshot.count):
+            yield snapshot.record(position)
+
+    def find_all(self) -> List[Dict[str, Any]]:
+        """Get all items from collection"""
+        if self._snapshot() is None:
+            return super().find_all()
+        return self._rows()
+
+    def iter_all(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over every item, decoding records as they are reached"""
+        if self._snapshot() is None:
+            yield from super().iter_all()
+            return
+        yield from self._scan()
+
+    def find_by_id(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Find item by ID"""
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return super().find_by_id(item_id)
+        position = snapshot.position(item_id)
+        return snapshot.record(position) if position is not None else None
+
+    def find_by_field(self, fields: Union[str, Tuple[str, ...]], value: Any) -> List[Dict[str, Any]]:
+        """Find items whose field (or compound of fields) equals value, using an index if declared"""
+        if self._snapshot() is None:
+            return super().find_by_field(fields, value)
+        return self._find_by_field(normalize_fields(fields), value)
+
+    def _find_by_field(self, key: IndexFields, value: Any) -> List[Dict[str, Any]]:
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return super()._find_by_field(key, value)
+        positions = snapshot.positions(key, value)
+        if positions is None:
+            return [item for item in self._scan() if self._matches(item, key, value)]
+        return snapshot.records(positions)
+
+    def find_one_by_field(self, fields: Union[str, Tuple[str, ...]], value: Any) -> Optional[Dict[str, Any]]:
+        """Find the first item whose field (or compound of fields) equals value"""
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return super().find_one_by_field(fields, value)
+        key = normalize_fields(fields)
+        positions = snapshot.positions(key, value)
+        if positions is None:
+            return next((item for item in self._scan() if self._matches(item, key, value)), None)
+        return snapshot.record(positions[0]) if positions else None
+
+    def find_by_field_in(self, fields: Union[str, Tuple[str, ...]], values: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Find items whose field (or compound of fields) is one of values"""
+        if self._snapshot() is None:
+            return super().find_by_field_in(fields, values)
+        return self._find_by_field_in(normalize_fields(fields), values)
+
+    def _find_by_field_in(self, key: IndexFields, values: Iterable[Any]) -> List[Dict[str, Any]]:
+        snapshot = self._snapshot()
+        if snapshot is None:
+            return super()._find_by_field_in(key, values)
+        values = list(values)
+        if not snapshot.has_index(key):
+            return [
+                item for item in self._scan()
+                if any(self._matches(item, key, value) for value in values)
+            ]
+        results: List[Dict[str, Any]] = []
+        seen = set()
+        for value in values:
+            lookup = _lookup_key(key, value)
+            if lookup in seen:
+                continue
+            seen.add(lookup)
+            results.extend(snapshot.records(snapshot.positions(key, value)))
+        return results
+
+    def count(self, where: Optional[Dict[str, Any]] = None) -> int:
+        """Number of items matching where"""
+        snapshot = self._snapshot()
+        if snapshot is not None and not where:
+            return snapshot.count
+        return super().count(where)
+
+    def _can_read_inline(self) -> bool:
+        """Reads of an already verified snapshot only touch mapped pages"""
+        return self._snapshot(verify=False) is not None or super()._can_read_inline()
+
+def build_snapshot(repository: BaseRepository) -> int:
+    """Compile the current JSON state of a repository into its snapshot file; returns the row count"""
+    # Hashed before reading, so a write racing the build leaves the snapshot stale rather than wrong
+    digest = source_digest(repository._watched_files())
+    data = repository._load_state()
+    items = data.get(repository.get_collection_name(), [])
+
+    codec = get_codec()
+    records = [codec.dumps(item, compact=True) for item in items]
+    index_keys: Dict[str, Dict[bytes, List[int]]] = {ID_INDEX: {}}
+    fields_by_name: Dict[str, IndexFields] = {}
+    for fields in list(repository.unique_fields) + list(repository.indexed_fields):
+        key = normalize_fields(fields)
+        fields_by_name[_index_name(key)] = key
+        index_keys.setdefault(_index_name(key), {})
+    for position, item in enumerate(items):
+        index_keys[ID_INDEX].setdefault(str(item.get('id')).encode("utf-8"), [position])
+        for name, key in fields_by_name.items():
+            value = SecondaryIndex(key).key_for(item)
+            index_keys[name].setdefault(_encode_key(value if len(key) > 1 else (value,)), []).append(position)
+
+    records_offset = HEADER.size + OFFSET.size * (len(records) + 1)
+    offsets = [records_offset]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+
+    # The index tables follow the records; the metadata that locates them comes last
+    indexes: Dict[str, List[int]] = {}
+    sections = []
+    offset = offsets[-1]
+    for name, keys in index_keys.items():
+        indexes[name] = [offset, len(keys)]
+        section = _pack_index(keys, offset)
+        sections.append(section)
+        offset += len(section)
+    metadata = json.dumps({
+        "source": digest,
+        "version": data.get(VERSION_KEY, 0),
+        "modified_at": data.get(MODIFIED_AT_KEY),
+        "indexes": indexes
+    }).encode("utf-8")
+
+    path = repository.file_path.with_suffix(".snapshot")
+    temp_path = path.with_suffix(".snapshot.tmp")
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(records), offset, len(metadata)))
+        f.write(b"".join(OFFSET.pack(record_offset) for record_offset in offsets))
+        f.write(b"".join(records))
+        f.write(b"".join(sections))
+        f.write(metadata)
+    # Replacing keeps already mapped snapshots valid in running workers
+    os.replace(temp_path, path)
+    return len(records)
+
+def _catalog_repositories() -> Dict[str, BaseRepository]:
+    from .question_repository import question_repository
+    from .lesson_repository import lesson_repository
+    from .course_module_repository import course_module_repository
+    from .learning_path_repository import learning_path_repository
+    return {
+        repository.get_collection_name(): repository
+        for repository in (question_repository, lesson_repository,
+                           course_module_repository, learning_path_repository)
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("collections", nargs="*", help=", ".join(CATALOG_COLLECTIONS))
+    args = parser.parse_args()
+
+    repositories = _catalog_repositories()
+    unknown = set(args.collections) - set(repositories)
+    if unknown:
+        parser.error(f"not a catalog collection: {', '.join(sorted(unknown))}")
+    for collection in args.collections or CATALOG_COLLECTIONS:
+        count = build_snapshot(repositories[collection])
+        print(f"{collection}: {count} rows written to {repositories[collection].file_path.with_suffix('.snapshot')}")
@@ -0,0 +1,467 @@
+"""
+SQLite-backed repository implementing the BaseRepository contract
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Callable, Iterable, Iterator, Sequence, Tuple, Union
+from app.core.config import settings
+from .base_repository import BaseRepository, CollectionRepository, FILE_SUFFIXES, data_directory
+from .change_feed import ChangeEvent, change_feed
+from .codecs import get_codec
+from .metrics import repository_metrics
+from .indexes import IndexFields, UniqueConstraintError, normalize_fields, normalize_value
+from .query import OrderBy, Where, is_membership, parse_order_by, project
+
+_FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_SCALARS = (str, int, float, bool, type(None))
+# Version and last-modified time of every collection table
+_VERSIONS_TABLE = "_collection_versions"
+
+def _database_path() -> Path:
+    """Location of the SQLite database file"""
+    path = Path(settings.SQLITE_DATABASE_PATH)
+    if not path.is_absolute():
+        path = Path(__file__).parent.parent.parent / path
+    return path
+
+class _ConnectionPool:
+    """One SQLite connection per thread and process, opened in WAL mode"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get(self, path: Path) -> sqlite3.Connection:
+        connections = getattr(self._local, 'connections', None)
+        if connections is None or self._local.pid != os.getpid():
+            # Connections must not cross a fork, so each worker opens its own
+            connections = self._local.connections = {}
+            self._local.pid = os.getpid()
+
+        connection = connections.get(path)
+        if connection is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connections[path] = connection
+        return connection
+
+_connections = _ConnectionPool()
+
+class SQLiteRepository(BaseRepository):
+    """Repository storing each collection as a table of JSON rows in SQLite"""
+
+    def __init__(self, filename: str):
+        super().__init__(filename)
+        self.database_path = _database_path()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = _connections.get(self.database_path)
+        if not self._schema_ready:
+            self._create_schema(connection)
+            self._schema_ready = True
+        return connection
+
+    def _table(self) -> str:
+        return '"' + self.get_collection_name().replace('"', '""') + '"'
+
+    def _field_expression(self, field: str) -> str:
+        if not _FIELD_NAME.match(field):
+            raise ValueError(f"Invalid field name: {field}")
+        return f"json_extract(data, '$.{field}')"
+
+    def _create_schema(self, connection: sqlite3.Connection) -> None:
+        """Create the table plus an index for id and every declared field"""
+        table = self._table()
+        name = self.get_collection_name()
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "position INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "id TEXT, "
+            "data TEXT NOT NULL)"
+        )
+        connection.execute(f'CREATE INDEX IF NOT EXISTS "ix_{name}_id" ON {table} (id)')
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {_VERSIONS_TABLE} ("
+            "collection TEXT PRIMARY KEY, "
+            "version INTEGER NOT NULL, "
+            "modified_at REAL)"
+        )
+        for fields in self.indexed_fields:
+            key = normalize_fields(fields)
+            expressions = ", ".join(self._field_expression(field) for field in key)
+            connection.execute(
+                f'CREATE INDEX IF NOT EXISTS "ix_{name}_{"_".join(key)}" ON {table} ({expressions})'
+            )
+        for fields in self.unique_fields:
+            key = normalize_fields(fields)
+            expressions = ", ".join(self._field_expression(field) for field in key)
+            try:
+                # NULLs never collide, so rows without the field are still allowed
+                connection.execute(
+                    f'CREATE UNIQUE INDEX IF NOT EXISTS "ux_{name}_{"_".join(key)}" ON {table} ({expressions})'
+                )
+            except sqlite3.IntegrityError:
+                print(f"{name} has duplicate values of {', '.join(key)}; uniqueness is not enforced until they are removed")
+                connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS "ix_{name}_{"_".join(key)}" ON {table} ({expressions})'
+                )
+
+    def _encode(self, item: Dict[str, Any]) -> str:
+        return get_codec().dumps(item, compact=True).decode("utf-8")
+
+    def _where(self, fields: IndexFields, value: Any) -> Optional[Tuple[str, List[Any]]]:
+        """Build a WHERE clause for an equality match, or None if it can't be pushed down"""
+        values = [value] if len(fields) == 1 else list(value)
+        values = [normalize_value(part) for part in values]
+        if not all(isinstance(part, _SCALARS) for part in values):
+            return None
+        clause = " AND ".join(f"{self._field_expression(field)} IS ?" for field in fields)
+        return clause, values
+
+    def _select(self, where: str = "", params: Iterable[Any] = (), limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        sql = f"SELECT data FROM {self._table()}"
+        if where:
+            sql += f" WHERE {where}"
+        sql += " ORDER BY position"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        codec = get_codec()
+        return [codec.loads(data) for data in self._fetch(sql, list(params))]
+
+    def _fetch(self, sql: str, params: List[Any]) -> List[str]:
+        """Run a SELECT of the data column, recorded as one load of the collection"""
+        name = self.get_collection_name()
+        with repository_metrics.timed(name, "load"):
+            rows = [row[0] for row in self._connection().execute(sql, params).fetchall()]
+        repository_metrics.add_bytes_read(name, sum(len(data) for data in rows))
+        return rows
+
+    def find_all(self) -> List[Dict[str, Any]]:
+        """Get all items from collection"""
+        return self._select()
+
+    def _rows(self) -> List[Dict[str, Any]]:
+        return self.find_all()
+
+    def _scan(self) -> Iterator[Dict[str, Any]]:
+        return self.iter_all()
+
+    def _field_index(self, key: IndexFields) -> None:
+        """Field indexes live in the database, so fallback lookups scan the table"""
+        return None
+
+    def iter_all(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over every item, streaming rows from the cursor"""
+        codec = get_codec()
+        cursor = self._connection().execute(f"SELECT data FROM {self._table()} ORDER BY position")
+        for (data,) in cursor:
+            yield codec.loads(data)
+
+    def find_by_id(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Find item by ID"""
+        rows = self._select("id = ?", [str(item_id)], limit=1)
+        return rows[0] if rows else None
+
+    def find_by_field(self, fields: Union[str, Tuple[str, ...]], value: Any) -> List[Dict[str, Any]]:
+        """Find items whose field (or compound of fields) equals value"""
+        key = normalize_fields(fields)
+        where = self._where(key, value)
+        if where is None:
+            return super().find_by_field(fields, value)
+        return self._select(*where)
+
+    def find_one_by_field(self, fields: Union[str, Tuple[str, ...]], value: Any) -> Optional[Dict[str, Any]]:
+        """Find the first item whose field (or compound of fields) equals value"""
+        key = normalize_fields(fields)
+        where = self._where(key, value)
+        if where is None:
+            return super().find_one_by_field(fields, value)
+        rows = self._select(*where, limit=1)
+        return rows[0] if rows else None
+
+    def find_by_field_in(self, fields: Union[str, Tuple[str, ...]], values: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Find items whose field (or compound of fields) is one of values"""
+        key = normalize_fields(fields)
+        clauses = []
+        params: List[Any] = []
+        for value in values:
+            where = self._where(key, value)
+            if where is None:
+                return super().find_by_field_in(fields, values)
+            clauses.append(f"({where[0]})")
+            params.extend(where[1])
+        if not clauses:
+            return []
+        return self._select(" OR ".join(clauses), params)
+
+    def _query_where(self, where: Optional[Where]) -> Optional[Tuple[str, List[Any]]]:
+        """Translate query conditions to SQL, or None if one of them can't be pushed down"""
+        clauses = []
+        params: List[Any] = []
+        for field, expected in (where or {}).items():
+            values = list(expected) if is_membership(expected) else [expected]
+            parts = []
+            for value in values:
+                condition = self._where((field,), value)
+                if condition is None:
+                    return None
+                parts.append(condition[0])
+                params.extend(condition[1])
+            clauses.append("(" + (" OR ".join(parts) or "0") + ")")
+        return " AND ".join(clauses), params
+
+    def query(self, where: Optional[Where] = None, order_by: Optional[OrderBy] = None,
+              limit: Optional[int] = None, offset: int = 0,
+              fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Filter, order, slice and project the collection with a single SELECT"""
+        condition = self._query_where(where)
+        if condition is None:
+            return super().query(where, order_by, limit, offset, fields)
+
+        sql = f"SELECT data FROM {self._table()}"
+        if condition[0]:
+            sql += f" WHERE {condition[0]}"
+        ordering = []
+        for field, descending in parse_order_by(order_by):
+            expression = self._field_expression(field)
+            # Missing values go last, as in the JSON backend
+            direction = " DESC" if descending else ""
+            ordering.append(f"{expression} IS NULL{direction}, {expression}{direction}")
+        sql += " ORDER BY " + ", ".join(ordering + ["position"])
+        sql += f" LIMIT {-1 if limit is None else int(limit)} OFFSET {int(offset)}"
+
+        codec = get_codec()
+        return [project(codec.loads(data), fields) for data in self._fetch(sql, condition[1])]
+
+    def count(self, where: Optional[Where] = None) -> int:
+        """Number of items matching where"""
+        condition = self._query_where(where)
+        if condition is None:
+            return super().count(where)
+        sql = f"SELECT COUNT(*) FROM {self._table()}"
+        if condition[0]:
+            sql += f" WHERE {condition[0]}"
+        return self._connection().execute(sql, condition[1]).fetchone()[0]
+
+    def _transaction(self, work: Callable[[sqlite3.Connection, str], Any]) -> Any:
+        """Run work(connection, table) inside a write transaction"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(connection, self._table())
+            connection.execute("COMMIT")
+            return result
+        except sqlite3.IntegrityError as e:
+            connection.execute("ROLLBACK")
+            raise UniqueConstraintError(f"Duplicate value for a unique field of {self.get_collection_name()}: {e}") from e
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _insert_rows(self, connection: sqlite3.Connection, table: str, items: List[Dict[str, Any]]) -> None:
+        connection.executemany(
+            f"INSERT INTO {table} (id, data) VALUES (?, ?)",
+            [(str(item.get('id')), self._encode(item)) for item in items]
+        )
+
+    def _update_row(self, connection: sqlite3.Connection, table: str, item_id: str,
+                    updates: Dict[str, Any], expected: Optional[Tuple[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Update a row, or return None if it is missing or its expected (field, value) no longer holds"""
+        row = connection.execute(
+            f"SELECT position, data FROM {table} WHERE id = ? ORDER BY position LIMIT 1",
+            [str(item_id)]
+        ).fetchone()
+        if row is None:
+            return None
+
+        item = get_codec().loads(row[1])
+        if expected is not None and item.get(expected[0]) != expected[1]:
+            return None
+        item.update(updates)
+        connection.execute(
+            f"UPDATE {table} SET id = ?, data = ? WHERE position = ?",
+            [str(item.get('id')), self._encode(item), row[0]]
+        )
+        return item
+
+    def _delete_row(self, connection: sqlite3.Connection, table: str, item_id: str) -> bool:
+        cursor = connection.execute(
+            f"DELETE FROM {table} WHERE position = "
+            f"(SELECT position FROM {table} WHERE id = ? ORDER BY position LIMIT 1)",
+            [str(item_id)]
+        )
+        return cursor.rowcount > 0
+
+    def _stamp(self, connection: sqlite3.Connection) -> Dict[str, Any]:
+        """Advance the collection version inside the current transaction"""
+        name = self.get_collection_name()
+        modified_at = time.time()
+        connection.execute(
+            f"INSERT INTO {_VERSIONS_TABLE} (collection, version, modified_at) VALUES (?, 1, ?) "
+            "ON CONFLICT(collection) DO UPDATE SET version = version + 1, modified_at = excluded.modified_at",
+            [name, modified_at]
+        )
+        version = connection.execute(
+            f"SELECT version FROM {_VERSIONS_TABLE} WHERE collection = ?", [name]
+        ).fetchone()[0]
+        change_feed.expect(name, version)
+        return {"version": version, "modified_at": modified_at}
+
+    def _write(self, work: Callable[[sqlite3.Connection, str], Tuple[Any, Optional[List[Dict[str, Any]]]]]) -> Any:
+        """Run work(connection, table) -> (result, records) in a transaction that also
+        advances the version when rows changed, then notify subscribers"""
+        stamp: Dict[str, Any] = {}
+
+        def run(connection: sqlite3.Connection, table: str) -> Tuple[Any, Optional[List[Dict[str, Any]]]]:
+            result, records = work(connection, table)
+            if records is None or records:
+                stamp.update(self._stamp(connection))
+            return result, records
+
+        result, records = self._transaction(run)
+        if stamp:
+            change_feed.publish(ChangeEvent(
+                self.get_collection_name(), stamp["version"], stamp["modified_at"], records
+            ))
+        return result
+
+    def create(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Create new item"""
+        def work(connection: sqlite3.Connection, table: str):
+            self._insert_rows(connection, table, [item])
+            return item, [{"op": "create", "item": item}]
+        return self._write(work)
+
+    def update(self, item_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update item by ID"""
+        def work(connection: sqlite3.Connection, table: str):
+            item = self._update_row(connection, table, item_id, updates)
+            return item, [{"op": "update", "id": item_id, "updates": updates}] if item is not None else []
+        return self._write(work)
+
+    def update_if(self, item_id: str, field: str, value: Any, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update item by ID only if its field still holds value; None if missing or changed"""
+        def work(connection: sqlite3.Connection, table: str):
+            item = self._update_row(connection, table, item_id, updates, (field, value))
+            return item, [{"op": "update", "id": item_id, "updates": updates}] if item is not None else []
+        return self._write(work)
+
+    async def aupdate_if(self, item_id: str, field: str, value: Any, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Async variant of update_if"""
+        return await self._write_async(self.update_if, item_id, field, value, updates)
+
+    def delete(self, item_id: str) -> bool:
+        """Delete item by ID"""
+        def work(connection: sqlite3.Connection, table: str):
+            deleted = self._delete_row(connection, table, item_id)
+            return deleted, [{"op": "delete", "id": item_id}] if deleted else []
+        return self._write(work)
+
+    def create_many(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create several items in one transaction"""
+        def work(connection: sqlite3.Connection, table: str):
+            self._insert_rows(connection, table, items)
+            return items, [{"op": "create", "item": item} for item in items]
+        return self._write(work)
+
+    def update_many(self, updates: Dict[str, Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Update several items by ID in one transaction"""
+        def work(connection: sqlite3.Connection, table: str):
+            results = []
+            records = []
+            for item_id, item_updates in updates.items():
+                item = self._update_row(connection, table, item_id, item_updates)
+                results.append(item)
+                if item is not None:
+                    records.append({"op": "update", "id": item_id, "updates": item_updates})
+            return results, records
+        return self._write(work)
+
+    def delete_many(self, item_ids: List[str]) -> List[bool]:
+        """Delete several items by ID in one transaction"""
+        def work(connection: sqlite3.Connection, table: str):
+            results = [self._delete_row(connection, table, item_id) for item_id in item_ids]
+            records = [{"op": "delete", "id": item_id} for item_id, deleted in zip(item_ids, results) if deleted]
+            return results, records
+        return self._write(work)
+
+    def _version_row(self) -> Tuple[int, Optional[float]]:
+        row = self._connection().execute(
+            f"SELECT version, modified_at FROM {_VERSIONS_TABLE} WHERE collection = ?",
+            [self.get_collection_name()]
+        ).fetchone()
+        version, modified_at = row if row is not None else (0, None)
+        # Writes by other workers surface as change events when the version is read
+        change_feed.observe(self.get_collection_name(), version, modified_at)
+        return version, modified_at
+
+    def version(self) -> int:
+        """Monotonic counter advanced by every write to the collection, from any process"""
+        return self._version_row()[0]
+
+    def last_modified(self) -> Optional[datetime]:
+        """Time of the last write to the collection, if it was ever written"""
+        modified_at = self._version_row()[1]
+        return datetime.fromtimestamp(modified_at) if modified_at is not None else None
+
+    def _can_read_inline(self) -> bool:
+        """Every SQLite read is a query, so async reads always use the I/O pool"""
+        return False
+
+    def compact(self) -> bool:
+        """Nothing to fold: SQLite manages its own write-ahead log"""
+        return True
+
+    def import_items(self, items: List[Dict[str, Any]]) -> int:
+        """Replace the table contents with items in a single transaction"""
+        def replace(connection: sqlite3.Connection, table: str) -> Tuple[int, None]:
+            connection.execute(f"DELETE FROM {table}")
+            self._insert_rows(connection, table, items)
+            # Every row may have changed, so subscribers get no record list
+            return len(items), None
+
+        return self._write(replace)
+
+class _SQLiteCollection(SQLiteRepository):
+    """SQLite table for a collection that has no dedicated repository class"""
+
+    def get_collection_name(self) -> str:
+        return self.filename
+
+def migrate_json_to_sqlite() -> Dict[str, int]:
+    """Import every app/data collection into the SQLite database
+
+    Users are read through the same loader as reshard_users, so a sharded layout
+    (app/data/users/) is imported instead of a leftover users.json.
+    Field indexes are created by each repository the first time it connects.
+    """
+    # Imported here: the user repository module selects its backend from this one
+    from .reshard_users import load_users
+    from .user_repository import SHARD_DIRECTORY
+
+    data_dir = data_directory()
+    suffix = FILE_SUFFIXES[settings.REPOSITORY_FILE_FORMAT]
+    names = {data_file.stem for data_file in data_dir.glob(f"*{suffix}")}
+    sharded_users = (data_dir / SHARD_DIRECTORY).is_dir()
+    if sharded_users:
+        names.add("users")
+
+    counts = {}
+    for name in sorted(names):
+        if name == "users" and sharded_users:
+            items = load_users()
+        else:
+            items = CollectionRepository(name).find_all()
+        counts[name] = _SQLiteCollection(name).import_items(items)
+    return counts
+
+if __name__ == "__main__":
+    for collection, count in migrate_json_to_sqlite().items():
+        print(f"{collection}: {count} rows imported into {_database_path()}")
@@ -1,12 +1,25 @@
 """
 User repository for JSON operations
 """
-from typing import List, Optional, Dict, Any
+import zlib
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Callable, Iterable, Iterator, Sequence, Tuple, Union
+from app.core.config import settings
+from .backends import RepositoryBackend
 from .base_repository import BaseRepository
+from .change_feed import ChangeEvent, Subscriber
+from .collection_cache import CachedCollection, clone, collection_cache
+from .indexes import UniqueConstraintError, normalize_fields
 
-class UserRepository(BaseRepository):
+# Directory under app/data holding the shard files when USER_SHARDS > 0
+SHARD_DIRECTORY = "users"
+
+class UserRepository(RepositoryBackend):
     """Repository for user operations"""
     
+    unique_fields = ("email",)
+    indexed_fields = ("role",)
+    
     def __init__(self):
         super().__init__("users")
     
@@ -15,18 +28,321 @@ class UserRepository(BaseRepository):
     
     def find_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Find user by email"""
-        users = self.find_all()
-        return next((user for user in users if user.get('email') == email), None)
+        return self.find_one_by_field("email", email)
+    
+    async def afind_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Async variant of find_by_email"""
+        return await self._read_async(self.find_by_email, email)
     
     def find_by_role(self, role: str) -> List[Dict[str, Any]]:
         """Find users by role"""
-        users = self.find_all()
-        return [user for user in users if user.get('role') == role]
+        return self.find_by_field("role", role)
     
     def update_last_login(self, user_id: str) -> bool:
         """Update user's last login timestamp"""
         from datetime import datetime
         return self.update(user_id, {"last_login_at": datetime.now().isoformat()}) is not None
+    
+    async def aupdate_last_login(self, user_id: str) -> bool:
+        """Async variant of update_last_login"""
+        return await self._write_async(self.update_last_login, user_id)
+    
+    def check_layout(self) -> None:
+        """Fail fast if the users were moved into shard files (USER_SHARDS is 0 here)"""
+        if settings.REPOSITORY_BACKEND != "json":
+            return
+        manifest = ShardFile(f"{SHARD_DIRECTORY}/manifest", "manifest")
+        written = manifest.find_by_id("shards") if manifest.file_path.exists() else None
+        if written is not None and written['value'] != 0:
+            raise RuntimeError(
+                f"Users are stored in {written['value']} shards but USER_SHARDS is 0, run: "
+                f"python -m app.repositories.reshard_users --shards 0"
+            )
+    
+    def next_id(self) -> str:
+        """Next free numeric user ID"""
+        max_id = max([int(user.get('id', '0')) for user in self.find_all() if user.get('id', '0').isdigit()], default=0)
+        return str(max_id + 1)
+    
+    async def anext_id(self) -> str:
+        """Async variant of next_id"""
+        return await self._write_async(self.next_id)
+
+def shard_of(key: Any, shard_count: int) -> int:
+    """Stable shard number for a key (the same in every process, unlike hash())"""
+    return zlib.crc32(str(key).encode("utf-8")) % shard_count
+
+class ShardFile(BaseRepository):
+    """One data file of the sharded user store: a user shard, an email index shard or the manifest"""
+    
+    def __init__(self, filename: str, collection: str,
+                 indexed_fields: Sequence[Union[str, Tuple[str, ...]]] = ()):
+        super().__init__(filename)
+        self.collection = collection
+        self.indexed_fields = indexed_fields
+    
+    def get_collection_name(self) -> str:
+        return self.collection
+    
+    def put(self, key: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Update the row with this id, or create it, in one locked write"""
+        def work(entry: CachedCollection) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+            applied = self._apply_update(entry, key, fields)
+            if applied is not None:
+                return clone(applied[0]), [applied[1]]
+            item = {"id": key, **fields}
+            return item, [self._apply_create(entry, item)]
+        return self._mutate(work)
+    
+    def remove_if(self, key: str, field: str, value: Any) -> bool:
+        """Delete the row with this id only if its field still holds value"""
+        def work(entry: CachedCollection) -> Tuple[bool, List[Dict[str, Any]]]:
+            item = self._primary_index(entry).get(key)
+            if item is None or item.get(field) != value:
+                return False, []
+            return True, [self._apply_delete(entry, key)]
+        return self._mutate(work)
+    
+    def increment(self, key: str) -> int:
+        """Atomically add one to the value of a counter row, returning the new value"""
+        def work(entry: CachedCollection) -> Tuple[int, List[Dict[str, Any]]]:
+            item = self._primary_index(entry).get(key)
+            value = (item.get('value', 0) if item is not None else 0) + 1
+            applied = self._apply_update(entry, key, {"value": value})
+            record = applied[1] if applied is not None else self._apply_create(entry, {"id": key, "value": value})
+            return value, [record]
+        return self._mutate(work)
+
+class ShardedUserRepository(UserRepository):
+    """User repository hash-partitioned by id into shard files under app/data/users/
+
+    A global email -> id index, itself partitioned by email, sends email lookups
+    straight to one shard. Every write touches only the shards of the users it changes.
+    """
+    
+    def __init__(self, shard_count: int, directory: str = SHARD_DIRECTORY):
+        super().__init__()
+        self.directory = directory
+        (self.data_dir / directory).mkdir(exist_ok=True)
+        self.manifest = ShardFile(f"{directory}/manifest", "manifest")
+        self.shard_count = shard_count
+        self.shards = [
+            ShardFile(f"{directory}/users-{i:03d}", f"users-{i:03d}", self.unique_fields + self.indexed_fields)
+            for i in range(shard_count)
+        ]
+        self.email_shards = [
+            ShardFile(f"{directory}/emails-{i:03d}", f"emails-{i:03d}")
+            for i in range(shard_count)
+        ]
+    
+    def check_layout(self) -> None:
+        """Fail fast if the files on disk were written with another shard count"""
+        written = self.manifest.find_by_id("shards")
+        if written is None:
+            legacy = UserRepository()
+            if legacy.file_path.exists() and legacy.find_all():
+                raise RuntimeError(
+                    f"{legacy.file_path.name} has not been sharded yet, run: "
+                    f"python -m app.repositories.reshard_users --shards {self.shard_count}"
+                )
+            self.manifest.put("shards", {"value": self.shard_count})
+        elif written['value'] != self.shard_count:
+            raise RuntimeError(
+                f"Users are stored in {written['value']} shards but USER_SHARDS is {self.shard_count}, run: "
+                f"python -m app.repositories.reshard_users --shards {self.shard_count}"
+            )
+    
+    def _shard(self, user_id: Any) -> ShardFile:
+        return self.shards[shard_of(user_id, self.shard_count)]
+    
+    def _email_shard(self, email: Any) -> ShardFile:
+        return self.email_shards[shard_of(email, self.shard_count)]
+    
+    def _group(self, keys: Iterable[Any]) -> Dict[int, List[Any]]:
+        """Keys grouped by the user shard that holds them"""
+        groups: Dict[int, List[Any]] = {}
+        for key in keys:
+            groups.setdefault(shard_of(key, self.shard_count), []).append(key)
+        return groups
+    
+    # Reads
+    def find_all(self) -> List[Dict[str, Any]]:
+        """Get all items from collection"""
+        return [user for shard in self.shards for user in shard.find_all()]
+    
+    def iter_all(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over every item, one shard at a time"""
+        for shard in self.shards:
+            yield from shard.iter_all()
+    
+    def _rows(self) -> List[Dict[str, Any]]:
+        return [user for shard in self.shards for user in shard._rows()]
+    
+    def _scan(self) -> Iterator[Dict[str, Any]]:
+        for shard in self.shards:
+            yield from shard._scan()
+    
+    def _find_by_field(self, key: Tuple[str, ...], value: Any) -> List[Dict[str, Any]]:
+        return self.find_by_field(key, value)
+    
+    def _find_by_field_in(self, key: Tuple[str, ...], values: Iterable[Any]) -> List[Dict[str, Any]]:
+        return self.find_by_field_in(key, values)
+    
+    def find_by_id(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Find item by ID"""
+        return self._shard(item_id).find_by_id(item_id)
+    
+    def _find_by_email(self, email: Any) -> Optional[Dict[str, Any]]:
+        row = self._email_shard(email).find_by_id(email)
+        if row is None:
+            return None
+        user = self.find_by_id(row['user_id'])
+        # An index entry may outlive a write interrupted between the two files
+        return user if user is not None and user.get('email') == email else None
+    
+    def find_by_field(self, fields: Union[str, Tuple[str, ...]], value: Any) -> List[Dict[str, Any]]:
+        """Find items whose field (or compound of fields) equals value"""
+        if normalize_fields(fields) == ("email",):
+            user = self._find_by_email(value)
+            return [user] if user is not None else []
+        return [user for shard in self.shards for user in shard.find_by_field(fields, value)]
+    
+    def find_one_by_field(self, fields: Union[str, Tuple[str, ...]], value: Any) -> Optional[Dict[str, Any]]:
+        """Find the first item whose field (or compound of fields) equals value"""
+        if normalize_fields(fields) == ("email",):
+            return self._find_by_email(value)
+        for shard in self.shards:
+            user = shard.find_one_by_field(fields, value)
+            if user is not None:
+                return user
+        return None
+    
+    def find_by_field_in(self, fields: Union[str, Tuple[str, ...]], values: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Find items whose field (or compound of fields) is one of values"""
+        values = list(values)
+        if normalize_fields(fields) == ("email",):
+            users = (self._find_by_email(email) for email in dict.fromkeys(values))
+            return [user for user in users if user is not None]
+        return [user for shard in self.shards for user in shard.find_by_field_in(fields, values)]
+    
+    # Writes
+    def _check_emails(self, users: Iterable[Dict[str, Any]]) -> None:
+        """Raise UniqueConstraintError if users would take an email held by another user"""
+        claimed: Dict[Any, Any] = {}
+        for user in users:
+            email = user.get('email')
+            if email is None:
+                continue
+            holder = self._find_by_email(email)
+            owner = claimed.setdefault(email, user.get('id'))
+            if (holder is not None and holder.get('id') != user.get('id')) or owner != user.get('id'):
+                raise UniqueConstraintError(f"Duplicate value for unique field email: {email!r}")
+    
+    def _index_emails(self, users: Iterable[Dict[str, Any]]) -> None:
+        for user in users:
+            if user.get('email') is not None:
+                self._email_shard(user['email']).put(user['email'], {"user_id": user.get('id')})
+    
+    def _unindex_emails(self, users: Iterable[Optional[Dict[str, Any]]]) -> None:
+        for user in users:
+            if user is not None and user.get('email') is not None:
+                self._email_shard(user['email']).remove_if(user['email'], "user_id", user.get('id'))
+    
+    def create(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Create new item"""
+        self._check_emails([item])
+        # Index first: a crash in between leaves an entry find_by_email ignores, not a user it can't find
+        self._index_emails([item])
+        return self._shard(item.get('id')).create(item)
+    
+    def create_many(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create several items with a single write per shard"""
+        self._check_emails(items)
+        self._index_emails(items)
+        groups: Dict[int, List[Dict[str, Any]]] = {}
+        for item in items:
+            groups.setdefault(shard_of(item.get('id'), self.shard_count), []).append(item)
+        for shard_number, group in groups.items():
+            self.shards[shard_number].create_many(group)
+        return items
+    
+    def update(self, item_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update item by ID"""
+        return self.update_many({item_id: updates})[0]
+    
+    def update_many(self, updates: Dict[str, Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Update several items by ID with a single write per shard"""
+        for item_id, item_updates in updates.items():
+            if 'id' in item_updates and str(item_updates['id']) != str(item_id):
+                raise ValueError("User IDs cannot be changed in sharded mode")
+        
+        moved_emails = [item_id for item_id, item_updates in updates.items() if 'email' in item_updates]
+        old_users = {item_id: self.find_by_id(item_id) or {} for item_id in moved_emails}
+        self._check_emails({**old_users[item_id], **updates[item_id]} for item_id in moved_emails if old_users[item_id])
+        
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        for shard_number, item_ids in self._group(updates).items():
+            shard_results = self.shards[shard_number].update_many({item_id: updates[item_id] for item_id in item_ids})
+            results.update(zip(item_ids, shard_results))
+        
+        changed = [
+            (old_users[item_id], results[item_id]) for item_id in moved_emails
+            if results[item_id] is not None and old_users[item_id].get('email') != results[item_id].get('email')
+        ]
+        self._index_emails(new for _, new in changed)
+        self._unindex_emails(old for old, _ in changed)
+        return [results[item_id] for item_id in updates]
+    
+    def delete(self, item_id: str) -> bool:
+        """Delete item by ID"""
+        return self.delete_many([item_id])[0]
+    
+    def delete_many(self, item_ids: List[str]) -> List[bool]:
+        """Delete several items by ID with a single write per shard"""
+        users = {item_id: self.find_by_id(item_id) for item_id in item_ids}
+        results: Dict[str, bool] = {}
+        for shard_number, group in self._group(dict.fromkeys(item_ids)).items():
+            results.update(zip(group, self.shards[shard_number].delete_many(group)))
+        self._unindex_emails(users[item_id] for item_id in results if results[item_id])
+        return [results[item_id] for item_id in item_ids]
+    
+    def next_id(self) -> str:
+        """Next free numeric user ID, from a counter kept in the manifest"""
+        return str(self.manifest.increment("next_id"))
+    
+    def compact(self) -> bool:
+        """Fold the journal of every shard"""
+        return all([shard.compact() for shard in [self.manifest] + self.shards + self.email_shards])
+    
+    def version(self) -> int:
+        """Monotonic counter advanced by every write to any user shard"""
+        return sum(shard.version() for shard in self.shards)
+    
+    def last_modified(self) -> Optional[datetime]:
+        """Time of the last write to any user shard"""
+        times = [modified for modified in (shard.last_modified() for shard in self.shards) if modified is not None]
+        return max(times, default=None)
+    
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Call callback with a ChangeEvent (labelled "users") after every change to a user shard"""
+        def relabel(event: ChangeEvent) -> None:
+            callback(ChangeEvent(self.get_collection_name(), self.version(), event.modified_at, event.records))
+        
+        unsubscribers = [shard.subscribe(relabel) for shard in self.shards]
+        
+        def unsubscribe() -> None:
+            for shard_unsubscribe in unsubscribers:
+                shard_unsubscribe()
+        return unsubscribe
+    
+    def _can_read_inline(self) -> bool:
+        return all(collection_cache.is_current(shard.file_path, shard._watched_files())
+                   for shard in self.shards + self.email_shards)
+
+def _create_user_repository() -> UserRepository:
+    if settings.USER_SHARDS > 0 and settings.REPOSITORY_BACKEND == "json":
+        return ShardedUserRepository(settings.USER_SHARDS)
+    return UserRepository()
 
 # Global instance
-user_repository = UserRepository()
\ No newline at end of file
+user_repository = _create_user_repository()
\ No newline at end of file
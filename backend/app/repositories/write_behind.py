@@ -0,0 +1,98 @@
+"""
+Write-behind queue that coalesces repository writes into batched flushes
+"""
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+from .collection_cache import CachedCollection, collection_cache
+
+if TYPE_CHECKING:
+    from .base_repository import BaseRepository
+
+class WriteBehindQueue:
+    """Holds mutations already applied in memory until the next batch flush
+
+    A collection is flushed when it reaches max_pending mutations, or at most
+    flush_interval_ms after its first pending mutation, whichever comes first.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Path, Tuple['BaseRepository', CachedCollection, List[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self.flushes = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def add(self, repository: 'BaseRepository', entry: CachedCollection,
+            records: List[Dict[str, Any]], flush_interval_ms: int, max_pending: int) -> None:
+        """Queue records for a collection and flush it if the batch is full"""
+        stale = None
+        with self._lock:
+            path = repository.file_path
+            pending = self._pending.get(path)
+            if pending is None or pending[1] is not entry:
+                # A replaced (reloaded) cache entry keeps its own batch, flushed below
+                stale = pending
+                pending = (repository, entry, [])
+                self._pending[path] = pending
+            pending[2].extend(records)
+            self.coalesced += len(records)
+            full = len(pending[2]) >= max_pending
+
+            if self._timer is None and not full:
+                self._timer = threading.Timer(flush_interval_ms / 1000, self.flush_all)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if stale is not None:
+            self._write(*stale)
+        if full:
+            self.flush(path)
+
+    def flush(self, path: Path) -> None:
+        """Write pending mutations of one collection"""
+        with self._lock:
+            pending = self._pending.pop(path, None)
+        if pending is not None:
+            self._write(*pending)
+
+    def flush_all(self) -> None:
+        """Write pending mutations of every collection (called by the timer and on shutdown)"""
+        with self._lock:
+            pending_items = list(self._pending.values())
+            self._pending.clear()
+            self._timer = None
+        for pending in pending_items:
+            self._write(*pending)
+
+    def has_pending(self, path: Path) -> bool:
+        """Whether a collection has mutations applied in memory but not yet written"""
+        return path in self._pending
+
+    def pending_count(self) -> int:
+        """Number of mutations applied in memory but not yet written"""
+        with self._lock:
+            return sum(len(records) for _, _, records in self._pending.values())
+
+    def record_dropped(self, count: int) -> None:
+        """Count pending mutations that were acknowledged but never written"""
+        with self._lock:
+            self.dropped += count
+
+    def _write(self, repository: 'BaseRepository', entry: CachedCollection,
+               records: List[Dict[str, Any]]) -> None:
+        try:
+            written = repository._write_batch(entry, records)
+        except Exception as e:
+            print(f"Error flushing pending writes of {repository.filename}: {e}")
+            written = False
+        if not written:
+            # The in-memory changes are gone too, so readers see what is on disk
+            print(f"Dropped {len(records)} pending writes of {repository.filename}")
+            collection_cache.invalidate(repository.file_path)
+            self.record_dropped(len(records))
+        self.flushes += 1
+
+# Global instance shared by every repository in the process
+write_behind_queue = WriteBehindQueue()
@@ -4,14 +4,16 @@ Endpoints for adaptive testing, question management, and result calculation
 """
 
 import asyncio
-from typing import List
-from fastapi import APIRouter, HTTPException, status, Query
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, status, Query, Depends
 from app.models.diagnostic import (
     AlternativePath, AlternativePathsResponse, GetAlternativePathsRequest, GetNextAdaptiveQuestionRequest, NextAdaptiveQuestionResponse, Question, EvaluationSession, EvaluationResult, 
     StartEvaluationRequest, SubmitAnswerRequest, SubmitAnswerResponse,
-    EvaluationResultResponse, AdaptiveQuestionRequest, UserAnswer
+    EvaluationResultResponse, AdaptiveQuestionRequest, UserAnswer,
+    GetAdaptiveTreeRequest, AdaptiveTreeResponse,
+    BatchCalculateResultsRequest, BatchEvaluationResultsResponse
 )
-from app.models.common import BaseResponse
+from app.models.common import BaseResponse, DifficultyLevel, PaginationParams, PaginatedResponse
 from app.services.diagnostic_service import diagnostic_service
 from app.core.config import settings
 
@@ -23,13 +25,14 @@ async def start_evaluation_session(request: StartEvaluationRequest):
     Start a new diagnostic evaluation session
     
     - **user_id**: ID of the user taking the evaluation
+    - **seed**: Optional fixed seed; the same seed and answers always give the same questions
     """
     # Simulate network delay
     if settings.ENABLE_MOCK_DATA:
         await asyncio.sleep(0.3)
     
     try:
-        session = await diagnostic_service.start_evaluation_session(request.user_id)
+        session = await diagnostic_service.start_evaluation_session(request.user_id, request.seed)
         return session
     except Exception as e:
         raise HTTPException(
@@ -56,6 +59,32 @@ async def get_questions():
             detail="Error al obtener preguntas"
         )
 
+@router.get("/questions/paginated", response_model=PaginatedResponse)
+async def get_questions_paginated(
+    pagination: PaginationParams = Depends(),
+    difficulty: Optional[DifficultyLevel] = Query(None, description="Difficulty level to filter by"),
+    topic: Optional[str] = Query(None, description="Topic to filter by")
+):
+    """
+    Get one page of the question bank, ordered by question ID
+    
+    - **page**: Page number (default: 1)
+    - **limit**: Items per page (default: 10, max: 100)
+    - **difficulty**: Optional filter by basic, intermediate, or advanced
+    - **topic**: Optional filter by topic
+    """
+    # Simulate network delay
+    if settings.ENABLE_MOCK_DATA:
+        await asyncio.sleep(0.3)
+    
+    try:
+        return await diagnostic_service.get_questions_page(pagination, difficulty, topic)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error al obtener preguntas"
+        )
+
 @router.get("/questions/{session_id}/adaptive", response_model=List[Question])
 async def get_adaptive_questions(session_id: str):
     """
@@ -112,7 +141,7 @@ async def calculate_results(session_id: str):
         result = await diagnostic_service.calculate_results(session_id)
         
         # Get session info for response
-        session = diagnostic_service.active_sessions.get(session_id)
+        session = await diagnostic_service.get_session_by_id(session_id)
         if not session:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -136,6 +165,30 @@ async def calculate_results(session_id: str):
             detail="Error al calcular resultados"
         )
 
+@router.post("/calculate-results-batch", response_model=BatchEvaluationResultsResponse)
+async def calculate_results_batch(request: BatchCalculateResultsRequest):
+    """
+    Calculate the results of many sessions at once (e.g. to re-score a cohort
+    after the question bank changed), live or already saved, with the same rules
+    as calculate-results
+    
+    - **session_ids**: Session IDs to score; missing or empty sessions are returned in `skipped`
+    """
+    try:
+        results, skipped = await diagnostic_service.calculate_results_batch(request.session_ids)
+        return BatchEvaluationResultsResponse(
+            success=True,
+            message="Resultados calculados exitosamente",
+            results=results,
+            skipped=skipped
+        )
+    except Exception as e:
+        print(f"Error in calculate_results_batch endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error al calcular resultados"
+        )
+
 @router.post("/save-results/{session_id}", response_model=BaseResponse)
 async def save_results(session_id: str):
     """
@@ -192,7 +245,7 @@ async def get_session(session_id: str):
     - **session_id**: Session ID to retrieve
     """
     try:
-        session = diagnostic_service.active_sessions.get(session_id)
+        session = await diagnostic_service.get_session_by_id(session_id)
         if not session:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -208,6 +261,23 @@ async def get_session(session_id: str):
         )
     
 
+async def _exploration_seed(session_id: Optional[str], seed: Optional[int]) -> int:
+    """Seed for the what-if endpoints: the one given, otherwise the stored seed of session_id"""
+    if seed is not None:
+        return seed
+    if session_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Indica session_id o seed"
+        )
+    try:
+        return await diagnostic_service.get_session_seed(session_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
 @router.post("/get-next-adaptive-question", response_model=NextAdaptiveQuestionResponse)
 async def get_next_adaptive_question(request: GetNextAdaptiveQuestionRequest):
     """
@@ -216,11 +286,15 @@ async def get_next_adaptive_question(request: GetNextAdaptiveQuestionRequest):
     
     - **answers**: List of previous answers for context
     - **assume_answer**: Optional assumed answer to simulate different paths
+    - **session_id**: Session being explored; its stored seed is used
+    - **seed**: Seed to use instead of session_id (the session's `seed`)
     """
     # Simulate network delay
     if settings.ENABLE_MOCK_DATA:
         await asyncio.sleep(0.3)
     
+    seed = await _exploration_seed(request.session_id, request.seed)
+    
     try:
         # Convert request data to internal format
         answers_data = []
@@ -244,7 +318,8 @@ async def get_next_adaptive_question(request: GetNextAdaptiveQuestionRequest):
         # Get next question using service
         next_question = await diagnostic_service.get_next_adaptive_question_context(
             answers_data, 
-            assume_answer_data
+            assume_answer_data,
+            seed
         )
         
         return NextAdaptiveQuestionResponse(question=next_question)
@@ -264,11 +339,15 @@ async def get_alternative_paths(request: GetAlternativePathsRequest):
     
     - **answers**: List of previous answers for context
     - **current_question_id**: ID of the current question to analyze alternatives for
+    - **session_id**: Session being explored; its stored seed is used
+    - **seed**: Seed to use instead of session_id (the session's `seed`)
     """
     # Simulate network delay
     if settings.ENABLE_MOCK_DATA:
         await asyncio.sleep(0.4)
     
+    seed = await _exploration_seed(request.session_id, request.seed)
+    
     try:
         # Convert request data to internal format
         answers_data = []
@@ -284,7 +363,8 @@ async def get_alternative_paths(request: GetAlternativePathsRequest):
         # Get alternative paths using service
         alternatives_data = await diagnostic_service.get_alternative_paths_info(
             answers_data,
-            request.current_question_id
+            request.current_question_id,
+            seed
         )
         
         # Convert to response format
@@ -310,4 +390,36 @@ async def get_alternative_paths(request: GetAlternativePathsRequest):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error al obtener caminos alternativos"
-        )
\ No newline at end of file
+        )
+
+@router.post("/adaptive-tree", response_model=AdaptiveTreeResponse)
+async def get_adaptive_tree(request: GetAdaptiveTreeRequest):
+    """
+    Get the adaptive decision tree for tree visualization in one request
+    Each node holds the question asked in that state and the nodes reached by
+    answering it correctly or incorrectly
+    
+    - **answers**: List of previous answers for context
+    - **depth**: Levels of branching to expand (1-6)
+    - **session_id**: Session being explored; its stored seed is used
+    - **seed**: Seed to use instead of session_id (the session's `seed`)
+    """
+    # Simulate network delay
+    if settings.ENABLE_MOCK_DATA:
+        await asyncio.sleep(0.4)
+    
+    seed = await _exploration_seed(request.session_id, request.seed)
+    
+    try:
+        answers_data = [
+            {'question_id': answer.question_id, 'selected_option': answer.selected_option}
+            for answer in request.answers
+        ]
+        return await diagnostic_service.get_adaptive_tree(answers_data, request.depth, seed)
+        
+    except Exception as e:
+        print(f"Error in get_adaptive_tree endpoint: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error al obtener el árbol adaptativo"
+        )
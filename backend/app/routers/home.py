@@ -4,10 +4,10 @@ Endpoints for dashboard data, achievements, daily tips, and user statistics
 """
 
 import asyncio
-from typing import List, Dict, Any
-from fastapi import APIRouter, HTTPException, status, Query
-from app.models.learning import Achievement, DailyTip
-from app.models.common import UserStats, BaseResponse
+from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, status, Query, Depends
+from app.models.learning import Achievement, DailyTip, ACHIEVEMENT_SORT_FIELDS
+from app.models.common import UserStats, BaseResponse, PaginationParams, PaginatedResponse, order_by_pattern
 from app.services.learning_services import learning_service
 from app.core.config import settings
 
@@ -37,6 +37,32 @@ async def get_recent_achievements(
             detail="Error al obtener logros recientes"
         )
 
+@router.get("/achievements/{user_id}/paginated", response_model=PaginatedResponse)
+async def get_achievements_paginated(
+    user_id: str,
+    pagination: PaginationParams = Depends(),
+    order_by: Optional[str] = Query(None, pattern=order_by_pattern(ACHIEVEMENT_SORT_FIELDS), description="Field to sort by, prefixed with - for descending order")
+):
+    """
+    Get one page of user achievements
+    
+    - **user_id**: User's unique identifier
+    - **page**: Page number (default: 1)
+    - **limit**: Items per page (default: 10, max: 100)
+    - **order_by**: Optional sort field (id, title or points), e.g. -points
+    """
+    # Simulate network delay
+    if settings.ENABLE_MOCK_DATA:
+        await asyncio.sleep(0.3)
+    
+    try:
+        return await learning_service.get_achievements_page(user_id, pagination, order_by)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error al obtener todos los logros"
+        )
+
 @router.get("/achievements/{user_id}", response_model=List[Achievement])
 async def get_all_achievements(user_id: str):
     """
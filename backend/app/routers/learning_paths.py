@@ -5,13 +5,14 @@ Endpoints for learning paths, courses, lessons, and progress management
 
 import asyncio
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, HTTPException, status, Query, Depends
 from app.models.learning import (
     LearningPath, CourseModule, Lesson, CourseProgress,
-    EnrollmentRequest, ProgressUpdateRequest, LessonCompletionRequest
+    EnrollmentRequest, ProgressUpdateRequest, LessonCompletionRequest,
+    LEARNING_PATH_SORT_FIELDS
 )
 from app.models.diagnostic import EvaluationResult
-from app.models.common import BaseResponse, DifficultyLevel
+from app.models.common import BaseResponse, DifficultyLevel, PaginationParams, PaginatedResponse, order_by_pattern
 from app.services.learning_services import learning_service
 from  app.core.config import settings
 
@@ -36,6 +37,34 @@ async def get_learning_paths():
             detail="Error al obtener rutas de aprendizaje"
         )
 
+@router.get("/paginated", response_model=PaginatedResponse)
+async def get_learning_paths_paginated(
+    pagination: PaginationParams = Depends(),
+    difficulty: Optional[DifficultyLevel] = Query(None, description="Difficulty level to filter by"),
+    category: Optional[str] = Query(None, description="Category to filter by"),
+    order_by: Optional[str] = Query(None, pattern=order_by_pattern(LEARNING_PATH_SORT_FIELDS), description="Field to sort by, prefixed with - for descending order")
+):
+    """
+    Get one page of the learning path catalog
+    
+    - **page**: Page number (default: 1)
+    - **limit**: Items per page (default: 10, max: 100)
+    - **difficulty**: Optional filter by basic, intermediate, or advanced
+    - **category**: Optional filter by category
+    - **order_by**: Optional sort field, e.g. title or -estimated_time; nested fields such as rating are rejected
+    """
+    # Simulate network delay
+    if settings.ENABLE_MOCK_DATA:
+        await asyncio.sleep(0.3)
+    
+    try:
+        return await learning_service.get_learning_paths_page(pagination, difficulty, category, order_by)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error al obtener rutas de aprendizaje"
+        )
+
 @router.get("/by-difficulty", response_model=List[LearningPath])
 async def get_learning_paths_by_difficulty(
     difficulty: DifficultyLevel = Query(..., description="Difficulty level to filter by")
@@ -0,0 +1,63 @@
+"""
+Metrics router
+Endpoints exposing repository instrumentation
+"""
+
+from typing import Dict, Any
+from fastapi import APIRouter
+from app.models.common import BaseResponse
+from app.repositories.collection_cache import collection_cache
+from app.repositories.metrics import repository_metrics
+from app.repositories.write_behind import write_behind_queue
+from app.services.session_store import session_store
+from app.services.what_if import what_if_engine
+from app.core.config import settings
+
+router = APIRouter()
+
+@router.get("/repositories")
+async def get_repository_metrics() -> Dict[str, Any]:
+    """
+    Get per-collection repository metrics
+
+    For each collection and operation: count, total and mean latency and
+    p50/p95/p99/max over the last samples, plus bytes read and written and rows
+    scanned versus returned. A high rows_scanned/rows_returned ratio points to
+    filters that miss an index; many "load" operations per request to N+1 reads.
+    """
+    return {
+        "enabled": settings.ENABLE_REPOSITORY_METRICS,
+        "collections": repository_metrics.snapshot(),
+        "cache": collection_cache.stats(),
+        "write_behind": {
+            "pending": write_behind_queue.pending_count(),
+            "flushes": write_behind_queue.flushes,
+            "coalesced": write_behind_queue.coalesced,
+            "dropped": write_behind_queue.dropped
+        }
+    }
+
+@router.delete("/repositories", response_model=BaseResponse)
+async def reset_repository_metrics():
+    """Reset repository metrics"""
+    repository_metrics.reset()
+    return BaseResponse(message="Métricas reiniciadas")
+
+@router.get("/sessions")
+async def get_session_metrics() -> Dict[str, Any]:
+    """
+    Get diagnostic session store metrics
+
+    Live sessions, lookups that found (hits) or missed a session, and sessions
+    dropped because the store was full (evictions) or idle too long (expirations).
+    """
+    return await session_store.astats()
+
+@router.get("/what-if")
+async def get_what_if_metrics() -> Dict[str, Any]:
+    """
+    Get what-if engine metrics
+
+    Memoized adaptive states, and how many were reused (hits) or computed (misses).
+    """
+    return what_if_engine.stats()
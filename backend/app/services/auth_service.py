@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 from app.models.auth import User, UserCreate, UserLogin, UserUpdate, PasswordChange, AuthResponse, TokenData, UserPreferences
 from app.models.common import UserRole, Theme, Language
+from app.repositories.indexes import UniqueConstraintError
 from app.repositories.user_repository import user_repository
 from app.core.config import settings
 
@@ -19,7 +20,7 @@ class AuthService:
     async def login(self, login_data: UserLogin) -> AuthResponse:
         """Authenticate user with email and password"""
         # Find user by email
-        user_data = self.user_repo.find_by_email(login_data.email)
+        user_data = await self.user_repo.afind_by_email(login_data.email)
         
         if not user_data:
             return AuthResponse(
@@ -35,7 +36,7 @@ class AuthService:
             )
         
         # Update last login time
-        self.user_repo.update_last_login(user_data['id'])
+        await self.user_repo.aupdate_last_login(user_data['id'])
         
         # Convert to User model
         user = self._dict_to_user(user_data)
@@ -53,7 +54,7 @@ class AuthService:
     async def register(self, user_data: UserCreate) -> AuthResponse:
         """Register a new user"""
         # Check if email already exists
-        existing_user = self.user_repo.find_by_email(user_data.email)
+        existing_user = await self.user_repo.afind_by_email(user_data.email)
         if existing_user:
             return AuthResponse(
                 success=False,
@@ -62,7 +63,7 @@ class AuthService:
         
         # Create new user data
         new_user_data = {
-            "id": self._generate_user_id(),
+            "id": await self._generate_user_id(),
             "first_name": user_data.first_name,
             "last_name": user_data.last_name,
             "email": user_data.email,
@@ -79,8 +80,14 @@ class AuthService:
             "last_login_at": datetime.now().isoformat()
         }
         
-        # Save to repository
-        saved_user_data = self.user_repo.create(new_user_data)
+        # Save to repository; the email may have been taken since the check above
+        try:
+            saved_user_data = await self.user_repo.acreate(new_user_data)
+        except UniqueConstraintError:
+            return AuthResponse(
+                success=False,
+                message="Este email ya está registrado"
+            )
         user = self._dict_to_user(saved_user_data)
         
         # Generate token
@@ -95,7 +102,7 @@ class AuthService:
     
     async def update_profile(self, user_id: str, update_data: UserUpdate) -> AuthResponse:
         """Update user profile information"""
-        user_data = self.user_repo.find_by_id(user_id)
+        user_data = await self.user_repo.afind_by_id(user_id)
         
         if not user_data:
             return AuthResponse(
@@ -115,7 +122,7 @@ class AuthService:
             updates["preferences"] = update_data.preferences.dict()
         
         # Update in repository
-        updated_data = self.user_repo.update(user_id, updates)
+        updated_data = await self.user_repo.aupdate(user_id, updates)
         if not updated_data:
             return AuthResponse(
                 success=False,
@@ -153,11 +160,9 @@ class AuthService:
             last_login_at=datetime.fromisoformat(user_data['last_login_at'].replace('Z', '+00:00'))
         )
     
-    def _generate_user_id(self) -> str:
+    async def _generate_user_id(self) -> str:
         """Generate unique user ID"""
-        existing_users = self.user_repo.find_all()
-        max_id = max([int(user.get('id', '0')) for user in existing_users if user.get('id', '0').isdigit()], default=0)
-        return str(max_id + 1)
+        return await self.user_repo.anext_id()
     
     def _generate_token(self, user: User) -> str:
         """Generate a mock JWT token"""
@@ -0,0 +1,208 @@
+"""
+Batch scoring of evaluation answers
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.models.common import DifficultyLevel
+from app.models.diagnostic import UserAnswer, LEVEL_RULES, REFLECTIVE_AVERAGE_TIME_MS
+from app.services.question_bank import AnswerKey
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the Python engine is always available
+    np = None
+
+LEVELS = list(DifficultyLevel)
+LEVEL_CODES = {level: code for code, level in enumerate(LEVELS)}
+
+class SessionScore:
+    """Scores of one answer list; recommendations are left to DiagnosticService"""
+
+    __slots__ = ("score", "level", "topics", "learning_style")
+
+    def __init__(self, score: int, level: DifficultyLevel, topics: Dict[str, float], learning_style: str):
+        self.score = score
+        self.level = level
+        self.topics = topics
+        self.learning_style = learning_style
+
+def score_answers(answers: List[UserAnswer], answer_key: AnswerKey) -> SessionScore:
+    """Score one non-empty answer list; every scoring path follows this rule
+
+    Each selected option is compared against the current answer key, with the
+    difficulty and topic the bank gives the question now, so scoring again after
+    the bank changes follows the change. Answers to questions removed from the
+    bank keep the verdict recorded when they were submitted; answers to
+    questions that were never found only count towards the total.
+    """
+    correct_answers = 0
+    difficulty_correct = [0] * len(LEVELS)
+    topic_scores: Dict[str, List[int]] = {}
+    for answer in answers:
+        position = answer_key.positions.get(answer.question_id)
+        if position is not None:
+            is_correct = answer.selected_option == answer_key.correct_answers[position]
+            difficulty = answer_key.difficulties[position]
+            topic = answer_key.topics[position]
+        elif answer.question_difficulty is not None:
+            is_correct, difficulty, topic = answer.is_correct, answer.question_difficulty, answer.topic
+        else:
+            continue
+        counts = topic_scores.setdefault(topic, [0, 0])
+        counts[1] += 1
+        if is_correct:
+            correct_answers += 1
+            counts[0] += 1
+            difficulty_correct[LEVEL_CODES[DifficultyLevel(difficulty)]] += 1
+
+    total = len(answers)
+    score = round((correct_answers / total) * 100)
+    level = DifficultyLevel.BASIC
+    for rule_level, needed, min_score in LEVEL_RULES:
+        if difficulty_correct[LEVEL_CODES[rule_level]] >= needed and score >= min_score:
+            level = rule_level
+            break
+    topics = {
+        topic: round((correct / answered) * 100) / 100
+        for topic, (correct, answered) in topic_scores.items()
+    }
+    average_time = sum(answer.time_spent for answer in answers) / total
+    learning_style = "Reflexivo" if average_time > REFLECTIVE_AVERAGE_TIME_MS else "Práctico"
+    return SessionScore(score, level, topics, learning_style)
+
+class BatchScorer:
+    """Scores many answer lists at once, with the same results as score_answers
+
+    The "numpy" engine lays every answer of the batch out in flat arrays, looks
+    the selected options up in the answer key laid out the same way, and
+    aggregates them with bincount; the "python" engine calls score_answers.
+    """
+
+    def __init__(self, backend: str = "auto"):
+        if backend == "auto":
+            backend = "numpy" if np is not None else "python"
+        if backend == "numpy" and np is None:
+            raise ValueError("Batch scoring backend 'numpy' requires numpy to be installed")
+        if backend not in ("numpy", "python"):
+            raise ValueError(f"Batch scoring backend '{backend}' is not available")
+        self.backend = backend
+        # (answer key, its arrays), rebuilt when the bank hands out a new key
+        self._key_arrays: Optional[Tuple[AnswerKey, Tuple[Any, Any, Any, Dict[str, int]]]] = None
+
+    def score(self, answer_lists: List[List[UserAnswer]], answer_key: AnswerKey) -> List[SessionScore]:
+        """Score each answer list against answer_key, in order; every list must have at least one answer"""
+        if not answer_lists:
+            return []
+        if self.backend == "numpy":
+            return self._score_numpy(answer_lists, answer_key)
+        return self._score_python(answer_lists, answer_key)
+
+    def _score_python(self, answer_lists: List[List[UserAnswer]], answer_key: AnswerKey) -> List[SessionScore]:
+        return [score_answers(answers, answer_key) for answers in answer_lists]
+
+    def _arrays(self, answer_key: AnswerKey) -> Tuple[Any, Any, Any, Dict[str, int]]:
+        """Correct option, difficulty code and topic code per question position
+
+        Each array ends with a sentinel that position -1 (not in the bank) reads:
+        it matches no option and has no difficulty nor topic.
+        """
+        cached = self._key_arrays
+        if cached is not None and cached[0] is answer_key:
+            return cached[1]
+        topic_codes: Dict[str, int] = {}
+        correct = np.array(answer_key.correct_answers + [-1], dtype=np.int64)
+        difficulty = np.array(
+            [LEVEL_CODES[DifficultyLevel(level)] for level in answer_key.difficulties] + [-1], dtype=np.int64
+        )
+        topic = np.array(
+            [topic_codes.setdefault(name, len(topic_codes)) for name in answer_key.topics] + [-1], dtype=np.int64
+        )
+        arrays = (correct, difficulty, topic, topic_codes)
+        self._key_arrays = (answer_key, arrays)
+        return arrays
+
+    def _score_numpy(self, answer_lists: List[List[UserAnswer]], answer_key: AnswerKey) -> List[SessionScore]:
+        key_correct, key_difficulty, key_topic, key_topic_codes = self._arrays(answer_key)
+        session_count = len(answer_lists)
+        totals = np.fromiter((len(answers) for answers in answer_lists), dtype=np.int64, count=session_count)
+        answer_count = int(totals.sum())
+        all_answers = [answer for answers in answer_lists for answer in answers]
+
+        # One entry per answer of the batch, grouped by list in submission order
+        session_index = np.repeat(np.arange(session_count), totals)
+        position = np.fromiter(
+            (answer_key.positions.get(answer.question_id, -1) for answer in all_answers),
+            dtype=np.int64, count=answer_count
+        )
+        selected = np.fromiter((answer.selected_option for answer in all_answers), dtype=np.int64, count=answer_count)
+        time_spent = np.fromiter((answer.time_spent for answer in all_answers), dtype=np.int64, count=answer_count)
+
+        # Verdicts recorded at submit time, only read for questions no longer in the bank
+        topic_codes = dict(key_topic_codes)
+        stored_difficulty = np.fromiter(
+            (LEVEL_CODES[DifficultyLevel(answer.question_difficulty)] if answer.question_difficulty is not None else -1
+             for answer in all_answers),
+            dtype=np.int64, count=answer_count
+        )
+        stored_correct = np.fromiter((bool(answer.is_correct) for answer in all_answers), dtype=bool, count=answer_count)
+        stored_topic = np.fromiter(
+            (topic_codes.setdefault(answer.topic, len(topic_codes)) if answer.question_difficulty is not None else -1
+             for answer in all_answers),
+            dtype=np.int64, count=answer_count
+        )
+
+        in_bank = position >= 0
+        correct = np.where(in_bank, selected == key_correct[position], stored_correct)
+        difficulty = np.where(in_bank, key_difficulty[position], stored_difficulty)
+        topic = np.where(in_bank, key_topic[position], stored_topic)
+
+        topic_names = list(topic_codes)
+        topic_count = max(len(topic_names), 1)
+
+        # Answers to questions that were not found only count towards the totals
+        graded = difficulty >= 0
+        graded_session = session_index[graded]
+        is_correct = correct[graded]
+
+        correct_answers = np.bincount(graded_session, weights=is_correct, minlength=session_count)
+        score = np.round(correct_answers / totals * 100).astype(np.int64)
+
+        difficulty_correct = np.bincount(
+            graded_session * len(LEVELS) + difficulty[graded],
+            weights=is_correct, minlength=session_count * len(LEVELS)
+        ).reshape(session_count, len(LEVELS))
+        level = np.full(session_count, LEVEL_CODES[DifficultyLevel.BASIC])
+        # Earlier rules take precedence, so they are applied last
+        for rule_level, needed, min_score in reversed(LEVEL_RULES):
+            matched = (difficulty_correct[:, LEVEL_CODES[rule_level]] >= needed) & (score >= min_score)
+            level[matched] = LEVEL_CODES[rule_level]
+
+        # (list, topic) cells, listed in the order each topic first appears in its list
+        cells = graded_session * topic_count + topic[graded]
+        cell_totals = np.bincount(cells, minlength=session_count * topic_count)
+        cell_correct = np.bincount(cells, weights=is_correct, minlength=session_count * topic_count)
+        first_seen = np.full(session_count * topic_count, answer_count, dtype=np.int64)
+        np.minimum.at(first_seen, cells, np.arange(len(cells)))
+        seen = np.flatnonzero(cell_totals)
+        seen = seen[np.argsort(first_seen[seen], kind="stable")]
+        accuracy = np.round(cell_correct[seen] / cell_totals[seen] * 100) / 100
+
+        average_time = np.bincount(session_index, weights=time_spent, minlength=session_count) / totals
+        reflective = average_time > REFLECTIVE_AVERAGE_TIME_MS
+
+        topics: List[Dict[str, float]] = [{} for _ in range(session_count)]
+        for cell, value in zip(seen.tolist(), accuracy.tolist()):
+            topics[cell // topic_count][topic_names[cell % topic_count]] = value
+
+        return [
+            SessionScore(
+                int(score[i]),
+                LEVELS[level[i]],
+                topics[i],
+                "Reflexivo" if reflective[i] else "Práctico"
+            )
+            for i in range(session_count)
+        ]
+
+# Global instance used by DiagnosticService
+batch_scorer = BatchScorer(settings.BATCH_SCORING_BACKEND)
@@ -1,27 +1,36 @@
 """
 Diagnostic evaluation service using repositories
 """
-import random
 import uuid
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict
+import random
+from collections import deque
+from datetime import datetime
+from typing import Deque, List, Optional, Dict, Tuple
 from app.models.diagnostic import (
-    Question, EvaluationSession, UserAnswer, EvaluationResult, 
-    SubmitAnswerResponse
+    Question, EvaluationSession, UserAnswer, EvaluationResult, SessionPerformance,
+    SubmitAnswerResponse, AdaptiveTreeNode, AdaptiveTreeResponse
 )
-from app.models.common import DifficultyLevel
+from app.models.common import DifficultyLevel, PaginationParams, PaginatedResponse
 from app.repositories.question_repository import question_repository
+from app.repositories.evaluation_repository import evaluation_result_repository
+from app.services.batch_scoring import batch_scorer, score_answers
+from app.services.question_bank import question_bank
+from app.services.session_store import SessionStore, session_store
+from app.services.what_if import WhatIfNode, what_if_engine
+
+# Fields read by _dict_to_question, so paginated queries only copy those
+QUESTION_FIELDS = ("id", "question", "options", "correct_answer", "difficulty", "topic")
 
 class DiagnosticService:
     """Service class for diagnostic evaluation operations using repositories"""
     
     def __init__(self):
         self.question_repo = question_repository
-        self.active_sessions: Dict[str, EvaluationSession] = {}
-        self._saved_results: Dict[str, Dict] = {}
+        self.sessions: SessionStore = session_store
+        self.result_repo = evaluation_result_repository
     
-    async def start_evaluation_session(self, user_id: str) -> EvaluationSession:
-        """Start a new evaluation session for a user"""
+    async def start_evaluation_session(self, user_id: str, seed: Optional[int] = None) -> EvaluationSession:
+        """Start a new evaluation session for a user (with a fixed seed to make it reproducible)"""
         session = EvaluationSession(
             session_id=self._generate_session_id(),
             user_id=user_id,
@@ -30,19 +39,40 @@ class DiagnosticService:
             answers=[],
             is_completed=False
         )
+        if seed is not None:
+            session.seed = seed
         
-        # Store session in memory
-        self.active_sessions[session.session_id] = session
+        await self.sessions.aput(session)
         return session
     
     async def get_questions(self) -> List[Question]:
         """Get all available questions for evaluation"""
-        questions_data = self.question_repo.find_all()
+        questions_data = await self.question_repo.afind_all()
         return [self._dict_to_question(q_data) for q_data in questions_data]
     
+    async def get_questions_page(
+        self,
+        pagination: PaginationParams,
+        difficulty: Optional[DifficultyLevel] = None,
+        topic: Optional[str] = None
+    ) -> PaginatedResponse:
+        """Get one page of the question bank, optionally filtered by difficulty and topic"""
+        where = {}
+        if difficulty:
+            where['difficulty'] = difficulty.value
+        if topic:
+            where['topic'] = topic
+        
+        questions_data = await self.question_repo.aquery(
+            where, "id", pagination.limit, pagination.offset, QUESTION_FIELDS
+        )
+        total = await self.question_repo.acount(where)
+        questions = [self._dict_to_question(q_data) for q_data in questions_data]
+        return PaginatedResponse.build(questions, total, pagination)
+    
     async def get_adaptive_questions(self, session_id: str) -> List[Question]:
         """Get adaptive questions based on user's current performance in session"""
-        session = self.active_sessions.get(session_id)
+        session = await self.sessions.aget(session_id)
         if not session:
             raise ValueError("Sesión no encontrada")
         
@@ -54,7 +84,19 @@ class DiagnosticService:
     
     async def submit_answer(self, session_id: str, answer: UserAnswer) -> SubmitAnswerResponse:
         """Submit an answer and get the next question or completion status"""
-        session = self.active_sessions.get(session_id)
+        # Answers are graded against the current question bank
+        await question_bank.arefresh()
+        
+        def record(session: EvaluationSession) -> None:
+            # Add answer to session
+            session.answers.append(answer)
+            session.current_question_index += 1
+            self._record_answer(session, answer)
+            if self._should_end_evaluation(session.performance):
+                session.is_completed = True
+        
+        # One atomic update, so concurrent answers to the same session are all kept
+        session = await self.sessions.amodify(session_id, record)
         if not session:
             return SubmitAnswerResponse(
                 success=False,
@@ -62,15 +104,8 @@ class DiagnosticService:
                 is_completed=True
             )
         
-        # Add answer to session
-        session.answers.append(answer)
-        session.current_question_index += 1
-        
         # Check if evaluation should end
-        should_end = self._should_end_evaluation(session)
-        
-        if should_end:
-            session.is_completed = True
+        if self._should_end_evaluation(session.performance):
             return SubmitAnswerResponse(
                 success=True,
                 message="Evaluación completada",
@@ -88,74 +123,63 @@ class DiagnosticService:
     
     async def calculate_results(self, session_id: str) -> EvaluationResult:
         """Calculate final evaluation results"""
-        session = self.active_sessions.get(session_id)
+        session = await self.sessions.aget(session_id)
         if not session or not session.answers:
             raise ValueError("Sesión no válida o sin respuestas")
         
-        # Get all questions for reference
-        questions_data = self.question_repo.find_all()
-        questions_dict = {q['id']: self._dict_to_question(q) for q in questions_data}
-        
-        # Calculate scores
-        correct_answers = 0
-        topic_scores: Dict[str, Dict[str, int]] = {}
-        difficulty_performance = {
-            DifficultyLevel.BASIC: 0,
-            DifficultyLevel.INTERMEDIATE: 0,
-            DifficultyLevel.ADVANCED: 0
-        }
-        
-        for answer in session.answers:
-            question = questions_dict.get(answer.question_id)
-            if not question:
-                continue
-            
-            is_correct = answer.selected_option == question.correct_answer
-            if is_correct:
-                correct_answers += 1
-                question
-            
-            # Track topic performance
-            if question.topic not in topic_scores:
-                topic_scores[question.topic] = {"correct": 0, "total": 0}
-            topic_scores[question.topic]["total"] += 1
-            if is_correct:
-                topic_scores[question.topic]["correct"] += 1
-            
-            # Track difficulty performance
-            if is_correct:
-                difficulty_performance[question.difficulty] += 1
-        
-        # Calculate overall score
-        score = round((correct_answers / len(session.answers)) * 100) if session.answers else 0
+        await question_bank.arefresh()
+        scored = score_answers(session.answers, question_bank.answer_key())
+        recommendations = self._generate_recommendations(scored.level, scored.topics, scored.learning_style)
         
-        # Determine user level
-        level = self._determine_user_level(difficulty_performance, score)
-        
-        # Convert topic scores to percentages
-        topics = {}
-        for topic, scores in topic_scores.items():
-            percentage = round((scores["correct"] / scores["total"]) * 100) if scores["total"] > 0 else 0
-            topics[topic] = percentage / 100  # Convert to decimal
-        
-        # Determine learning style
-        average_time = sum(a.time_spent for a in session.answers) / len(session.answers) if session.answers else 0
-        learning_style = "Reflexivo" if average_time > 30000 else "Práctico"
-        
-        # Generate recommendations
-        recommendations = self._generate_recommendations(level, topics, learning_style)
-            
         return EvaluationResult(
-            level=level,
-            score=score,
-            topics=topics,
-            learning_style=learning_style,
+            level=scored.level,
+            score=scored.score,
+            topics=scored.topics,
+            learning_style=scored.learning_style,
             recommendations=recommendations
         )
     
+    async def calculate_results_batch(self, session_ids: List[str]) -> Tuple[Dict[str, EvaluationResult], List[str]]:
+        """
+        Score many sessions in one pass, live ones or those whose results were saved
+        Answers are graded against the current question bank, exactly as in calculate_results.
+        Returns the results by session ID and the IDs skipped (not found or without answers)
+        """
+        unique_ids = list(dict.fromkeys(session_ids))
+        answer_lists: Dict[str, List[UserAnswer]] = {}
+        saved_ids = []
+        for session_id in unique_ids:
+            session = await self.sessions.aget(session_id)
+            if session:
+                answer_lists[session_id] = session.answers
+            else:
+                saved_ids.append(session_id)
+        
+        # Saved results keep their answers, since saving removes the session
+        if saved_ids:
+            for result_data in await self.result_repo.afind_by_session_ids(saved_ids):
+                answers = result_data.get('answers')
+                if answers is not None and result_data['session_id'] not in answer_lists:
+                    answer_lists[result_data['session_id']] = [UserAnswer.model_validate(answer) for answer in answers]
+        
+        scored_ids = [session_id for session_id in unique_ids if answer_lists.get(session_id)]
+        skipped = [session_id for session_id in unique_ids if not answer_lists.get(session_id)]
+        await question_bank.arefresh()
+        scores = batch_scorer.score([answer_lists[session_id] for session_id in scored_ids], question_bank.answer_key())
+        results = {}
+        for session_id, scored in zip(scored_ids, scores):
+            results[session_id] = EvaluationResult(
+                level=scored.level,
+                score=scored.score,
+                topics=scored.topics,
+                learning_style=scored.learning_style,
+                recommendations=self._generate_recommendations(scored.level, scored.topics, scored.learning_style)
+            )
+        return results, skipped
+    
     async def save_results(self, session_id: str, result: EvaluationResult) -> bool:
         """Save evaluation results to persistent storage"""
-        session = self.active_sessions.get(session_id)
+        session = await self.sessions.aget(session_id)
         if not session:
             raise ValueError("Sesión no encontrada")
         
@@ -172,104 +196,92 @@ class DiagnosticService:
             "start_time": session.start_time.isoformat(),
             "end_time": datetime.now().isoformat(),
             "total_questions": len(session.answers),
-            "correct_answers": sum(1 for a in session.answers if self._is_answer_correct(a))
+            "correct_answers": sum(1 for a in session.answers if a.is_correct),
+            # Kept so the result can be scored again (calculate-results-batch) once the session is gone
+            "answers": [answer.model_dump(mode="json") for answer in session.answers],
+            "seed": session.seed,
+            "created_at": datetime.now().isoformat()
         }
         
-        # Save to memory storage
-        self._saved_results[session_id] = result_data
+        # Saving the same session twice replaces its result
+        if await self.result_repo.aupdate(result_data['id'], result_data) is None:
+            await self.result_repo.acreate(result_data)
         
         # Remove from active sessions after saving
-        if session_id in self.active_sessions:
-            del self.active_sessions[session_id]
+        await self.sessions.adelete(session_id)
         
         return True
     
     async def get_evaluation_history(self, user_id: str) -> List[EvaluationResult]:
         """Get user's evaluation history"""
         user_results = []
-        for session_id, result_data in self._saved_results.items():
-            if result_data['user_id'] == user_id:
-                # Convert back to EvaluationResult model
-                evaluation_result = EvaluationResult(
-                    level=DifficultyLevel(result_data['level']),
-                    score=result_data['score'],
-                    topics=result_data['topics'],
-                    learning_style=result_data['learning_style'],
-                    recommendations=result_data['recommendations']
-                )
-                user_results.append(evaluation_result)
+        for result_data in await self.result_repo.afind_by_user(user_id):
+            # Convert back to EvaluationResult model
+            evaluation_result = EvaluationResult(
+                level=DifficultyLevel(result_data['level']),
+                score=result_data['score'],
+                topics=result_data['topics'],
+                learning_style=result_data['learning_style'],
+                recommendations=result_data['recommendations']
+            )
+            user_results.append(evaluation_result)
         
         return user_results[-10:]  # Return last 10 evaluations
     
-    def get_session_by_id(self, session_id: str) -> Optional[EvaluationSession]:
+    async def get_session_by_id(self, session_id: str) -> Optional[EvaluationSession]:
         """Get session by ID (helper method)"""
-        return self.active_sessions.get(session_id)
+        return await self.sessions.aget(session_id)
+    
+    async def get_session_seed(self, session_id: str) -> int:
+        """Selection seed of a session, read from its saved result once the session is gone"""
+        session = await self.sessions.aget(session_id)
+        if session:
+            return session.seed
+        saved = await self.result_repo.afind_by_session_ids([session_id])
+        if saved and saved[0].get('seed') is not None:
+            return saved[0]['seed']
+        raise ValueError("Sesión no encontrada")
     
-    def cleanup_expired_sessions(self) -> None:
-        """Clean up expired sessions (call periodically)"""
-        current_time = datetime.now()
-        expired_sessions = [
-            session_id for session_id, session in self.active_sessions.items()
-            if current_time - session.start_time > timedelta(hours=2)
-        ]
-        
-        for session_id in expired_sessions:
-            del self.active_sessions[session_id]
+    def cleanup_expired_sessions(self) -> int:
+        """Clean up expired sessions (run periodically by the reaper started in the app lifespan)"""
+        return self.sessions.reap()
     
     # Private helper methods
     async def _get_next_adaptive_question(self, session: EvaluationSession) -> Optional[Question]:
-        """Select next question based on adaptive logic using repository"""
-        answered_ids = [a.question_id for a in session.answers]
-        
+        """Select next question based on adaptive logic using the question bank index"""
+        return await self._next_question_for(session.performance, session.seed)
+    
+    def _selection_rng(self, performance: SessionPerformance, seed: int) -> random.Random:
+        """Random source for one selection, fixed by the seed and the answers given so far"""
+        answered_ids = ",".join(str(question_id) for question_id in sorted(performance.answered_ids))
+        return random.Random(f"{seed}:{performance.answered}:{answered_ids}")
+    
+    async def _next_question_for(self, performance: SessionPerformance, seed: int,
+                                 target_difficulty: Optional[str] = None) -> Optional[Question]:
+        """Select the next question for a performance state; the same state and seed give the same question"""
         # Determine target difficulty based on performance analysis
-        target_difficulty = self._determine_next_difficulty(session)
-        
-        # Use repository to find questions of the target difficulty
-        available_questions_data = self.question_repo.find_by_difficulty(target_difficulty)
-        
-        # Filter out already answered questions
-        available_questions_data = [
-            q for q in available_questions_data 
-            if q['id'] not in answered_ids
-        ]
-        
-        if not available_questions_data:
-            # Fallback: try other difficulties if no questions available
-            fallback_difficulties = ["basic", "intermediate", "advanced"]
-            for difficulty in fallback_difficulties:
-                if difficulty != target_difficulty:
-                    fallback_questions = self.question_repo.find_by_difficulty(difficulty)
-                    fallback_questions = [
-                        q for q in fallback_questions 
-                        if q['id'] not in answered_ids
-                    ]
-                    if fallback_questions:
-                        available_questions_data = fallback_questions
-                        break
-        
-        if not available_questions_data:
+        target_difficulty = target_difficulty or self._determine_next_difficulty(performance)
+        
+        # Unanswered question of the target difficulty (or the first fallback one that has
+        # any left), preferring topics not covered yet
+        await question_bank.arefresh()
+        selected_question_data = question_bank.select(
+            target_difficulty, performance.answered_ids, performance.covered_topics,
+            self._selection_rng(performance, seed)
+        )
+        if not selected_question_data:
             return None
-        
-        # Select question based on topic diversity if possible
-        selected_question_data = self._select_diverse_question(available_questions_data, session)
         return self._dict_to_question(selected_question_data)
     
-    def _get_target_difficulties(self, session: EvaluationSession) -> List[str]:
-        """Determine target difficulties based on session performance"""
-        if len(session.answers) < 2:
-            return ["basic", "intermediate"]  # Start with easier questions
-        
-        # Analyze recent performance
-        recent_answers = session.answers[-2:]
-        recent_correct = sum(1 for a in recent_answers if self._is_answer_correct(a))
-        
-        # Adaptive logic
-        if recent_correct == 2:
-            return ["intermediate", "advanced"]
-        elif recent_correct == 0:
-            return ["basic", "intermediate"]
-        else:
-            return ["basic", "intermediate", "advanced"]
+    async def _next_question_for_state(self, node: WhatIfNode, seed: int) -> Optional[Question]:
+        """Select the next question for a memoized what-if state, memoizing it per seed"""
+        if node.has_question(seed):
+            return node.question(seed)
+        if node.target_difficulty is None:
+            node.target_difficulty = self._determine_next_difficulty(node.performance)
+        question = await self._next_question_for(node.performance, seed, node.target_difficulty)
+        node.remember_question(seed, question)
+        return question
     
     def _dict_to_question(self, data: dict) -> Question:
         """Convert dictionary to Question model"""
@@ -282,16 +294,14 @@ class DiagnosticService:
             topic=data['topic']
         )
     
-    def _determine_next_difficulty(self, session: EvaluationSession) -> str:
+    def _determine_next_difficulty(self, performance: SessionPerformance) -> str:
         """Determine the next question difficulty based on performance pattern"""
-        answers = session.answers
-        
         # First question: always start with basic
-        if len(answers) == 0:
+        if performance.answered == 0:
             return "basic"
         
         # Analyze performance patterns
-        performance_analysis = self._analyze_performance_pattern(session)
+        performance_analysis = self._analyze_performance_pattern(performance)
         
         # Decision logic based on performance
         if performance_analysis["consecutive_correct"] >= 3:
@@ -338,103 +348,35 @@ class DiagnosticService:
             # Maintain current level for mixed performance
             return performance_analysis["current_level"]
     
-    def _analyze_performance_pattern(self, session: EvaluationSession) -> Dict[str, any]:
-        """Analyze detailed performance patterns"""
-        answers = session.answers
-        
-        if not answers:
-            return {
-                "consecutive_correct": 0,
-                "consecutive_incorrect": 0,
-                "recent_accuracy": 0.0,
-                "current_level": "basic",
-                "difficulty_performance": {"basic": 0, "intermediate": 0, "advanced": 0}
-            }
-        
-        # Calculate consecutive streaks
-        consecutive_correct = 0
-        consecutive_incorrect = 0
-        
-        # Count from the end
-        for i in range(len(answers) - 1, -1, -1):
-            is_correct = self._is_answer_correct(answers[i])
-            if is_correct:
-                if consecutive_incorrect == 0:
-                    consecutive_correct += 1
-                else:
-                    break
-            else:
-                if consecutive_correct == 0:
-                    consecutive_incorrect += 1
-                else:
-                    break
-        
-        # Calculate recent accuracy (last 3 questions)
-        recent_answers = answers[-3:]
-        recent_correct = sum(1 for a in recent_answers if self._is_answer_correct(a))
-        recent_accuracy = recent_correct / len(recent_answers) if recent_answers else 0.0
-        
-        # Determine current level based on recent questions
-        current_level = "basic"
-        if recent_answers:
-            last_question_data = self.question_repo.find_by_id(recent_answers[-1].question_id)
-            if last_question_data:
-                current_level = last_question_data.get('difficulty', 'basic')
-        
-        # Performance by difficulty
-        difficulty_performance = {"basic": 0, "intermediate": 0, "advanced": 0}
-        for answer in answers:
-            question_data = self.question_repo.find_by_id(answer.question_id)
-            if question_data and self._is_answer_correct(answer):
-                difficulty = question_data.get('difficulty', 'basic')
-                difficulty_performance[difficulty] += 1
-        
+    def _record_answer(self, session: EvaluationSession, answer: UserAnswer) -> None:
+        """Grade a new answer and fold it into the session's running aggregates"""
+        self._grade_answer(answer)
+        session.performance.record(answer.question_id, answer.is_correct, answer.question_difficulty, answer.topic)
+    
+    def _analyze_performance_pattern(self, performance: SessionPerformance) -> Dict[str, any]:
+        """Analyze detailed performance patterns from a session's running aggregates"""
         return {
-            "consecutive_correct": consecutive_correct,
-            "consecutive_incorrect": consecutive_incorrect,
-            "recent_accuracy": recent_accuracy,
-            "current_level": current_level,
-            "difficulty_performance": difficulty_performance
+            "consecutive_correct": performance.consecutive_correct,
+            "consecutive_incorrect": performance.consecutive_incorrect,
+            "recent_accuracy": performance.recent_accuracy,
+            "current_level": performance.current_level,
+            "difficulty_performance": dict(performance.difficulty_performance)
         }
     
-    def _select_diverse_question(self, available_questions: List[Dict], session: EvaluationSession) -> Dict:
-        """Select question with topic diversity consideration"""
-        if len(available_questions) == 1:
-            return available_questions[0]
-        
-        # Get topics already covered
-        covered_topics = set()
-        for answer in session.answers:
-            question_data = self.question_repo.find_by_id(answer.question_id)
-            if question_data:
-                covered_topics.add(question_data.get('topic', ''))
-        
-        # Prefer questions from uncovered topics
-        uncovered_questions = [
-            q for q in available_questions 
-            if q.get('topic', '') not in covered_topics
-        ]
-        
-        if uncovered_questions:
-            return random.choice(uncovered_questions)
-        else:
-            # If all topics covered, select randomly
-            return random.choice(available_questions)
-    
-    def _should_end_evaluation(self, session: EvaluationSession) -> bool:
+    def _should_end_evaluation(self, performance: SessionPerformance) -> bool:
         """Determine if evaluation should end based on adaptive logic"""
-        answers = session.answers
+        answered = performance.answered
         
         # Minimum questions required
-        if len(answers) < 3:
+        if answered < 3:
             return False
         
         # Maximum questions limit
-        if len(answers) >= 8:  # Increased max for better assessment
+        if answered >= 8:  # Increased max for better assessment
             return True
         
         # Analyze performance pattern
-        performance_analysis = self._analyze_performance_pattern(session)
+        performance_analysis = self._analyze_performance_pattern(performance)
         
         # End conditions based on performance patterns
         
@@ -449,25 +391,25 @@ class DiagnosticService:
             return True
         
         # 3. Clear level determination: Good performance at one level, poor at next
-        if len(answers) >= 5:
+        if answered >= 5:
             basic_correct = performance_analysis["difficulty_performance"]["basic"]
             intermediate_correct = performance_analysis["difficulty_performance"]["intermediate"]
             advanced_correct = performance_analysis["difficulty_performance"]["advanced"]
             
             # Clear basic level
-            if basic_correct >= 2 and intermediate_correct == 0 and len(answers) >= 5:
+            if basic_correct >= 2 and intermediate_correct == 0 and answered >= 5:
                 return True
             
             # Clear intermediate level
-            if intermediate_correct >= 2 and advanced_correct == 0 and len(answers) >= 6:
+            if intermediate_correct >= 2 and advanced_correct == 0 and answered >= 6:
                 return True
             
             # Clear advanced level
-            if advanced_correct >= 2 and len(answers) >= 6:
+            if advanced_correct >= 2 and answered >= 6:
                 return True
         
         # 4. Oscillating performance: End after enough questions to determine level
-        if len(answers) >= 6:
+        if answered >= 6:
             recent_accuracy = performance_analysis["recent_accuracy"]
             # If performance is consistently mediocre, end evaluation
             if 0.4 <= recent_accuracy <= 0.6:
@@ -475,19 +417,20 @@ class DiagnosticService:
         
         return False
     
-    def _is_answer_correct(self, answer: UserAnswer) -> bool:
-        """Check if an answer is correct"""
-        question_data = self.question_repo.find_by_id(answer.question_id)
-        return question_data and answer.selected_option == question_data['correct_answer']
-    
-    def _determine_user_level(self, difficulty_performance: Dict[DifficultyLevel, int], score: int) -> DifficultyLevel:
-        """Determine user level based on performance"""
-        if difficulty_performance[DifficultyLevel.ADVANCED] >= 2 and score >= 75:
-            return DifficultyLevel.ADVANCED
-        elif difficulty_performance[DifficultyLevel.INTERMEDIATE] >= 2 and score >= 60:
-            return DifficultyLevel.INTERMEDIATE
-        else:
-            return DifficultyLevel.BASIC
+    def _grade_answer(self, answer: UserAnswer) -> None:
+        """Store the verdict, difficulty and topic of the answered question on the answer
+
+        Reads the in-memory question bank; callers refresh it first.
+        """
+        question_data = question_bank.get(answer.question_id)
+        if question_data is None:
+            answer.is_correct = False
+            answer.question_difficulty = None
+            answer.topic = None
+            return
+        answer.is_correct = answer.selected_option == question_data['correct_answer']
+        answer.question_difficulty = question_data.get('difficulty', 'basic')
+        answer.topic = question_data.get('topic', '')
     
     def _generate_recommendations(self, level: DifficultyLevel, topics: Dict[str, float], learning_style: str) -> List[str]:
         """Generate personalized recommendations"""
@@ -530,53 +473,28 @@ class DiagnosticService:
         """Generate unique session ID"""
         return f"eval_{int(datetime.now().timestamp())}_{uuid.uuid4().hex[:8]}"
     
-    async def get_next_adaptive_question_context(self, answers: List[dict], assume_answer: Optional[dict] = None) -> Optional[Question]:
+    async def get_next_adaptive_question_context(self, answers: List[dict], assume_answer: Optional[dict] = None,
+                                                 seed: int = 0) -> Optional[Question]:
         """
         Get next adaptive question based on answer context and optional assumed answer
         Used for tree visualization and what-if scenarios
         """
         try:
-            # Create a simulated session with the provided answers
-            simulated_answers = []
-            
-            for answer_data in answers:
-                answer = UserAnswer(
-                    question_id=answer_data['question_id'],
-                    selected_option=answer_data['selected_option'],
-                    time_spent=answer_data['time_spent'],
-                    difficulty=answer_data['difficulty']
-                )
-                simulated_answers.append(answer)
-            
-            # If assume_answer is provided, add it to the context
+            # Only the answered question and the selected option affect the adaptive state
+            history = [(answer_data['question_id'], answer_data['selected_option']) for answer_data in answers]
             if assume_answer:
-                assumed_answer = UserAnswer(
-                    question_id=assume_answer['questionId'],
-                    selected_option=assume_answer['selectedOption'],
-                    time_spent=5000,  # Default time
-                    difficulty='intermediate'  # Default difficulty
-                )
-                simulated_answers.append(assumed_answer)
-            
-            # Create temporary session for analysis
-            temp_session = EvaluationSession(
-                session_id=f"temp_{datetime.now().timestamp()}",
-                user_id="temp_user",
-                start_time=datetime.now(),
-                current_question_index=len(simulated_answers),
-                answers=simulated_answers,
-                is_completed=False
-            )
+                history.append((int(assume_answer['questionId']), int(assume_answer['selectedOption'])))
             
-            # Use existing adaptive logic to determine next question
-            next_question = await self._get_next_adaptive_question(temp_session)
-            return next_question
+            # States of the history's prefixes are memoized, so sibling branches share them
+            await question_bank.arefresh()
+            return await self._next_question_for_state(what_if_engine.state(history), seed)
             
         except Exception as e:
             print(f"Error getting next adaptive question: {str(e)}")
             return None
 
-    async def get_alternative_paths_info(self, answers: List[dict], current_question_id: int) -> List[dict]:
+    async def get_alternative_paths_info(self, answers: List[dict], current_question_id: int,
+                                         seed: int = 0) -> List[dict]:
         """
         Get alternative path information for tree visualization
         Shows what would happen with different answers
@@ -585,7 +503,7 @@ class DiagnosticService:
             alternatives = []
             
             # Get current question details
-            current_question_data = self.question_repo.find_by_id(current_question_id)
+            current_question_data = await self.question_repo.afind_by_id(current_question_id)
             if not current_question_data:
                 return alternatives
             
@@ -601,7 +519,7 @@ class DiagnosticService:
                 }
                 
                 # Get next question for this scenario
-                next_question = await self.get_next_adaptive_question_context(answers, assumed_answer)
+                next_question = await self.get_next_adaptive_question_context(answers, assumed_answer, seed)
                 
                 if next_question:
                     # Determine the condition and explanation
@@ -634,30 +552,48 @@ class DiagnosticService:
             print(f"Error getting alternative paths: {str(e)}")
             return []
 
-    def _determine_difficulty_from_performance(self, answers: List[dict]) -> str:
-        """Helper method to determine difficulty based on performance"""
-        if not answers:
-            return 'basic'
-        
-        correct_count = sum(1 for answer in answers if answer.get('is_correct', False))
-        accuracy = correct_count / len(answers)
-        
-        if accuracy >= 0.8:
-            return 'advanced'
-        elif accuracy >= 0.6:
-            return 'intermediate'
-        else:
-            return 'basic'
-
-    def _get_diverse_topic_question(self, available_questions: List[dict], answered_topics: List[str]) -> dict:
-        """Get a question from a topic not recently covered"""
-        # Prefer questions from topics not recently answered
-        for question in available_questions:
-            if question.get('topic') not in answered_topics[-3:]:  # Avoid last 3 topics
-                return question
-        
-        # If all topics are recent, return first available
-        return available_questions[0] if available_questions else None
+    async def get_adaptive_tree(self, answers: List[dict], depth: int, seed: int = 0) -> AdaptiveTreeResponse:
+        """
+        Correct/incorrect branching of the adaptive logic from an answer history, depth levels deep
+        Built breadth-first; branches reaching the same adaptive state share one node
+        """
+        history = [(answer_data['question_id'], answer_data['selected_option']) for answer_data in answers]
+        await question_bank.arefresh()
+        
+        nodes: List[AdaptiveTreeNode] = []
+        node_ids: Dict[Tuple, int] = {}
+        queue: Deque[Tuple[WhatIfNode, AdaptiveTreeNode]] = deque()
+        
+        def visit(state: WhatIfNode, level: int) -> int:
+            key = state.performance.state_key()
+            node_id = node_ids.get(key)
+            if node_id is None:
+                node_id = node_ids[key] = len(nodes)
+                nodes.append(AdaptiveTreeNode(node_id=node_id, depth=level))
+                queue.append((state, nodes[-1]))
+            return node_id
+        
+        visit(what_if_engine.state(history), 0)
+        while queue:
+            state, node = queue.popleft()
+            if self._should_end_evaluation(state.performance):
+                node.is_completed = True
+                continue
+            
+            question = await self._next_question_for_state(state, seed)
+            if question is None:
+                # Question bank exhausted
+                node.is_completed = True
+                continue
+            node.question = question
+            if node.depth >= depth:
+                continue
+            
+            incorrect_option = (question.correct_answer + 1) % len(question.options)
+            node.if_correct = visit(what_if_engine.child(state, (question.id, question.correct_answer)), node.depth + 1)
+            node.if_incorrect = visit(what_if_engine.child(state, (question.id, incorrect_option)), node.depth + 1)
+        
+        return AdaptiveTreeResponse(root_id=0, nodes=nodes)
 
 
 # Global service instance
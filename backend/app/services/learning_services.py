@@ -8,7 +8,9 @@ from app.models.learning import (
     DailyTip, CourseProgress, Instructor, CourseRating
 )
 from app.models.diagnostic import EvaluationResult
-from app.models.common import DifficultyLevel, LessonType, UserStats
+from app.models.common import (
+    DifficultyLevel, LessonType, UserStats, PaginationParams, PaginatedResponse
+)
 from app.repositories.learning_path_repository import learning_path_repository
 from app.repositories.course_module_repository import course_module_repository
 from app.repositories.lesson_repository import lesson_repository
@@ -16,6 +18,9 @@ from app.repositories.achievement_repository import achievement_repository
 from app.repositories.daily_tip_repository import daily_tip_repository
 from app.repositories.user_repository import user_repository
 
+# Fields read by _dict_to_achievement, so paginated queries only copy those
+ACHIEVEMENT_FIELDS = ("id", "title", "description", "icon", "points")
+
 class LearningService:
     """Service class for learning-related operations using repositories"""
     
@@ -29,14 +34,35 @@ class LearningService:
     
     async def get_learning_paths(self) -> List[LearningPath]:
         """Get all available learning paths"""
-        paths_data = self.learning_path_repo.find_all()
+        paths_data = await self.learning_path_repo.afind_all()
         return [self._dict_to_learning_path(path_data) for path_data in paths_data]
     
     async def get_learning_paths_by_difficulty(self, difficulty: DifficultyLevel) -> List[LearningPath]:
         """Get learning paths filtered by difficulty level"""
-        paths_data = self.learning_path_repo.find_by_difficulty(difficulty.value)
+        paths_data = await self.learning_path_repo.afind_by_difficulty(difficulty.value)
         return [self._dict_to_learning_path(path_data) for path_data in paths_data]
     
+    async def get_learning_paths_page(
+        self,
+        pagination: PaginationParams,
+        difficulty: Optional[DifficultyLevel] = None,
+        category: Optional[str] = None,
+        order_by: Optional[str] = None
+    ) -> PaginatedResponse:
+        """Get one page of the learning path catalog, optionally filtered"""
+        where = {}
+        if difficulty:
+            where['difficulty'] = difficulty.value
+        if category:
+            where['category'] = category
+        
+        paths_data = await self.learning_path_repo.aquery(
+            where, order_by, pagination.limit, pagination.offset
+        )
+        total = await self.learning_path_repo.acount(where)
+        paths = [self._dict_to_learning_path(path_data) for path_data in paths_data]
+        return PaginatedResponse.build(paths, total, pagination)
+    
     async def get_recommended_paths(self, user_id: str, evaluation_result: Optional[EvaluationResult] = None) -> List[LearningPath]:
         """Get recommended learning paths based on user's evaluation result"""
         all_paths = await self.get_learning_paths()
@@ -65,12 +91,12 @@ class LearningService:
     async def enroll_in_path(self, user_id: str, path_id: str) -> bool:
         """Enroll user in a learning path"""
         # Get user data
-        user_data = self.user_repo.find_by_id(user_id)
+        user_data = await self.user_repo.afind_by_id(user_id)
         if not user_data:
             raise ValueError("Usuario no encontrado")
         
         # Check if path exists
-        path_data = self.learning_path_repo.find_by_id(path_id)
+        path_data = await self.learning_path_repo.afind_by_id(path_id)
         if not path_data:
             raise ValueError("Ruta de aprendizaje no encontrada")
         
@@ -80,8 +106,7 @@ class LearningService:
             return False  # Already enrolled
         
         # Add to enrolled courses
-        enrolled_courses.append(path_id)
-        self.user_repo.update(user_id, {"enrolled_courses": enrolled_courses})
+        await self.user_repo.aupdate(user_id, {"enrolled_courses": enrolled_courses + [path_id]})
         
         return True
     
@@ -93,32 +118,35 @@ class LearningService:
         
         # Update progress in learning path (this is a simplification)
         # In a real implementation, you'd have a user_progress table
-        path_data = self.learning_path_repo.find_by_id(path_id)
+        path_data = await self.learning_path_repo.afind_by_id(path_id)
         if not path_data:
             raise ValueError("Ruta de aprendizaje no encontrada")
         
         # For now, we'll just update the progress in the path data
         # In a real DB, this would be in a separate user_progress table
-        return self.learning_path_repo.update(path_id, {"progress": progress}) is not None
+        return await self.learning_path_repo.aupdate(path_id, {"progress": progress}) is not None
     
     async def get_course_content(self, path_id: str) -> List[CourseModule]:
         """Get detailed course content for a specific learning path"""
-        modules_data = self.course_module_repo.find_by_course_id(path_id)
+        modules_data = await self.course_module_repo.afind_by_course_id(path_id)
+        # One lookup for the lessons of every module, grouped back in collection order
+        lessons_by_module: Dict[str, List[Lesson]] = {}
+        if modules_data:
+            lessons_data = await self.lesson_repo.afind_by_module_ids([module_data['id'] for module_data in modules_data])
+            for lesson_data in lessons_data:
+                lessons_by_module.setdefault(lesson_data.get('module_id'), []).append(self._dict_to_lesson(lesson_data))
         modules = []
         
         for module_data in modules_data:
-            lessons_data = self.lesson_repo.find_by_module_id(module_data['id'])
-            lessons = [self._dict_to_lesson(lesson_data) for lesson_data in lessons_data]
-            
             module = self._dict_to_course_module(module_data)
-            module.lessons = lessons
+            module.lessons = lessons_by_module.get(module_data['id'], [])
             modules.append(module)
         
         return sorted(modules, key=lambda x: x.order)
     
     async def get_lesson_content(self, lesson_id: str) -> Optional[Lesson]:
         """Get specific lesson content"""
-        lesson_data = self.lesson_repo.find_by_id(lesson_id)
+        lesson_data = await self.lesson_repo.afind_by_id(lesson_id)
         if not lesson_data:
             return None
         
@@ -163,18 +191,18 @@ class LearningService:
     
     async def get_recent_achievements(self, user_id: str, limit: int = 5) -> List[Achievement]:
         """Get user's recent achievements"""
-        achievements_data = self.achievement_repo.find_all()
+        achievements_data = await self.achievement_repo.afind_all()
         achievements = [self._dict_to_achievement(ach_data) for ach_data in achievements_data]
         return achievements[:limit]
     
     async def get_daily_tip(self) -> DailyTip:
         """Get daily tip for the user"""
-        tip_data = self.daily_tip_repo.get_random_tip()
+        tip_data = await self.daily_tip_repo.aget_random_tip()
         return self._dict_to_daily_tip(tip_data) if tip_data else self._get_default_tip()
     
     async def complete_lesson(self, user_id: str, lesson_id: str) -> None:
         """Mark a lesson as completed for a user"""
-        self.lesson_repo.mark_completed(lesson_id)
+        await self.lesson_repo.amark_completed(lesson_id)
         
         # Optionally, you can also unlock the next lesson here
         # This would require more complex logic to determine the next lesson
@@ -272,14 +300,29 @@ class LearningService:
         """Get all achievements for a user"""
         # In a real implementation, this would filter by user_id
         # For now, return all available achievements
-        achievements_data = self.achievement_repo.find_all()
+        achievements_data = await self.achievement_repo.afind_all()
         achievements = [self._dict_to_achievement(ach_data) for ach_data in achievements_data]
         return achievements
     
+    async def get_achievements_page(
+        self,
+        user_id: str,
+        pagination: PaginationParams,
+        order_by: Optional[str] = None
+    ) -> PaginatedResponse:
+        """Get one page of a user's achievements"""
+        # Like get_all_achievements, every available achievement is listed for now
+        achievements_data = await self.achievement_repo.aquery(
+            None, order_by, pagination.limit, pagination.offset, ACHIEVEMENT_FIELDS
+        )
+        total = await self.achievement_repo.acount()
+        achievements = [self._dict_to_achievement(ach_data) for ach_data in achievements_data]
+        return PaginatedResponse.build(achievements, total, pagination)
+    
     async def get_user_stats(self, user_id: str) -> UserStats:
         """Get user statistics for dashboard"""
         # Get user data
-        user_data = self.user_repo.find_by_id(user_id)
+        user_data = await self.user_repo.afind_by_id(user_id)
         if not user_data:
             raise ValueError("Usuario no encontrado")
         
@@ -312,7 +355,7 @@ class LearningService:
     async def get_user_path_progress(self, user_id: str) -> List[Dict[str, Any]]:
         """Get user's progress across all enrolled learning paths"""
         # Get user data
-        user_data = self.user_repo.find_by_id(user_id)
+        user_data = await self.user_repo.afind_by_id(user_id)
         if not user_data:
             raise ValueError("Usuario no encontrado")
         
@@ -321,7 +364,7 @@ class LearningService:
         
         for course_id in enrolled_courses:
             # Get learning path data
-            path_data = self.learning_path_repo.find_by_id(course_id)
+            path_data = await self.learning_path_repo.afind_by_id(course_id)
             if not path_data:
                 continue
                 
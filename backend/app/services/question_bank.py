@@ -0,0 +1,130 @@
+"""
+In-memory index of the question bank for adaptive question selection
+"""
+import random
+from collections import Counter
+from typing import Any, Collection, Dict, List, Optional, Tuple
+from app.repositories.question_repository import QuestionRepository, question_repository
+
+# Order in which other difficulties are tried when the target one is exhausted
+FALLBACK_DIFFICULTIES = ("basic", "intermediate", "advanced")
+# Random draws inside a bucket before falling back to filtering out answered questions
+MAX_DRAWS = 8
+
+BucketKey = Tuple[str, str]
+
+def bucket_key(question: Dict[str, Any]) -> BucketKey:
+    """(difficulty, topic) of a question"""
+    return (question.get('difficulty', 'basic'), question.get('topic', ''))
+
+class AnswerKey:
+    """Correct option, difficulty and topic of every question, by position in the bank"""
+
+    __slots__ = ("positions", "correct_answers", "difficulties", "topics")
+
+    def __init__(self, questions: List[Dict[str, Any]]):
+        self.positions: Dict[Any, int] = {}
+        self.correct_answers: List[int] = []
+        self.difficulties: List[str] = []
+        self.topics: List[str] = []
+        for position, question in enumerate(questions):
+            difficulty, topic = bucket_key(question)
+            self.positions[question['id']] = position
+            self.correct_answers.append(question['correct_answer'])
+            self.difficulties.append(difficulty)
+            self.topics.append(topic)
+
+class QuestionBank:
+    """Questions grouped by (difficulty, topic), rebuilt when the collection version changes
+
+    Selection only looks at the buckets and at the ids a session already answered,
+    so its cost does not grow with the size of the bank.
+    """
+
+    def __init__(self, repository: QuestionRepository):
+        self.repository = repository
+        self._version: Optional[int] = None
+        # (difficulty -> topic -> questions, question id -> question, answer key), swapped as one object
+        self._index: Tuple[Dict[str, Dict[str, List[Dict[str, Any]]]], Dict[Any, Dict[str, Any]], AnswerKey] = \
+            ({}, {}, AnswerKey([]))
+
+    @property
+    def version(self) -> Optional[int]:
+        """Collection version the index was built from"""
+        return self._version
+
+    def _build(self, questions: List[Dict[str, Any]], version: int) -> None:
+        buckets: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        by_id: Dict[Any, Dict[str, Any]] = {}
+        for question in questions:
+            difficulty, topic = bucket_key(question)
+            buckets.setdefault(difficulty, {}).setdefault(topic, []).append(question)
+            by_id.setdefault(question['id'], question)
+        self._index = (buckets, by_id, AnswerKey(list(by_id.values())))
+        self._version = version
+
+    def refresh(self) -> None:
+        """Rebuild the index if the question collection changed"""
+        version = self.repository.version()
+        if version != self._version:
+            self._build(self.repository.find_all(), version)
+
+    async def arefresh(self) -> None:
+        """Async variant of refresh"""
+        version = await self.repository.aversion()
+        if version != self._version:
+            self._build(await self.repository.afind_all(), version)
+
+    def get(self, question_id: Any) -> Optional[Dict[str, Any]]:
+        """Question by id, as of the last refresh"""
+        return self._index[1].get(question_id)
+
+    def questions(self) -> List[Dict[str, Any]]:
+        """Every question, one per id, as of the last refresh"""
+        return list(self._index[1].values())
+
+    def answer_key(self) -> AnswerKey:
+        """Answer key of every question, as of the last refresh"""
+        return self._index[2]
+
+    def select(self, difficulty: str, answered_ids: Collection[Any], covered_topics: Collection[str],
+               rng: Optional[random.Random] = None) -> Optional[Dict[str, Any]]:
+        """Pick an unanswered question, preferring difficulty and then topics not covered yet
+
+        If every question of difficulty was answered, the other difficulties are
+        tried in FALLBACK_DIFFICULTIES order. Each eligible question has the same
+        chance of being picked.
+        """
+        rng = rng or random
+        buckets, by_id, _ = self._index
+        answered_per_bucket = Counter(
+            bucket_key(by_id[question_id]) for question_id in answered_ids if question_id in by_id
+        )
+
+        for level in [difficulty] + [level for level in FALLBACK_DIFFICULTIES if level != difficulty]:
+            remaining = {}
+            for topic, questions in buckets.get(level, {}).items():
+                count = len(questions) - answered_per_bucket[(level, topic)]
+                if count > 0:
+                    remaining[topic] = count
+            if not remaining:
+                continue
+
+            uncovered = {topic: count for topic, count in remaining.items() if topic not in covered_topics}
+            choices = uncovered or remaining
+            topic = rng.choices(list(choices), weights=list(choices.values()))[0]
+            return self._draw(buckets[level][topic], answered_ids, rng)
+        return None
+
+    def _draw(self, questions: List[Dict[str, Any]], answered_ids: Collection[Any],
+              rng: random.Random) -> Dict[str, Any]:
+        """Uniform pick among the unanswered questions of a bucket"""
+        for _ in range(MAX_DRAWS):
+            question = questions[rng.randrange(len(questions))]
+            if question['id'] not in answered_ids:
+                return question
+        # Nearly exhausted bucket: filter instead of drawing again
+        return rng.choice([question for question in questions if question['id'] not in answered_ids])
+
+# Global instance
+question_bank = QuestionBank(question_repository)
@@ -0,0 +1,323 @@
+"""
+Storage of in-flight diagnostic evaluation sessions
+"""
+import asyncio
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.models.diagnostic import EvaluationSession
+from app.repositories.base_repository import MAX_WRITE_ATTEMPTS, ConcurrentModificationError
+from app.repositories.evaluation_repository import evaluation_session_repository
+from app.repositories.sqlite_repository import SQLiteRepository
+
+class SessionStore(ABC):
+    """Where DiagnosticService keeps sessions between requests
+
+    Sessions returned by get are copies owned by the caller: changes only
+    reach the store through put, or through modify when other requests may
+    change the same session at the same time.
+    """
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[EvaluationSession]:
+        """Session by id, or None if it does not exist or expired"""
+
+    @abstractmethod
+    def put(self, session: EvaluationSession) -> None:
+        """Insert or replace a session"""
+
+    @abstractmethod
+    def modify(self, session_id: str, change: Callable[[EvaluationSession], None]) -> Optional[EvaluationSession]:
+        """Apply change to a session as one atomic update, returning the changed copy
+
+        Returns None if the session does not exist or expired. change may run more
+        than once (on fresh copies), so it must not have other side effects.
+        """
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Remove a session; returns whether it existed"""
+
+    @abstractmethod
+    def reap(self) -> int:
+        """Remove expired sessions; returns how many were removed"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Size and eviction counters"""
+
+    async def aget(self, session_id: str) -> Optional[EvaluationSession]:
+        """Async variant of get"""
+        return self.get(session_id)
+
+    async def aput(self, session: EvaluationSession) -> None:
+        """Async variant of put"""
+        self.put(session)
+
+    async def amodify(self, session_id: str, change: Callable[[EvaluationSession], None]) -> Optional[EvaluationSession]:
+        """Async variant of modify"""
+        return self.modify(session_id, change)
+
+    async def adelete(self, session_id: str) -> bool:
+        """Async variant of delete"""
+        return self.delete(session_id)
+
+    async def astats(self) -> Dict[str, Any]:
+        """Async variant of stats"""
+        return self.stats()
+
+class InMemorySessionStore(SessionStore):
+    """Per-process LRU of sessions that expire after ttl_seconds without access
+
+    Once max_sessions are live, starting a new session evicts the least recently used one.
+    """
+
+    def __init__(self, ttl_seconds: float, max_sessions: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        # session_id -> (session, last access as time.monotonic()), least recently used first
+        self._sessions: 'OrderedDict[str, Tuple[EvaluationSession, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, last_access: float, now: float) -> bool:
+        return now - last_access > self.ttl_seconds
+
+    def _touch(self, session_id: str, now: float) -> Optional[EvaluationSession]:
+        """The stored session, marked as just used, or None; called with the lock held"""
+        stored = self._sessions.get(session_id)
+        if stored is None:
+            self.misses += 1
+            return None
+        if self._expired(stored[1], now):
+            del self._sessions[session_id]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._sessions[session_id] = (stored[0], now)
+        self._sessions.move_to_end(session_id)
+        self.hits += 1
+        return stored[0]
+
+    def get(self, session_id: str) -> Optional[EvaluationSession]:
+        with self._lock:
+            session = self._touch(session_id, time.monotonic())
+            return session.model_copy(deep=True) if session is not None else None
+
+    def put(self, session: EvaluationSession) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session.session_id] = (session.model_copy(deep=True), now)
+            self._sessions.move_to_end(session.session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def modify(self, session_id: str, change: Callable[[EvaluationSession], None]) -> Optional[EvaluationSession]:
+        now = time.monotonic()
+        with self._lock:
+            stored = self._touch(session_id, now)
+            if stored is None:
+                return None
+            # Changed on a copy, so a failing change leaves the stored session as it was
+            session = stored.model_copy(deep=True)
+            change(session)
+            self._sessions[session_id] = (session, now)
+            return session.model_copy(deep=True)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def reap(self) -> int:
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            # Least recently used first, so the scan stops at the first live session
+            for session_id, (_, last_access) in list(self._sessions.items()):
+                if not self._expired(last_access, now):
+                    break
+                del self._sessions[session_id]
+                removed += 1
+            self.expirations += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "size": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+class RepositorySessionStore(SessionStore):
+    """Sessions kept in a repository, shared by every worker and kept across restarts
+
+    Recording an answer rewrites only the session's row. Every write stores a new
+    revision token, and modify only writes if the token it read is still there, so
+    concurrent answers to one session (from any worker) are all kept. Sessions
+    expire after ttl_seconds without a write; rows without session_id are historical
+    sessions from the mock data and are never expired or evicted. Counters are per process.
+    """
+
+    def __init__(self, repository: SQLiteRepository, ttl_seconds: float, max_sessions: int):
+        self.repository = repository
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, row: Dict[str, Any], now: datetime) -> bool:
+        updated_at = datetime.fromisoformat(row['updated_at'])
+        return now - updated_at > timedelta(seconds=self.ttl_seconds)
+
+    def _row(self, session: EvaluationSession) -> Dict[str, Any]:
+        row = session.model_dump(mode="json")
+        row['id'] = session.session_id
+        row['updated_at'] = datetime.now().isoformat()
+        row['revision'] = uuid.uuid4().hex
+        return row
+
+    def _live_rows(self) -> List[Dict[str, Any]]:
+        return [row for row in self.repository.find_all() if 'session_id' in row]
+
+    def _session(self, row: Optional[Dict[str, Any]]) -> Tuple[Optional[EvaluationSession], bool]:
+        """The session in row, or None (counting the miss or expiry), and whether row expired
+
+        An expired row is left for the caller to delete with a sync or async call.
+        """
+        if row is None or 'session_id' not in row:
+            self.misses += 1
+            return None, False
+        if self._expired(row, datetime.now()):
+            self.expirations += 1
+            self.misses += 1
+            return None, True
+        self.hits += 1
+        return EvaluationSession.model_validate(row), False
+
+    def _evict(self) -> None:
+        """Delete the least recently written sessions beyond max_sessions"""
+        if self.repository.count() <= self.max_sessions:
+            return
+        rows = self._live_rows()
+        excess = len(rows) - self.max_sessions
+        if excess > 0:
+            rows.sort(key=lambda row: row['updated_at'])
+            self.repository.delete_many([row['id'] for row in rows[:excess]])
+            self.evictions += excess
+
+    def get(self, session_id: str) -> Optional[EvaluationSession]:
+        session, expired = self._session(self.repository.find_by_id(session_id))
+        if expired:
+            self.repository.delete(session_id)
+        return session
+
+    def put(self, session: EvaluationSession) -> None:
+        row = self._row(session)
+        if self.repository.update(session.session_id, row) is None:
+            self.repository.create(row)
+            self._evict()
+
+    def modify(self, session_id: str, change: Callable[[EvaluationSession], None]) -> Optional[EvaluationSession]:
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            row = self.repository.find_by_id(session_id)
+            session, expired = self._session(row)
+            if session is None:
+                if expired:
+                    self.repository.delete(session_id)
+                return None
+            change(session)
+            if self.repository.update_if(session_id, 'revision', row.get('revision'), self._row(session)) is not None:
+                return session
+        raise ConcurrentModificationError(f"Session {session_id} kept changing during an update")
+
+    def delete(self, session_id: str) -> bool:
+        return self.repository.delete(session_id)
+
+    async def aget(self, session_id: str) -> Optional[EvaluationSession]:
+        session, expired = self._session(await self.repository.afind_by_id(session_id))
+        if expired:
+            await self.repository.adelete(session_id)
+        return session
+
+    async def aput(self, session: EvaluationSession) -> None:
+        row = self._row(session)
+        if await self.repository.aupdate(session.session_id, row) is None:
+            await self.repository.acreate(row)
+            # Counting and scanning the sessions is blocking I/O
+            await asyncio.to_thread(self._evict)
+
+    async def amodify(self, session_id: str, change: Callable[[EvaluationSession], None]) -> Optional[EvaluationSession]:
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            row = await self.repository.afind_by_id(session_id)
+            session, expired = self._session(row)
+            if session is None:
+                if expired:
+                    await self.repository.adelete(session_id)
+                return None
+            change(session)
+            if await self.repository.aupdate_if(session_id, 'revision', row.get('revision'), self._row(session)) is not None:
+                return session
+        raise ConcurrentModificationError(f"Session {session_id} kept changing during an update")
+
+    async def adelete(self, session_id: str) -> bool:
+        return await self.repository.adelete(session_id)
+
+    def reap(self) -> int:
+        now = datetime.now()
+        expired = [row['id'] for row in self._live_rows() if self._expired(row, now)]
+        if expired:
+            self.repository.delete_many(expired)
+            self.expirations += len(expired)
+        return len(expired)
+
+    async def astats(self) -> Dict[str, Any]:
+        # Counting the live sessions scans the table
+        return await asyncio.to_thread(self.stats)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "repository",
+            "size": len(self._live_rows()),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+def _create_session_store() -> SessionStore:
+    """Session store selected by SESSION_STORE"""
+    ttl_seconds = settings.SESSION_TTL_MINUTES * 60
+    if settings.SESSION_STORE == "memory":
+        return InMemorySessionStore(ttl_seconds, settings.MAX_ACTIVE_SESSIONS)
+    return RepositorySessionStore(evaluation_session_repository, ttl_seconds, settings.MAX_ACTIVE_SESSIONS)
+
+async def run_reaper(store: SessionStore, interval_seconds: float) -> None:
+    """Remove expired sessions every interval_seconds until cancelled"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(store.reap)
+        except Exception as e:
+            print(f"Error reaping expired sessions: {e}")
+
+# Global instance shared by the diagnostic service
+session_store = _create_session_store()
@@ -0,0 +1,122 @@
+"""
+Memoized adaptive state for hypothetical answer histories (tree visualization)
+"""
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from app.core.config import settings
+from app.models.diagnostic import SessionPerformance
+from app.services.question_bank import QuestionBank, question_bank
+
+# One answer as far as adaptive decisions go: which question and which option.
+# Time spent and client-reported correctness never change the next question.
+AnswerStep = Tuple[Any, int]
+
+# Seeds whose next question each state remembers; seeds are per session, so
+# older ones are dropped instead of growing with every session that passes by
+QUESTIONS_PER_NODE = 8
+
+class WhatIfNode:
+    """Adaptive state after one answer history"""
+
+    __slots__ = ("node_id", "performance", "target_difficulty", "questions")
+
+    def __init__(self, node_id: int, performance: SessionPerformance):
+        self.node_id = node_id
+        self.performance = performance
+        # Filled in by DiagnosticService the first time they are needed
+        self.target_difficulty: Optional[str] = None
+        # Next question per session seed, most recently used last
+        self.questions: 'OrderedDict[int, Any]' = OrderedDict()
+
+    def has_question(self, seed: int) -> bool:
+        return seed in self.questions
+
+    def question(self, seed: int) -> Any:
+        """Remembered next question for seed (None when the bank had none left)"""
+        self.questions.move_to_end(seed)
+        return self.questions[seed]
+
+    def remember_question(self, seed: int, question: Any) -> None:
+        self.questions[seed] = question
+        self.questions.move_to_end(seed)
+        while len(self.questions) > QUESTIONS_PER_NODE:
+            self.questions.popitem(last=False)
+
+class WhatIfEngine:
+    """LRU of adaptive states keyed by (parent state, question id, selected option)
+
+    Histories sharing a prefix share the states of that prefix, so walking a
+    history of n answers costs n dictionary lookups and only new answers are
+    graded. States are keyed by the question bank version they were graded
+    against, so a changed bank starts from fresh states.
+    """
+
+    def __init__(self, bank: QuestionBank, max_nodes: int):
+        self.bank = bank
+        self.max_nodes = max_nodes
+        self._nodes: 'OrderedDict[Tuple[Any, ...], WhatIfNode]' = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: Tuple[Any, ...]) -> Optional[WhatIfNode]:
+        node = self._nodes.get(key)
+        if node is not None:
+            self._nodes.move_to_end(key)
+            self.hits += 1
+        return node
+
+    def _store(self, key: Tuple[Any, ...], performance: SessionPerformance) -> WhatIfNode:
+        node = WhatIfNode(next(self._ids), performance)
+        self._nodes[key] = node
+        self.misses += 1
+        while len(self._nodes) > self.max_nodes:
+            self._nodes.popitem(last=False)
+        return node
+
+    def root(self) -> WhatIfNode:
+        """State before any answer"""
+        key = ("root", self.bank.version)
+        with self._lock:
+            return self._lookup(key) or self._store(key, SessionPerformance())
+
+    def child(self, node: WhatIfNode, step: AnswerStep) -> WhatIfNode:
+        """State after answering step from node"""
+        key = (node.node_id,) + tuple(step)
+        with self._lock:
+            found = self._lookup(key)
+            if found is not None:
+                return found
+        performance = node.performance.model_copy(deep=True)
+        question_id, selected_option = step
+        question = self.bank.get(question_id)
+        if question is None:
+            performance.record(question_id, False, None, None)
+        else:
+            performance.record(
+                question_id,
+                selected_option == question['correct_answer'],
+                question.get('difficulty', 'basic'),
+                question.get('topic', '')
+            )
+        with self._lock:
+            # Another request may have built the same state meanwhile; either copy is equivalent
+            return self._lookup(key) or self._store(key, performance)
+
+    def state(self, history: Iterable[AnswerStep]) -> WhatIfNode:
+        """State after answering every step of history in order"""
+        node = self.root()
+        for step in history:
+            node = self.child(node, step)
+        return node
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._nodes), "max_nodes": self.max_nodes,
+                    "hits": self.hits, "misses": self.misses}
+
+# Global instance shared by the what-if endpoints
+what_if_engine = WhatIfEngine(question_bank, settings.WHAT_IF_CACHE_SIZE)
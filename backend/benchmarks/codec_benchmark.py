@@ -0,0 +1,75 @@
+"""
+Benchmark load/save times of the repository JSON codecs
+
+Scales questions.json and users.json up to a target row count and times
+parsing and writing them with every available codec, indented and compact.
+
+Usage (from the backend directory):
+    python -m benchmarks.codec_benchmark [--rows 100000] [--repeat 3]
+"""
+import argparse
+import copy
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+from app.repositories.codecs import StdlibJsonCodec, OrjsonCodec, orjson
+
+DATA_DIR = Path(__file__).parent.parent / "app" / "data"
+
+def scale_collection(name: str, rows: int) -> Dict[str, Any]:
+    """Repeat the rows of a data file (with fresh ids) until it has the requested size"""
+    codec = StdlibJsonCodec()
+    seed = codec.loads((DATA_DIR / f"{name}.json").read_bytes())[name]
+    items: List[Dict[str, Any]] = []
+    for i in range(rows):
+        item = copy.deepcopy(seed[i % len(seed)])
+        item['id'] = i + 1 if isinstance(item.get('id'), int) else str(i + 1)
+        if 'email' in item:
+            item['email'] = f"user{i + 1}@email.com"
+        items.append(item)
+    return {name: items}
+
+def best_of(repeat: int, func) -> float:
+    """Fastest of several runs, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    codecs = [StdlibJsonCodec()]
+    if orjson is not None:
+        codecs.append(OrjsonCodec())
+    else:
+        print("orjson is not installed, only the stdlib codec is measured")
+
+    print(f"{'collection':<12} {'codec':<8} {'format':<9} {'size MB':>8} {'load ms':>9} {'save ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("questions", "users"):
+            data = scale_collection(name, args.rows)
+            for codec in codecs:
+                for compact in (False, True):
+                    path = Path(tmp) / f"{name}.json"
+
+                    def save() -> None:
+                        path.write_bytes(codec.dumps(data, compact=compact))
+
+                    def load() -> None:
+                        codec.loads(path.read_bytes())
+
+                    save_ms = best_of(args.repeat, save)
+                    load_ms = best_of(args.repeat, load)
+                    size_mb = path.stat().st_size / (1024 * 1024)
+                    layout = "compact" if compact else "indented"
+                    print(f"{name:<12} {codec.name:<8} {layout:<9} {size_mb:>8.1f} {load_ms:>9.1f} {save_ms:>9.1f}")
+
+if __name__ == "__main__":
+    main()
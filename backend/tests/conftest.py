@@ -0,0 +1,32 @@
+"""
+Shared test fixtures
+
+The app is imported against a copy of app/data in a temporary directory, so
+tests never write to the checked-in data files.
+"""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DATA_COPY = Path(tempfile.mkdtemp(prefix="codigo-para-todos-data-"))
+for data_file in (BACKEND_DIR / "app" / "data").glob("*.json"):
+    shutil.copy(data_file, DATA_COPY)
+
+os.environ["REPOSITORY_DATA_DIR"] = str(DATA_COPY)
+os.environ["SQLITE_DATABASE_PATH"] = str(DATA_COPY / "test.db")
+os.environ["ENABLE_MOCK_DATA"] = "False"
+
+from app.core.config import settings  # noqa: E402
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(DATA_COPY, ignore_errors=True)
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Empty data directory for repositories created inside the test"""
+    monkeypatch.setattr(settings, "REPOSITORY_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "SQLITE_DATABASE_PATH", str(tmp_path / "test.db"))
+    return tmp_path
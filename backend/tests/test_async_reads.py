@@ -0,0 +1,45 @@
+"""
+Async reads run inline only when the cached collection is current
+"""
+import asyncio
+import json
+import pytest
+from app.repositories import base_repository
+from app.repositories.base_repository import CollectionRepository
+
+@pytest.fixture
+def repository(data_dir):
+    repository = CollectionRepository("items")
+    repository.create_many([{"id": "1", "name": "a"}, {"id": "2", "name": "b"}])
+    return repository
+
+def write_externally(repository, name):
+    """Rewrite the file the way another process would, bypassing the cache"""
+    data = json.loads(repository.file_path.read_text())
+    data["items"][0]["name"] = name
+    temp_path = repository.file_path.with_name("external.tmp")
+    temp_path.write_text(json.dumps(data))
+    temp_path.replace(repository.file_path)
+
+def test_current_cache_reads_inline(repository, monkeypatch):
+    repository.find_all()
+    monkeypatch.setattr(base_repository, "_io_executor", None)
+    assert repository._can_read_inline()
+    assert asyncio.run(repository.afind_by_id("2"))["name"] == "b"
+
+def test_stale_cache_reads_on_io_pool(repository, monkeypatch):
+    repository.find_all()
+    write_externally(repository, "changed")
+    assert not repository._can_read_inline()
+
+    used = []
+    executor = base_repository._io_executor
+    class RecordingExecutor:
+        def submit(self, func, *args, **kwargs):
+            used.append(func)
+            return executor.submit(func, *args, **kwargs)
+    monkeypatch.setattr(base_repository, "_io_executor", RecordingExecutor())
+
+    assert asyncio.run(repository.afind_by_id("1"))["name"] == "changed"
+    assert used
+    assert repository._can_read_inline()
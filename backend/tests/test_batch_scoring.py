@@ -0,0 +1,134 @@
+"""
+Batch scoring follows the same grading rule as calculate_results
+"""
+import asyncio
+import random
+import pytest
+from app.models.diagnostic import EvaluationSession, UserAnswer
+from app.repositories.evaluation_repository import EvaluationResultRepository
+from app.services import batch_scoring
+from app.services.batch_scoring import BatchScorer
+from app.services.diagnostic_service import diagnostic_service
+from app.repositories.question_repository import QuestionRepository
+from app.services.question_bank import QuestionBank, question_bank
+from app.services.session_store import InMemorySessionStore
+
+ENGINES = [
+    "python",
+    pytest.param("numpy", marks=pytest.mark.skipif(batch_scoring.np is None, reason="numpy is not installed"))
+]
+
+@pytest.fixture
+def service(data_dir, monkeypatch):
+    monkeypatch.setattr(diagnostic_service, "sessions", InMemorySessionStore(3600, 10000))
+    monkeypatch.setattr(diagnostic_service, "result_repo", EvaluationResultRepository())
+    question_bank.refresh()
+    return diagnostic_service
+
+@pytest.fixture
+def bank(service, monkeypatch):
+    """Question bank over a copy of the questions that the test can change"""
+    repository = QuestionRepository()
+    repository.create_many(question_bank.questions())
+    bank = QuestionBank(repository)
+    bank.refresh()
+    monkeypatch.setattr("app.services.diagnostic_service.question_bank", bank)
+    return bank
+
+def graded_answer(question_id, selected_option, time_spent):
+    answer = UserAnswer(question_id=question_id, selected_option=selected_option,
+                        time_spent=time_spent, difficulty="basic")
+    diagnostic_service._grade_answer(answer)
+    return answer
+
+def random_sessions(count, seed=1):
+    rng = random.Random(seed)
+    questions = question_bank.questions()
+    sessions = []
+    for index in range(count):
+        session = EvaluationSession(session_id=f"s{index}", user_id=str(index % 5))
+        for _ in range(rng.randint(1, 15)):
+            # Some answers point at questions missing from the bank
+            question = rng.choice(questions) if rng.random() > 0.05 else {"id": 9999, "correct_answer": 0}
+            selected = question["correct_answer"] if rng.random() < 0.6 else rng.randint(0, 3)
+            session.answers.append(graded_answer(question["id"], selected, rng.choice([rng.randint(0, 60000), 30000])))
+        sessions.append(session)
+    return sessions
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engines_match_calculate_results(service, engine, monkeypatch):
+    monkeypatch.setattr("app.services.diagnostic_service.batch_scorer", BatchScorer(engine))
+    sessions = random_sessions(300)
+    for session in sessions:
+        service.sessions.put(session)
+
+    async def run():
+        batch, skipped = await service.calculate_results_batch([session.session_id for session in sessions] + ["missing"])
+        single = {session.session_id: await service.calculate_results(session.session_id) for session in sessions}
+        return batch, skipped, single
+
+    batch, skipped, single = asyncio.run(run())
+    assert skipped == ["missing"]
+    for session_id, result in single.items():
+        assert batch[session_id].model_dump() == result.model_dump()
+        assert list(batch[session_id].topics) == list(result.topics)
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_scoring_again_follows_the_current_answer_key(service, bank, engine, monkeypatch):
+    monkeypatch.setattr("app.services.diagnostic_service.batch_scorer", BatchScorer(engine))
+    # Questions 1 and 2 are answered correctly, question 3 is not
+    answers = [
+        graded_answer(1, bank.get(1)["correct_answer"], 1000),
+        graded_answer(2, bank.get(2)["correct_answer"], 1000),
+        graded_answer(3, (bank.get(3)["correct_answer"] + 1) % 4, 1000)
+    ]
+    service.sessions.put(EvaluationSession(session_id="s", user_id="1", answers=answers))
+
+    async def run():
+        return await service.calculate_results("s"), (await service.calculate_results_batch(["s"]))[0]["s"]
+
+    before, _ = asyncio.run(run())
+    assert before.score == 67
+
+    # The answer key of question 1 changes and question 3 is now answered correctly, under a new topic
+    bank.repository.update(1, {"correct_answer": (bank.get(1)["correct_answer"] + 1) % 4})
+    bank.repository.update(3, {"correct_answer": answers[2].selected_option, "topic": "Nuevo tema"})
+    single, batch = asyncio.run(run())
+    assert single.score == batch.score == 67
+    assert single.topics[bank.get(1)["topic"]] < before.topics[bank.get(1)["topic"]]
+    assert single.topics["Nuevo tema"] == 1.0
+    assert single.model_dump() == batch.model_dump()
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_removed_questions_keep_the_verdict_recorded_at_submit_time(service, bank, engine, monkeypatch):
+    monkeypatch.setattr("app.services.diagnostic_service.batch_scorer", BatchScorer(engine))
+    answers = [graded_answer(1, bank.get(1)["correct_answer"], 1000), graded_answer(2, 9, 1000)]
+    service.sessions.put(EvaluationSession(session_id="s", user_id="1", answers=answers))
+    bank.repository.delete(1)
+    bank.repository.delete(2)
+
+    async def run():
+        return await service.calculate_results("s"), (await service.calculate_results_batch(["s"]))[0]["s"]
+
+    single, batch = asyncio.run(run())
+    assert single.score == batch.score == 50
+    assert single.model_dump() == batch.model_dump()
+
+def test_saved_results_can_be_scored_again(service):
+    sessions = random_sessions(3, seed=2)
+    for session in sessions:
+        service.sessions.put(session)
+
+    async def run():
+        expected = {}
+        for session in sessions:
+            expected[session.session_id] = await service.calculate_results(session.session_id)
+            await service.save_results(session.session_id, expected[session.session_id])
+        batch, skipped = await service.calculate_results_batch([session.session_id for session in sessions])
+        return expected, batch, skipped
+
+    expected, batch, skipped = asyncio.run(run())
+    assert service.sessions.get("s0") is None
+    assert skipped == []
+    assert {session_id: result.model_dump() for session_id, result in batch.items()} == \
+        {session_id: result.model_dump() for session_id, result in expected.items()}
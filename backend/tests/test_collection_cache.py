@@ -0,0 +1,30 @@
+"""
+Cached collections are reloaded when another process rewrites the file
+"""
+import json
+import os
+from app.repositories.base_repository import BaseRepository
+
+class JsonItems(BaseRepository):
+    def __init__(self):
+        super().__init__("items")
+
+    def get_collection_name(self) -> str:
+        return "items"
+
+ITEMS = [{"id": str(i), "name": f"item {i}"} for i in range(1, 6)]
+
+def test_external_writes_invalidate_the_cache(data_dir):
+    items = JsonItems()
+    items.create_many(ITEMS)
+    assert items.find_by_id("1")["name"] == "item 1"
+
+    # Rewritten the way another process would, through a new file
+    data = json.loads(items.file_path.read_text(encoding="utf-8"))
+    data["items"][0]["name"] = "renamed"
+    temporary = items.file_path.with_suffix(".external")
+    temporary.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(temporary, items.file_path)
+
+    assert items.find_by_id("1")["name"] == "renamed"
+    assert items.count() == len(ITEMS)
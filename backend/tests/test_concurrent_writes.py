@@ -0,0 +1,43 @@
+"""
+Writes retry on the new data when another process changed the file without the lock
+"""
+import json
+import os
+from app.repositories.base_repository import BaseRepository
+from app.repositories.collection_cache import collection_cache
+
+class JsonItems(BaseRepository):
+    def __init__(self):
+        super().__init__("items")
+
+    def get_collection_name(self) -> str:
+        return "items"
+
+ITEMS = [{"id": str(i), "name": f"item {i}"} for i in range(1, 6)]
+
+def write_externally(repository, item):
+    """Add a row the way another process would, without the lock"""
+    data = json.loads(repository.file_path.read_text(encoding="utf-8"))
+    data["items"].append(item)
+    temporary = repository.file_path.with_suffix(".external")
+    temporary.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(temporary, repository.file_path)
+
+def test_writes_retry_after_a_concurrent_modification(data_dir, monkeypatch):
+    items = JsonItems()
+    items.create_many(ITEMS)
+    persist = items._persist
+    calls = []
+
+    def racing_persist(entry, records):
+        if not calls:
+            write_externally(items, {"id": "external", "name": "external"})
+        calls.append(records)
+        return persist(entry, records)
+    monkeypatch.setattr(items, "_persist", racing_persist)
+
+    items.update("1", {"name": "ours"})
+    assert len(calls) == 2
+    collection_cache.invalidate(items.file_path)
+    assert items.find_by_id("external") is not None
+    assert items.find_by_id("1")["name"] == "ours"
@@ -0,0 +1,159 @@
+"""
+Diagnostic evaluation: grading, adaptive selection and scoring
+"""
+import asyncio
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.diagnostic import SessionPerformance, UserAnswer
+from app.repositories.collection_cache import collection_cache
+from app.repositories.evaluation_repository import EvaluationSessionRepository
+from app.repositories.question_repository import question_repository
+from app.services.diagnostic_service import diagnostic_service
+from app.services.question_bank import QuestionBank
+from app.services.what_if import QUESTIONS_PER_NODE, what_if_engine
+from app.services.session_store import InMemorySessionStore, RepositorySessionStore
+
+@pytest.fixture
+def sessions(monkeypatch):
+    store = InMemorySessionStore(3600, 1000)
+    monkeypatch.setattr(diagnostic_service, "sessions", store)
+    return store
+
+def answer(question_id, selected_option, time_spent=20000):
+    return UserAnswer(question_id=question_id, selected_option=selected_option,
+                      time_spent=time_spent, difficulty="basic")
+
+def test_answers_are_graded_from_the_question_bank(sessions, monkeypatch):
+    def blocking_lookup(*args):
+        raise AssertionError("sync repository lookup on the event loop")
+    monkeypatch.setattr(question_repository, "find_by_id", blocking_lookup)
+
+    async def run():
+        session = await diagnostic_service.start_evaluation_session("1", seed=7)
+        await diagnostic_service.submit_answer(session.session_id, answer(1, 1))
+        await diagnostic_service.submit_answer(session.session_id, answer(1000, 0))
+        return await sessions.aget(session.session_id)
+
+    graded = asyncio.run(run()).answers
+    assert (graded[0].is_correct, graded[0].question_difficulty, graded[0].topic) == (True, "basic", "Variables")
+    assert (graded[1].is_correct, graded[1].question_difficulty, graded[1].topic) == (False, None, None)
+
+def test_bank_refresh_reads_the_version_off_the_event_loop(monkeypatch):
+    version = question_repository.version
+    threads = []
+    def recording_version():
+        threads.append(threading.get_ident())
+        return version()
+    monkeypatch.setattr(question_repository, "version", recording_version)
+
+    bank = QuestionBank(question_repository)
+    collection_cache.invalidate(question_repository.file_path)
+    asyncio.run(bank.arefresh())
+    assert threads and threads[0] != threading.get_ident()
+    assert bank.version == version() and bank.get(1)["topic"] == "Variables"
+
+def test_what_if_states_remember_a_bounded_number_of_seeds():
+    history = [{"question_id": 1, "selected_option": 1}]
+    seeds = range(QUESTIONS_PER_NODE * 3)
+
+    async def run():
+        first = [await diagnostic_service.get_next_adaptive_question_context(history, seed=seed) for seed in seeds]
+        again = [await diagnostic_service.get_next_adaptive_question_context(history, seed=seed) for seed in seeds]
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert [question.id for question in first] == [question.id for question in again]
+    assert len(what_if_engine.state([(1, 1)]).questions) == QUESTIONS_PER_NODE
+
+def tree_states(tree, history):
+    """The what-if state of every node, found by walking the tree from the root"""
+    states = {0: what_if_engine.state(history)}
+    for node in tree.nodes:
+        question = node.question
+        for child, option in ((node.if_correct, question.correct_answer if question else None),
+                              (node.if_incorrect, (question.correct_answer + 1) % len(question.options) if question else None)):
+            if child is not None and child not in states:
+                states[child] = what_if_engine.child(states[node.node_id], (question.id, option))
+    return states
+
+def test_adaptive_tree_has_one_node_per_state():
+    depth = 4
+    tree = asyncio.run(diagnostic_service.get_adaptive_tree([], depth, seed=3))
+    assert [node.node_id for node in tree.nodes] == list(range(len(tree.nodes)))
+    for node in tree.nodes:
+        for child in (node.if_correct, node.if_incorrect):
+            if child is not None:
+                assert tree.nodes[child].depth == node.depth + 1
+
+    states = tree_states(tree, [])
+    assert len(states) == len(tree.nodes)
+    assert len({state.performance.state_key() for state in states.values()}) == len(tree.nodes)
+
+def test_adaptive_tree_shares_nodes_between_equal_states(monkeypatch):
+    # Only the answer count decides: every branch at one depth reaches the same state
+    monkeypatch.setattr(SessionPerformance, "state_key", lambda self: (self.answered,))
+    depth = 4
+    tree = asyncio.run(diagnostic_service.get_adaptive_tree([], depth, seed=3))
+    # One node per depth (the path may end early once the evaluation completes)
+    assert 1 < len(tree.nodes) <= depth + 1
+    assert [node.depth for node in tree.nodes] == list(range(len(tree.nodes)))
+    for node in tree.nodes[:-1]:
+        assert node.if_correct == node.if_incorrect == node.node_id + 1
+
+
+def test_sessions_with_the_same_seed_ask_the_same_questions(sessions):
+    async def run(seed):
+        session = await diagnostic_service.start_evaluation_session("1", seed=seed)
+        question = (await diagnostic_service.get_adaptive_questions(session.session_id))[0]
+        asked = [question.id]
+        for turn in range(6):
+            response = await diagnostic_service.submit_answer(
+                session.session_id, answer(question.id, question.correct_answer if turn % 2 else 0))
+            if response.is_completed:
+                break
+            question = response.next_question
+            asked.append(question.id)
+        return asked
+
+    asked = asyncio.run(run(11))
+    assert asyncio.run(run(11)) == asked
+    assert len(set(asked)) == len(asked) > 1
+
+def test_concurrent_submits_keep_every_answer(data_dir, monkeypatch):
+    sessions = RepositorySessionStore(EvaluationSessionRepository(), 3600, 1000)
+    monkeypatch.setattr(diagnostic_service, "sessions", sessions)
+
+    async def run():
+        session = await diagnostic_service.start_evaluation_session("1", seed=5)
+        await asyncio.gather(*(
+            diagnostic_service.submit_answer(session.session_id, answer(question_id, 0))
+            for question_id in (1, 2, 3)
+        ))
+        return await sessions.aget(session.session_id)
+
+    session = asyncio.run(run())
+    assert sorted(answer.question_id for answer in session.answers) == [1, 2, 3]
+    assert session.performance.answered == 3
+
+def test_exploration_uses_the_seed_of_the_session():
+    history = [{"question_id": 1, "selected_option": 1, "is_correct": True, "difficulty": "basic", "time_spent": 1000}]
+    with TestClient(app) as client:
+        session = client.post("/api/diagnostic/start-session", json={"user_id": "1"}).json()
+        expected = asyncio.run(diagnostic_service.get_adaptive_tree(history, 2, session["seed"])).model_dump(mode="json")
+
+        def tree(**request):
+            return client.post("/api/diagnostic/adaptive-tree", json={"answers": history, "depth": 2, **request})
+
+        assert tree(session_id=session["session_id"]).json() == expected
+        assert tree(seed=session["seed"]).json() == expected
+        assert tree().status_code == 422
+        assert tree(session_id="missing").status_code == 404
+
+        # Saving the results removes the session; its seed is read from the saved result
+        client.post("/api/diagnostic/submit-answer", json={"session_id": session["session_id"], "answer": {
+            "question_id": 1, "selected_option": 1, "time_spent": 1000, "difficulty": "basic"}})
+        assert client.post(f"/api/diagnostic/save-results/{session['session_id']}").status_code == 200
+        assert client.get(f"/api/diagnostic/session/{session['session_id']}").status_code == 404
+        assert tree(session_id=session["session_id"]).json() == expected
@@ -0,0 +1,43 @@
+"""
+Journal mode replays the mutation log over the JSON file and folds it back in
+"""
+import json
+from app.core.config import settings
+from app.repositories.base_repository import BaseRepository
+from app.repositories.collection_cache import collection_cache
+
+class JournalItems(BaseRepository):
+    def __init__(self):
+        super().__init__("items")
+        self.storage_mode = "journal"
+
+    def get_collection_name(self) -> str:
+        return "items"
+
+ITEMS = [{"id": str(i), "name": f"item {i}"} for i in range(1, 6)]
+
+def test_journal_replays_and_compacts_to_the_same_data(data_dir):
+    items = JournalItems()
+    items.create_many(ITEMS)
+    items.update("2", {"name": "updated"})
+    items.delete("3")
+    expected = items.find_all()
+    assert items.journal_path.stat().st_size > 0
+
+    collection_cache.invalidate(items.file_path)
+    assert JournalItems().find_all() == expected
+
+    assert items.compact()
+    assert len(items.journal_path.read_bytes().splitlines()) == 1
+    assert json.loads(items.file_path.read_text(encoding="utf-8"))["items"] == expected
+    collection_cache.invalidate(items.file_path)
+    assert JournalItems().find_all() == expected
+
+def test_journal_compacts_once_it_grows(data_dir, monkeypatch):
+    monkeypatch.setattr(settings, "JOURNAL_COMPACT_BYTES", 512)
+    items = JournalItems()
+    for item in ITEMS * 4:
+        items.create({**item, "id": f"{item['id']}-{items.count()}"})
+    assert items.journal_path.stat().st_size < 512
+    collection_cache.invalidate(items.file_path)
+    assert JournalItems().count() == len(ITEMS) * 4
@@ -0,0 +1,65 @@
+"""
+Capturing repository calls made by service code
+"""
+import asyncio
+import pytest
+from app.core.config import settings
+from app.repositories.collection_cache import collection_cache
+from app.repositories.lesson_repository import lesson_repository
+from app.repositories.metrics import repository_metrics
+from app.services.learning_services import learning_service
+
+def test_course_content_reads_lessons_once():
+    async def run():
+        with repository_metrics.capture() as calls:
+            modules = await learning_service.get_course_content("basic-programming")
+        return modules, calls
+
+    modules, calls = asyncio.run(run())
+    assert calls.calls("course_modules") == 1
+    assert calls.calls("lessons") == 1
+    assert [[lesson.id for lesson in module.lessons] for module in modules] == [
+        ["lesson-1-1", "lesson-1-2", "lesson-1-3", "lesson-1-4"], []
+    ]
+
+def test_course_progress_stays_within_budget():
+    async def run():
+        with repository_metrics.max_calls(1, "lessons"):
+            return await learning_service.get_course_progress("1", "basic-programming")
+
+    assert asyncio.run(run()).total_lessons == 4
+
+def test_cache_hits_are_counted():
+    lesson_repository.find_by_id("lesson-1-1")
+    with repository_metrics.capture("lessons") as calls:
+        for _ in range(3):
+            lesson_repository.find_by_id("lesson-1-1")
+    assert calls.calls() == 3
+    assert calls.calls(operation="find_by_id") == 3
+    assert calls.loads == 0
+
+def test_max_calls_fails_over_the_limit():
+    with pytest.raises(AssertionError, match="lessons.find_by_id x2"):
+        with repository_metrics.max_calls(1, "lessons"):
+            lesson_repository.find_by_id("lesson-1-1")
+            lesson_repository.find_by_id("lesson-1-2")
+
+def test_captures_are_local_to_each_task(monkeypatch):
+    # Without metrics enabled, and with reads sent to the I/O pool
+    monkeypatch.setattr(settings, "ENABLE_REPOSITORY_METRICS", False)
+
+    async def read(count):
+        with repository_metrics.capture() as calls:
+            for _ in range(count):
+                collection_cache.invalidate()
+                await lesson_repository.afind_by_id("lesson-1-1")
+                await asyncio.sleep(0)
+        return calls
+
+    async def run():
+        return await asyncio.gather(read(2), read(5))
+
+    first, second = asyncio.run(run())
+    assert first.calls("lessons") == 2
+    assert second.calls("lessons") == 5
+    assert second.loads >= 1
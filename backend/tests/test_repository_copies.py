@@ -0,0 +1,51 @@
+"""
+Rows returned by the repositories are copies of the cached collection
+"""
+import asyncio
+import pytest
+from app.repositories.base_repository import CollectionRepository
+from app.repositories.user_repository import user_repository
+from app.services.learning_services import learning_service
+
+@pytest.fixture
+def repository(data_dir):
+    repository = CollectionRepository("items")
+    repository.indexed_fields = ("kind",)
+    repository.create_many([
+        {"id": "1", "kind": "a", "tags": ["x"]},
+        {"id": "2", "kind": "b", "tags": ["y"]}
+    ])
+    return repository
+
+def test_finders_return_copies(repository):
+    repository.find_by_id("1")["tags"].append("changed")
+    repository.find_all()[0]["kind"] = "changed"
+    repository.find_by_field("kind", "a")[0]["tags"].clear()
+    repository.find_one_by_field("kind", "a")["id"] = "changed"
+    repository.find_by_field_in("kind", ["a"])[0]["tags"].append("changed")
+    repository.query(order_by="-id")[1]["tags"].append("changed")
+    next(repository.iter_all())["tags"].append("changed")
+
+    assert repository.find_by_id("1") == {"id": "1", "kind": "a", "tags": ["x"]}
+    assert [item["id"] for item in repository.find_by_field("kind", "a")] == ["1"]
+
+def test_writes_store_copies(repository):
+    item = {"id": "3", "kind": "c", "tags": []}
+    repository.create(item)
+    item["tags"].append("changed")
+    updates = {"tags": ["z"]}
+    updated = repository.update("2", updates)
+    updates["tags"].append("changed")
+    updated["tags"].append("changed")
+
+    assert repository.find_by_id("3")["tags"] == []
+    assert repository.find_by_id("2")["tags"] == ["z"]
+
+def test_failed_enrollment_leaves_user_unchanged(monkeypatch):
+    async def failing_update(item_id, updates):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(user_repository, "aupdate", failing_update)
+    with pytest.raises(OSError):
+        asyncio.run(learning_service.enroll_in_path("3", "basic-programming"))
+    assert user_repository.find_by_id("3")["enrolled_courses"] == []
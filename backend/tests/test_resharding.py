@@ -0,0 +1,60 @@
+"""
+Resharding moves every user between users.json and the shard files
+"""
+import pytest
+from app.repositories.reshard_users import reshard
+from app.repositories.user_repository import SHARD_DIRECTORY, ShardedUserRepository, UserRepository
+
+USERS = [{"id": str(i), "email": f"user{i}@example.com", "role": "student"} for i in range(1, 30)]
+
+def by_id(users):
+    return sorted(users, key=lambda user: int(user["id"]))
+
+def journal_users():
+    users = UserRepository()
+    users.storage_mode = "journal"
+    return users
+
+def test_resharding_keeps_every_user(data_dir):
+    UserRepository().create_many(USERS)
+
+    assert reshard(4) == len(USERS)
+    assert (data_dir / SHARD_DIRECTORY / "manifest.json").exists()
+    sharded = ShardedUserRepository(4)
+    assert by_id(sharded.find_all()) == USERS
+    assert sharded.find_by_email("user17@example.com")["id"] == "17"
+    assert sharded.next_id() == "30"
+
+    # Twice in the same second keeps both backups
+    assert reshard(3) == len(USERS)
+    assert by_id(ShardedUserRepository(3).find_all()) == USERS
+
+    assert reshard(0) == len(USERS)
+    assert by_id(UserRepository().find_all()) == USERS
+
+def test_sharding_moves_users_json_aside(data_dir):
+    UserRepository().create_many(USERS)
+    reshard(2)
+    assert not (data_dir / "users.json").exists()
+    assert list(data_dir.glob("users.backup-*.json"))
+    with pytest.raises(RuntimeError):
+        UserRepository().check_layout()
+    ShardedUserRepository(2).check_layout()
+
+    reshard(0)
+    UserRepository().check_layout()
+
+def test_journaled_users_are_not_replayed_twice(data_dir):
+    journal_users().create_many(USERS)
+    assert (data_dir / "users.journal").exists()
+
+    assert reshard(2) == len(USERS)
+    assert not (data_dir / "users.journal").exists()
+    assert reshard(0) == len(USERS)
+    assert by_id(journal_users().find_all()) == USERS
+
+    # Back to one file from one file: the old journal must not replay over the new file
+    journal_users().update("1", {"role": "admin"})
+    assert reshard(0) == len(USERS)
+    assert len(journal_users().find_all()) == len(USERS)
+    assert journal_users().find_by_id("1")["role"] == "admin"
@@ -0,0 +1,108 @@
+"""
+Repository-backed sessions never block the event loop and write one row per change
+"""
+import asyncio
+import threading
+from datetime import datetime, timedelta
+import pytest
+from app.models.diagnostic import EvaluationSession, UserAnswer
+from app.repositories.evaluation_repository import EvaluationSessionRepository
+from app.services.session_store import RepositorySessionStore
+
+@pytest.fixture
+def repository(data_dir):
+    return EvaluationSessionRepository()
+
+def record_threads(repository, monkeypatch, name):
+    """Replace a repository method with one noting the thread it runs on"""
+    method = getattr(repository, name)
+    threads = []
+    def recording(*args):
+        threads.append(threading.get_ident())
+        return method(*args)
+    monkeypatch.setattr(repository, name, recording)
+    return threads
+
+def test_answers_rewrite_only_their_session(repository):
+    store = RepositorySessionStore(repository, 3600, 100)
+    first = EvaluationSession(session_id="s1", user_id="1")
+    second = EvaluationSession(session_id="s2", user_id="2")
+
+    async def run():
+        await store.aput(first)
+        await store.aput(second)
+        first.answers.append(UserAnswer(question_id=1, selected_option=1, time_spent=1000, difficulty="basic"))
+        await store.aput(first)
+        return await store.aget("s1"), await store.aget("s2")
+
+    loaded_first, loaded_second = asyncio.run(run())
+    assert [answer.question_id for answer in loaded_first.answers] == [1]
+    assert loaded_second.answers == []
+    assert repository.count() == 2
+
+def test_expired_session_is_deleted_asynchronously(repository, monkeypatch):
+    store = RepositorySessionStore(repository, 60, 100)
+    store.put(EvaluationSession(session_id="old", user_id="1"))
+    repository.update("old", {"updated_at": (datetime.now() - timedelta(minutes=5)).isoformat()})
+    threads = record_threads(repository, monkeypatch, "delete")
+
+    async def run():
+        return await store.aget("old"), threading.get_ident()
+
+    session, loop_thread = asyncio.run(run())
+    assert session is None
+    assert threads and loop_thread not in threads
+    assert repository.find_by_id("old") is None
+    assert store.expirations == 1
+
+def test_eviction_runs_off_the_event_loop(repository, monkeypatch):
+    store = RepositorySessionStore(repository, 3600, 2)
+    threads = record_threads(repository, monkeypatch, "count")
+
+    async def run():
+        for index in range(3):
+            await store.aput(EvaluationSession(session_id=f"s{index}", user_id="1"))
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert threads and loop_thread not in threads
+    assert sorted(row["id"] for row in repository.find_all()) == ["s1", "s2"]
+    assert store.evictions == 1
+
+def test_concurrent_answers_to_one_session_are_all_kept(repository, monkeypatch):
+    store = RepositorySessionStore(repository, 3600, 100)
+    store.put(EvaluationSession(session_id="s1", user_id="1"))
+    update_if = repository.update_if
+    calls = []
+
+    def add_answer(question_id):
+        def change(session):
+            session.answers.append(UserAnswer(question_id=question_id, selected_option=0,
+                                              time_spent=1000, difficulty="basic"))
+        return change
+
+    def racing_update_if(*args):
+        if not calls:
+            # Another request records its answer between our read and our write
+            calls.append("other")
+            store.modify("s1", add_answer(2))
+        calls.append("ours")
+        return update_if(*args)
+    monkeypatch.setattr(repository, "update_if", racing_update_if)
+
+    session = asyncio.run(store.amodify("s1", add_answer(1)))
+    assert calls == ["other", "ours", "ours", "ours"]
+    assert [answer.question_id for answer in session.answers] == [2, 1]
+    assert [answer.question_id for answer in store.get("s1").answers] == [2, 1]
+
+def test_stats_run_off_the_event_loop(repository, monkeypatch):
+    store = RepositorySessionStore(repository, 3600, 100)
+    store.put(EvaluationSession(session_id="s1", user_id="1"))
+    threads = record_threads(repository, monkeypatch, "find_all")
+
+    async def run():
+        return await store.astats(), threading.get_ident()
+
+    stats, loop_thread = asyncio.run(run())
+    assert stats["size"] == 1
+    assert threads and loop_thread not in threads
@@ -0,0 +1,96 @@
+"""
+Snapshots answer reads like the JSON source and go stale when its content changes
+"""
+import json
+import os
+import shutil
+import pytest
+from app.repositories.base_repository import BaseRepository
+from app.repositories.collection_cache import collection_cache
+from app.repositories.snapshot import SnapshotRepository, build_snapshot
+
+class JsonItems(BaseRepository):
+    indexed_fields = ("kind", ("kind", "level"))
+
+    def __init__(self):
+        super().__init__("items")
+
+    def get_collection_name(self) -> str:
+        return "items"
+
+class SnapshotItems(SnapshotRepository):
+    indexed_fields = ("kind", ("kind", "level"))
+
+    def __init__(self):
+        super().__init__("items")
+
+    def get_collection_name(self) -> str:
+        return "items"
+
+ITEMS = [
+    {"id": str(i), "kind": "ab"[i % 2], "level": i % 3, "tags": [str(i)]}
+    for i in range(1, 40)
+]
+
+@pytest.fixture
+def items(data_dir):
+    JsonItems().create_many(ITEMS)
+    build_snapshot(JsonItems())
+    repository = SnapshotItems()
+    assert repository._snapshot() is not None
+    return repository
+
+def test_snapshot_reads_match_json(items):
+    source = JsonItems()
+    assert items.find_all() == source.find_all()
+    for item_id in ("1", "17", "39", "40", "x"):
+        assert items.find_by_id(item_id) == source.find_by_id(item_id)
+    for value in ("a", "b", "c"):
+        assert items.find_by_field("kind", value) == source.find_by_field("kind", value)
+        assert items.find_one_by_field("kind", value) == source.find_one_by_field("kind", value)
+    assert items.find_by_field(("kind", "level"), ("a", 2)) == source.find_by_field(("kind", "level"), ("a", 2))
+    assert items.find_by_field_in("kind", ["b", "c", "b"]) == source.find_by_field_in("kind", ["b", "c", "b"])
+    assert items.query({"kind": "a", "level": {0, 1}}, "-level", 5) == \
+        source.query({"kind": "a", "level": {0, 1}}, "-level", 5)
+    assert items.count() == len(ITEMS)
+    assert items.version() == source.version()
+
+def test_snapshot_reads_skip_the_json_file(items):
+    collection_cache.invalidate(items.file_path)
+    items.find_by_id("5")
+    items.find_by_field_in("kind", ["a"])
+    items.query({"kind": "b"}, "title", 3)
+    assert collection_cache.peek(items.file_path) is None
+
+def test_records_are_decoded_per_read(items):
+    first = items.find_by_id("3")
+    first["tags"].append("changed")
+    assert items.find_by_id("3") == {"id": "3", "kind": "b", "level": 0, "tags": ["3"]}
+    assert items.find_by_id("3") is not items.find_by_id("3")
+
+def test_copying_the_source_keeps_the_snapshot(items):
+    copy = items.file_path.with_name("copy.json")
+    shutil.copy(items.file_path, copy)
+    os.replace(copy, items.file_path)
+    os.utime(items.file_path, ns=(1, 1))
+    assert items._snapshot() is not None
+
+def test_content_edit_makes_the_snapshot_stale(items):
+    # An edit by hand does not advance the version counter
+    data = json.loads(items.file_path.read_text())
+    data["items"][0]["kind"] = "c"
+    items.file_path.write_text(json.dumps(data))
+
+    assert items._snapshot() is None
+    assert items.find_by_id("1")["kind"] == "c"
+    assert [item["id"] for item in items.find_by_field("kind", "c")] == ["1"]
+
+def test_write_makes_the_snapshot_stale_until_rebuilt(items):
+    items.update("2", {"kind": "c"})
+    assert items._snapshot() is None
+    assert items.find_by_id("2")["kind"] == "c"
+
+    build_snapshot(items)
+    assert items._snapshot() is not None
+    assert items.find_by_id("2")["kind"] == "c"
+    assert items.version() == JsonItems().version()
@@ -0,0 +1,56 @@
+"""
+Paginated endpoints sort only by scalar fields, the same way on every backend
+"""
+import json
+from pathlib import Path
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.learning import LEARNING_PATH_SORT_FIELDS
+from app.repositories.base_repository import CollectionRepository
+from app.repositories.sqlite_repository import SQLiteRepository
+
+class SQLitePaths(SQLiteRepository):
+    def __init__(self):
+        super().__init__("learning_paths")
+
+    def get_collection_name(self) -> str:
+        return "learning_paths"
+
+@pytest.fixture
+def paths():
+    with open(Path(__file__).resolve().parent.parent / "app" / "data" / "learning_paths.json") as f:
+        paths = json.load(f)["learning_paths"]
+    # Ties and missing values, so the secondary ordering is exercised too
+    paths.append(dict(paths[0], id="copy", category=None, is_new=True))
+    paths.append({"id": "bare", "title": "Bare"})
+    return paths
+
+@pytest.mark.parametrize("order_by", [
+    prefix + field for field in LEARNING_PATH_SORT_FIELDS for prefix in ("", "-")
+])
+def test_backends_agree_on_order(data_dir, paths, order_by):
+    json_paths = CollectionRepository("learning_paths")
+    json_paths.create_many(paths)
+    sqlite_paths = SQLitePaths()
+    sqlite_paths.create_many(paths)
+
+    for limit in (None, 3):
+        expected = [path["id"] for path in json_paths.query(order_by=order_by, limit=limit)]
+        assert [path["id"] for path in sqlite_paths.query(order_by=order_by, limit=limit)] == expected
+
+@pytest.mark.parametrize("url", [
+    "/api/learning-paths/paginated?order_by=-rating",
+    "/api/learning-paths/paginated?order_by=content",
+    "/api/home/achievements/1/paginated?order_by=unlocked_at"
+])
+def test_nested_or_unknown_sort_field_is_rejected(url):
+    with TestClient(app) as client:
+        assert client.get(url).status_code == 422
+
+def test_scalar_sort_field_is_accepted():
+    with TestClient(app) as client:
+        response = client.get("/api/learning-paths/paginated?order_by=-modules")
+    assert response.status_code == 200
+    modules = [path["modules"] for path in response.json()["items"]]
+    assert modules == sorted(modules, reverse=True)
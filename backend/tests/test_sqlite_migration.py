@@ -0,0 +1,29 @@
+"""
+python -m app.repositories.sqlite_repository imports every collection
+"""
+from app.repositories.base_repository import CollectionRepository
+from app.repositories.reshard_users import write_shards
+from app.repositories.sqlite_repository import SQLiteRepository, migrate_json_to_sqlite
+from app.repositories.user_repository import SHARD_DIRECTORY
+
+class SQLiteUsers(SQLiteRepository):
+    def __init__(self):
+        super().__init__("users")
+
+    def get_collection_name(self) -> str:
+        return "users"
+
+USERS = [{"id": str(i), "email": f"user{i}@email.com"} for i in range(1, 8)]
+
+def test_migration_imports_plain_files(data_dir):
+    CollectionRepository("users").create_many(USERS)
+    CollectionRepository("lessons").create({"id": "l1"})
+    assert migrate_json_to_sqlite() == {"lessons": 1, "users": 7}
+    assert SQLiteUsers().find_by_id("5")["email"] == "user5@email.com"
+
+def test_migration_imports_sharded_users(data_dir):
+    # A users.json left behind by resharding must not win over the shards
+    CollectionRepository("users").create({"id": "stale"})
+    write_shards(USERS, 3, SHARD_DIRECTORY)
+    assert migrate_json_to_sqlite()["users"] == 7
+    assert sorted(user["id"] for user in SQLiteUsers().find_all()) == sorted(user["id"] for user in USERS)
@@ -0,0 +1,65 @@
+"""
+Unique fields reject duplicate values on every backend
+"""
+import pytest
+from app.repositories.base_repository import BaseRepository
+from app.repositories.indexes import UniqueConstraintError
+from app.repositories.sqlite_repository import SQLiteRepository
+from app.repositories.user_repository import ShardedUserRepository
+
+class JsonAccounts(BaseRepository):
+    unique_fields = ("email",)
+
+    def __init__(self):
+        super().__init__("accounts")
+
+    def get_collection_name(self) -> str:
+        return "accounts"
+
+class SQLiteAccounts(SQLiteRepository):
+    unique_fields = ("email",)
+
+    def __init__(self):
+        super().__init__("accounts")
+
+    def get_collection_name(self) -> str:
+        return "accounts"
+
+@pytest.fixture(params=["json", "sqlite", "sharded"])
+def accounts(request, data_dir):
+    if request.param == "json":
+        repository = JsonAccounts()
+    elif request.param == "sqlite":
+        repository = SQLiteAccounts()
+    else:
+        repository = ShardedUserRepository(3)
+    repository.create_many([
+        {"id": "1", "email": "ana@email.com"},
+        {"id": "2", "email": "luis@email.com"},
+        {"id": "3"}
+    ])
+    return repository
+
+def test_create_rejects_duplicate(accounts):
+    with pytest.raises(UniqueConstraintError):
+        accounts.create({"id": "4", "email": "ana@email.com"})
+    assert accounts.find_by_id("4") is None
+
+def test_create_many_is_all_or_nothing(accounts):
+    with pytest.raises(UniqueConstraintError):
+        accounts.create_many([{"id": "4", "email": "eva@email.com"}, {"id": "5", "email": "eva@email.com"}])
+    assert accounts.find_by_id("4") is None
+    assert accounts.find_one_by_field("email", "eva@email.com") is None
+
+def test_update_rejects_taken_value(accounts):
+    with pytest.raises(UniqueConstraintError):
+        accounts.update("2", {"email": "ana@email.com"})
+    assert accounts.find_by_id("2")["email"] == "luis@email.com"
+    assert accounts.find_one_by_field("email", "ana@email.com")["id"] == "1"
+
+def test_rows_may_keep_or_move_their_value(accounts):
+    accounts.update("1", {"email": "ana@email.com", "name": "Ana"})
+    accounts.update("2", {"email": "luis@nuevo.com"})
+    accounts.create({"id": "4", "email": "luis@email.com"})
+    accounts.create({"id": "5"})
+    assert accounts.find_one_by_field("email", "luis@email.com")["id"] == "4"
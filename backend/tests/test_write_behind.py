@@ -0,0 +1,74 @@
+"""
+Batched durability keeps writes in memory until the next flush
+"""
+import json
+import os
+from app.core.config import settings
+from app.repositories.base_repository import BaseRepository
+from app.repositories.write_behind import write_behind_queue
+
+class JsonItems(BaseRepository):
+    def __init__(self):
+        super().__init__("items")
+
+    def get_collection_name(self) -> str:
+        return "items"
+
+ITEMS = [{"id": str(i), "name": f"item {i}"} for i in range(1, 6)]
+
+def stored_names(items):
+    return [row["name"] for row in json.loads(items.file_path.read_text(encoding="utf-8"))["items"]]
+
+def test_batched_writes_are_flushed_on_shutdown(data_dir, monkeypatch):
+    items = JsonItems()
+    items.create_many(ITEMS)
+    monkeypatch.setattr(settings, "REPOSITORY_DURABILITY", "batched")
+    monkeypatch.setattr(settings, "WRITE_BEHIND_FLUSH_MS", 60000)
+
+    items.update("1", {"name": "batched"})
+    assert write_behind_queue.has_pending(items.file_path)
+    assert items.find_by_id("1")["name"] == "batched"
+    assert stored_names(items)[0] == "item 1"
+
+    write_behind_queue.flush_all()
+    assert not write_behind_queue.has_pending(items.file_path)
+    assert stored_names(items)[0] == "batched"
+
+def test_batches_are_applied_again_after_a_concurrent_modification(data_dir, monkeypatch):
+    items = JsonItems()
+    items.create_many(ITEMS)
+    monkeypatch.setattr(settings, "REPOSITORY_DURABILITY", "batched")
+    monkeypatch.setattr(settings, "WRITE_BEHIND_FLUSH_MS", 60000)
+    items.update("1", {"name": "batched"})
+    items.create({"id": "6", "name": "item 6"})
+
+    # Another process rewrites the file before the batch is flushed
+    data = json.loads(items.file_path.read_text(encoding="utf-8"))
+    data["items"][1]["name"] = "external"
+    temporary = items.file_path.with_suffix(".external")
+    temporary.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(temporary, items.file_path)
+
+    dropped = write_behind_queue.dropped
+    write_behind_queue.flush_all()
+    assert write_behind_queue.dropped == dropped
+    assert stored_names(items) == ["batched", "external", "item 3", "item 4", "item 5", "item 6"]
+
+def test_batched_writes_that_no_longer_apply_are_counted(data_dir, monkeypatch):
+    items = JsonItems()
+    items.unique_fields = ("name",)
+    items.create_many(ITEMS)
+    monkeypatch.setattr(settings, "REPOSITORY_DURABILITY", "batched")
+    monkeypatch.setattr(settings, "WRITE_BEHIND_FLUSH_MS", 60000)
+    items.create({"id": "6", "name": "item 6"})
+
+    data = json.loads(items.file_path.read_text(encoding="utf-8"))
+    data["items"].append({"id": "7", "name": "item 6"})
+    temporary = items.file_path.with_suffix(".external")
+    temporary.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(temporary, items.file_path)
+
+    dropped = write_behind_queue.dropped
+    write_behind_queue.flush_all()
+    assert write_behind_queue.dropped == dropped + 1
+    assert [row["id"] for row in JsonItems().find_all()] == ["1", "2", "3", "4", "5", "7"]
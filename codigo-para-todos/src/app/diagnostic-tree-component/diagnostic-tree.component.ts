@@ -17,6 +17,7 @@ import { TreeConnection } from '../models/diagnostic-evaluation/diagnostic-tree/
 })
 export class DiagnosticTreeComponent implements OnInit, AfterViewInit {
   @Input() answerReview: AnswerReviewItem[] = [];
+  @Input() sessionId = '';
   @ViewChild('treeCanvas', { static: true }) canvasRef!: ElementRef<HTMLCanvasElement>;
   
   private canvas!: HTMLCanvasElement;
@@ -208,7 +209,7 @@ private setupCanvasContext() {
     
     adaptiveAnswers.push(currentAdaptiveAnswer);
     
-    return this.evaluationService.getAlternativePathInfo(currentAnswers, answer.question.id);
+    return this.evaluationService.getAlternativePathInfo(this.sessionId, currentAnswers, answer.question.id);
     });
 
     // Execute all requests in parallel
@@ -237,8 +237,9 @@ export class DiagnosticEvaluationService {
   }
 
   
-getNextAdaptiveQuestion(answers: AdaptiveAnswer[], assumeAnswer?: { questionId: number, selectedOption: number, isCorrect: boolean }): Observable<Question | null> {
+getNextAdaptiveQuestion(sessionId: string, answers: AdaptiveAnswer[], assumeAnswer?: { questionId: number, selectedOption: number, isCorrect: boolean }): Observable<Question | null> {
   const payload = {
+    session_id: sessionId,                   // Usa la semilla de la sesión
     answers: answers.map(answer => ({
       question_id: answer.questionId,        // Cambiar a snake_case
       selected_option: answer.selectedOption, // Cambiar a snake_case
@@ -262,8 +263,9 @@ getNextAdaptiveQuestion(answers: AdaptiveAnswer[], assumeAnswer?: { questionId:
   );
 }
 
-getAlternativePathInfo(answers: AdaptiveAnswer[], currentQuestionId: number): Observable<AlternativePath[]> {
+getAlternativePathInfo(sessionId: string, answers: AdaptiveAnswer[], currentQuestionId: number): Observable<AlternativePath[]> {
   const payload = {
+    session_id: sessionId,                   // Usa la semilla de la sesión
     answers: answers.map(answer => ({
       question_id: answer.questionId,        // Cambiar a snake_case
       selected_option: answer.selectedOption, // Cambiar a snake_case